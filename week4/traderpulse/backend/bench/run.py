@@ -0,0 +1,322 @@
+"""
+Load-test and latency benchmark for the TraderPulse API.
+
+Drives `backend.main:app` in-process (no sockets) with a weighted mix of the
+requests the dashboard makes, against a synthetic market data provider and a
+stubbed Gemini client whose latencies are controllable. Reports throughput and
+latency percentiles per scenario and writes them as JSON for diffing between
+commits::
+
+    python -m backend.bench.run --mix default --duration 20 --concurrency 32 \\
+        --market-latency-ms 120 --llm-latency-ms 900 --output bench.json
+    python -m backend.bench.run --mix ticker=5,chart=2 --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from ..main import app
+from ..services import ai_service, gamification, market_service, providers
+from ..services.bar_store import BarStore
+from ..services.gamification import GamificationStore
+from ..services.rate_limiter import AdaptiveRateLimiter
+from .stubs import SYMBOLS, StubGeminiModels, SyntheticProvider
+
+TICKER_SYMBOLS = ["AAPL", "GOOGL", "MSFT", "AMZN", "TSLA", "BTC-USD", "ETH-USD", "SPY"]
+CHART_PERIODS = ["1mo", "1mo", "1mo", "3mo", "6mo", "1y", "5y"]
+INTRADAY_INTERVALS = ["1m", "5m", "15m", "30m", "1h"]
+# Search traffic includes typos and unknown tickers
+SEARCH_TERMS = list(SYMBOLS) + ["AAPLE", "MSFTT", "XXXX", "NOPE", "TSL"]
+
+def _ticker(rng: random.Random) -> str:
+    return "/api/v1/stocks?symbols=" + ",".join(TICKER_SYMBOLS)
+
+def _chart(rng: random.Random) -> str:
+    return f"/api/v1/stocks/{rng.choice(SYMBOLS)}?period={rng.choice(CHART_PERIODS)}"
+
+def _intraday(rng: random.Random) -> str:
+    # Switching the chart between intraday intervals
+    return f"/api/v1/stocks/{rng.choice(SYMBOLS)}?period=5d&interval={rng.choice(INTRADAY_INTERVALS)}"
+
+def _dashboard(rng: random.Random) -> str:
+    return f"/api/v1/dashboard/{rng.choice(SYMBOLS)}"
+
+def _sentiment(rng: random.Random) -> str:
+    return f"/api/v1/sentiment/{rng.choice(SYMBOLS)}"
+
+def _sentiment_stream(rng: random.Random) -> str:
+    return f"/api/v1/sentiment/{rng.choice(SYMBOLS)}/stream"
+
+def _search(rng: random.Random) -> str:
+    # The search box queries the local symbol index as the user types
+    return f"/api/v1/symbols/search?q={rng.choice(SEARCH_TERMS)}"
+
+SCENARIOS: Dict[str, Callable[[random.Random], str]] = {
+    "ticker": _ticker,
+    "chart": _chart,
+    "intraday": _intraday,
+    "dashboard": _dashboard,
+    "sentiment": _sentiment,
+    "sentiment_stream": _sentiment_stream,
+    "search": _search,
+}
+
+MIXES: Dict[str, Dict[str, float]] = {
+    # Roughly one page view: tape refreshes dominate, then chart, AI panel and searches
+    "default": {"ticker": 5, "chart": 2, "sentiment": 2, "search": 1},
+    "ticker": {"ticker": 1},
+    "chart": {"chart": 1},
+    "intraday": {"intraday": 1},
+    "dashboard": {"dashboard": 3, "ticker": 5, "search": 1},
+    "sentiment": {"sentiment": 1},
+    "sentiment_stream": {"sentiment_stream": 1},
+    "search": {"search": 1},
+}
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    Accepts a named mix ("default") or explicit weights ("ticker=5,chart=2").
+    """
+    if spec in MIXES:
+        return dict(MIXES[spec])
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}'. Use one of: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def _percentiles(latencies: List[float]) -> dict:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+def summarize(samples: List[Tuple[str, int, float]], elapsed: float) -> dict:
+    """
+    Groups `(scenario, status, seconds)` samples into per-scenario statistics.
+    Status 0 marks a request that raised instead of returning a response.
+    """
+    def stats(rows):
+        statuses: Dict[str, int] = {}
+        for _, status, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "requests": len(rows),
+            "errors": sum(1 for _, status, _ in rows if status == 0 or status >= 500),
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else None,
+            **_percentiles([seconds for _, _, seconds in rows]),
+            "status_codes": statuses,
+        }
+
+    by_scenario: Dict[str, list] = {}
+    for sample in samples:
+        by_scenario.setdefault(sample[0], []).append(sample)
+    return {
+        "scenarios": {name: stats(rows) for name, rows in sorted(by_scenario.items())},
+        "total": stats(samples),
+    }
+
+async def _worker(client: httpx.AsyncClient, mix: Dict[str, float], rng: random.Random,
+                  deadline: float, samples: list):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        url = SCENARIOS[name](rng)
+        started = time.perf_counter()
+        try:
+            response = await client.get(url)
+            status = response.status_code
+        except Exception as e:
+            print(f"{name} request failed: {e}", file=sys.stderr)
+            status = 0
+        samples.append((name, status, time.perf_counter() - started))
+
+async def run_benchmark(mix: Dict[str, float], duration: float = 10.0, concurrency: int = 16,
+                        warmup: float = 1.0, seed: int = 0, market_latency_ms: float = 50.0,
+                        market_jitter_ms: float = 20.0, llm_latency_ms: float = 800.0,
+                        llm_jitter_ms: float = 400.0, refresher: bool = False,
+                        rate_limits: bool = False) -> dict:
+    """
+    Runs one benchmark against cold caches and a fresh bar store, gamification
+    database and shared cache tier (if enabled), all in a temporary directory,
+    then restores the process's own. Upstream rate limits are lifted unless
+    `rate_limits` is set, so results measure the app itself.
+    """
+    provider = SyntheticProvider(market_latency_ms, market_jitter_ms, seed)
+    models = StubGeminiModels(llm_latency_ms, llm_jitter_ms, seed)
+    settings = market_service.settings
+
+    saved = (providers._provider, ai_service.client,
+             market_service._bar_store, settings.REFRESHER_ENABLED,
+             market_service._limiter, ai_service._limiter,
+             gamification._store, market_service._shared_cache, settings.SHARED_CACHE_PATH)
+    with tempfile.TemporaryDirectory(prefix="traderpulse-bench-") as bench_dir:
+        providers.set_provider(provider)
+        ai_service.client = SimpleNamespace(aio=SimpleNamespace(models=models))
+        market_service._bar_store = BarStore(os.path.join(bench_dir, "bars"), settings.BAR_STORE_MAX_SEGMENTS)
+        gamification._store = GamificationStore(os.path.join(bench_dir, "gamification.sqlite"))
+        # Rebuilt on first use, in the temporary directory
+        market_service._shared_cache = None
+        settings.SHARED_CACHE_PATH = os.path.join(bench_dir, "shared_cache.sqlite")
+        settings.REFRESHER_ENABLED = refresher
+        if not rate_limits:
+            market_service._limiter = AdaptiveRateLimiter("market_data", rate=0, burst=1)
+            ai_service._limiter = AdaptiveRateLimiter("gemini", rate=0, burst=1)
+        market_service.clear_caches()
+        ai_service.clear_cache()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with app.router.lifespan_context(app):
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                    if warmup > 0:
+                        await asyncio.gather(*[
+                            _worker(client, mix, random.Random(seed + 1000 + i), time.perf_counter() + warmup, [])
+                            for i in range(concurrency)
+                        ])
+
+                    samples: list = []
+                    started = time.perf_counter()
+                    await asyncio.gather(*[
+                        _worker(client, mix, random.Random(seed + i), started + duration, samples)
+                        for i in range(concurrency)
+                    ])
+                    elapsed = time.perf_counter() - started
+        finally:
+            providers.set_provider(saved[0])
+            ai_service.client = saved[1]
+            market_service._bar_store = saved[2]
+            settings.REFRESHER_ENABLED = saved[3]
+            market_service._limiter, ai_service._limiter = saved[4], saved[5]
+            gamification._store, market_service._shared_cache = saved[6], saved[7]
+            settings.SHARED_CACHE_PATH = saved[8]
+            market_service.clear_caches()
+            ai_service.clear_cache()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "elapsed_seconds": round(elapsed, 3),
+        },
+        "config": {
+            "mix": mix,
+            "duration": duration,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "seed": seed,
+            "market_latency_ms": market_latency_ms,
+            "market_jitter_ms": market_jitter_ms,
+            "llm_latency_ms": llm_latency_ms,
+            "llm_jitter_ms": llm_jitter_ms,
+            "refresher": refresher,
+            "rate_limits": rate_limits,
+        },
+        "upstream_calls": {"market": provider.calls, "llm": models.calls},
+        **summarize(samples, elapsed),
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def format_report(result: dict, baseline: Optional[dict] = None) -> str:
+    """
+    Human-readable table; with a baseline, adds the relative change of p50/p99 and throughput.
+    """
+    header = f"{'scenario':<12}{'reqs':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'Δrps':>9}{'Δp50':>9}{'Δp99':>9}"
+    lines = [header, "-" * len(header)]
+
+    def delta(new, old):
+        if new is None or not old:
+            return f"{'-':>9}"
+        return f"{(new - old) / old * 100:>+8.1f}%"
+
+    rows = list(result["scenarios"].items()) + [("TOTAL", result["total"])]
+    for name, row in rows:
+        line = (f"{name:<12}{row['requests']:>8}{row['errors']:>6}{row['throughput_rps'] or 0:>10.1f}"
+                f"{row['p50_ms'] or 0:>10.2f}{row['p95_ms'] or 0:>10.2f}{row['p99_ms'] or 0:>10.2f}")
+        if baseline:
+            old = baseline["total"] if name == "TOTAL" else baseline["scenarios"].get(name, {})
+            line += (delta(row["throughput_rps"], old.get("throughput_rps"))
+                     + delta(row["p50_ms"], old.get("p50_ms")) + delta(row["p99_ms"], old.get("p99_ms")))
+        lines.append(line)
+
+    calls = result["upstream_calls"]
+    lines.append(f"upstream calls: market={calls['market']} llm={calls['llm']}")
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="TraderPulse API load test")
+    parser.add_argument("--mix", default="default",
+                        help=f"Named mix ({', '.join(MIXES)}) or weights like ticker=5,chart=2")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent simulated clients")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--market-latency-ms", type=float, default=50.0)
+    parser.add_argument("--market-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=400.0)
+    parser.add_argument("--refresher", action="store_true", help="Run the background refresher during the test")
+    parser.add_argument("--rate-limits", action="store_true", help="Apply the configured upstream rate limits")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Earlier JSON result to compare against")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_benchmark(
+        parse_mix(args.mix),
+        duration=args.duration,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        seed=args.seed,
+        market_latency_ms=args.market_latency_ms,
+        market_jitter_ms=args.market_jitter_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        llm_jitter_ms=args.llm_jitter_ms,
+        refresher=args.refresher,
+        rate_limits=args.rate_limits,
+    ))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(format_report(result, baseline))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import
+`backend.main`, which is what a Cloud Run instance pays before it can answer
+its first request. Each run is a new subprocess, so nothing is cached in
+`sys.modules`::
+
+    python -m backend.bench.startup --runs 10 --budget-ms 900
+
+Exits non-zero when the median import time exceeds the budget or when a
+module that should load lazily (see `LAZY_MODULES`) is imported eagerly.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Optional
+
+# Import time budget for `backend.main` (median of the runs, milliseconds)
+DEFAULT_BUDGET_MS = 900.0
+
+# Heavy dependencies that must only load on first use or during warm-up
+LAZY_MODULES = ("pandas", "yfinance", "google.genai")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"import_ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+def _project_root() -> str:
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def measure_import(runs: int = 5) -> dict:
+    """
+    Imports `backend.main` in `runs` fresh interpreters and returns the
+    timings plus any lazy modules that were loaded eagerly.
+    """
+    env = dict(os.environ)
+    # Settings validation needs a key; the client is never created here
+    env.setdefault("GEMINI_API_KEY", "startup-bench")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+    timings, eager = [], set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE],
+            cwd=_project_root(), env=env, capture_output=True, text=True, check=True
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        timings.append(sample["import_ms"])
+        eager.update(sample["loaded"])
+
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1),
+        "max_ms": round(max(timings), 1),
+        "eager_modules": sorted(eager)
+    }
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="TraderPulse cold-start import benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    result = measure_import(args.runs)
+    print(f"import backend.main: median {result['median_ms']:.0f} ms "
+          f"(min {result['min_ms']:.0f}, max {result['max_ms']:.0f}, {result['runs']} runs), "
+          f"budget {args.budget_ms:.0f} ms")
+
+    failed = False
+    if result["median_ms"] > args.budget_ms:
+        print("FAIL: over the startup budget")
+        failed = True
+    if result["eager_modules"]:
+        print(f"FAIL: imported eagerly: {', '.join(result['eager_modules'])}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..services.providers.base import BAR_COLUMNS, MarketDataProvider, empty_bars, period_start
+
+# Symbols the synthetic market knows about; anything else behaves like an unknown ticker
+SYMBOLS = ("AAPL", "GOOGL", "MSFT", "AMZN", "TSLA", "BTC-USD", "ETH-USD", "SPY",
+           "NVDA", "META", "NFLX", "AMD", "INTC", "ORCL", "IBM", "JPM")
+
+_INTRADAY_FREQ = {"1m": "1min", "5m": "5min", "15m": "15min", "30m": "30min", "1h": "1h"}
+
+class _Latency:
+    """
+    Sleeps `latency_ms` plus a uniform jitter drawn from a seeded generator.
+    """
+
+    def __init__(self, latency_ms: float, jitter_ms: float, seed: int):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next(self) -> float:
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic random-walk market for benchmarks: every symbol in SYMBOLS
+    has a fixed daily history back to 2010 and synthetic intraday bars, and
+    each call blocks for the configured upstream latency like a real HTTP call.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.latency = _Latency(latency_ms, jitter_ms, seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+        # Built up front so generating the data never shows up in measured latency
+        index = pd.bdate_range("2010-01-04", pd.Timestamp.today().normalize(), name="Date")
+        self._daily = {symbol: self._walk(symbol, index, "1d") for symbol in SYMBOLS}
+
+    def _delay(self):
+        with self._lock:
+            self.calls += 1
+        delay = self.latency.next()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _walk(self, symbol: str, index: pd.DatetimeIndex, salt: str) -> pd.DataFrame:
+        rng = np.random.default_rng(zlib.crc32(f"{symbol}:{salt}".encode()))
+        start = 20 + zlib.crc32(symbol.encode()) % 400
+        closes = start * np.exp(np.cumsum(rng.normal(0, 0.015, len(index))))
+        opens = np.concatenate([[start], closes[:-1]])
+        spread = np.abs(rng.normal(0, 0.01, len(index))) * closes
+        return pd.DataFrame({
+            "Open": opens,
+            "High": np.maximum(opens, closes) + spread,
+            "Low": np.minimum(opens, closes) - spread,
+            "Close": closes,
+            "Volume": rng.integers(1_000_000, 50_000_000, len(index)).astype("float64"),
+        }, index=index)[BAR_COLUMNS]
+
+    def fetch_quote(self, symbol: str) -> Optional[dict]:
+        self._delay()
+        return self._quote(symbol.upper())
+
+    def fetch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        self._delay()
+        quotes = {symbol: self._quote(symbol.upper()) for symbol in symbols}
+        return {symbol: quote for symbol, quote in quotes.items() if quote is not None}
+
+    def _quote(self, symbol: str) -> Optional[dict]:
+        if symbol not in SYMBOLS:
+            return None
+        bars = self._daily[symbol]
+        return {
+            "price": float(bars["Close"].iloc[-1]),
+            "previous_close": float(bars["Close"].iloc[-2]),
+            "volume": float(bars["Volume"].iloc[-1]),
+            "average_volume": float(bars["Volume"].iloc[-11:-1].mean())
+        }
+
+    def fetch_bars(self, symbol: str, interval: str = "1d", start: Optional[pd.Timestamp] = None,
+                   end: Optional[pd.Timestamp] = None, period: Optional[str] = None) -> pd.DataFrame:
+        self._delay()
+        symbol = symbol.upper()
+        if symbol not in SYMBOLS:
+            return empty_bars()
+
+        today = pd.Timestamp.today().normalize()
+        if period:
+            start, end = period_start(period, today), None
+
+        if interval == "1d":
+            bars = self._daily[symbol]
+        else:
+            # Intraday bars are timezone-aware, like Yahoo's
+            start, end = _utc(start), _utc(end)
+            first = start if start is not None else _utc(today - pd.Timedelta(days=5))
+            index = pd.date_range(first.ceil("min"), pd.Timestamp.now(tz="UTC").floor("min"),
+                                  freq=_INTRADAY_FREQ[interval], name="Date")
+            bars = self._walk(symbol, index, interval)
+
+        if start is not None:
+            bars = bars[bars.index >= pd.Timestamp(start)]
+        if end is not None:
+            bars = bars[bars.index < pd.Timestamp(end)]
+        return bars
+
+def _utc(value) -> Optional[pd.Timestamp]:
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_localize("UTC") if value.tz is None else value.tz_convert("UTC")
+
+class StubGeminiModels:
+    """
+    Stands in for `client.aio.models`: answers sentiment prompts after a
+    controllable delay with a well-formed response for every requested symbol.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.latency = _Latency(latency_ms, jitter_ms, seed)
+        self.calls = 0
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency.next())
+        match = re.search(r"Symbols: (.*)", contents)
+        symbols = match.group(1).split(", ") if match else []
+        text = json.dumps({
+            symbol: {"sentiment": "Neutral", "justification": "Respuesta simulada para benchmark."}
+            for symbol in symbols
+        })
+        return SimpleNamespace(text=text)
+
+    async def generate_content_stream(self, model, contents, config=None):
+        self.calls += 1
+        text = json.dumps({"sentiment": "Neutral", "justification": "Respuesta simulada para benchmark."})
+        delay = self.latency.next()
+
+        async def chunks():
+            # The same total latency as a plain call, spread over a few chunks
+            for start in range(0, len(text), 16):
+                await asyncio.sleep(delay * 16 / len(text))
+                yield SimpleNamespace(text=text[start:start + 16])
+
+        return chunks()
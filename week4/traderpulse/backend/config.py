@@ -1,5 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from pathlib import Path
+from typing import Optional
 
 class Settings(BaseSettings):
     APP_NAME: str = "TraderPulse API"
@@ -11,6 +13,109 @@ class Settings(BaseSettings):
     # CORS (comma separated list of origins)
     CORS_ORIGINS: str = "http://localhost:3000"
 
+    # Upstream market data (providers are synchronous, so calls run on a bounded thread pool)
+    UPSTREAM_MAX_WORKERS: int = 8
+
+    # Market data provider: "yfinance" (live), "record" (live + capture) or "replay" (offline)
+    MARKET_DATA_PROVIDER: str = "yfinance"
+    MARKET_DATA_RECORDINGS_DIR: str = str(Path(__file__).resolve().parent / "var" / "recordings")
+    # Exchange time zone: a live quote belongs to the daily bar of this zone's trading date
+    MARKET_TIMEZONE: str = "America/New_York"
+    # Injected latency for the replay provider (milliseconds)
+    REPLAY_LATENCY_MS: float = 0.0
+    REPLAY_JITTER_MS: float = 0.0
+
+    # In-process market data cache (seconds)
+    QUOTE_CACHE_TTL: float = 15.0
+    HISTORY_CACHE_TTL: float = 300.0
+    # Intraday bars are re-fetched (only those since the last one) and intraday series rebuilt this often
+    INTRADAY_CACHE_TTL: float = 60.0
+    # Expired entries are still served for this long while they refresh in the background
+    CACHE_STALE_TTL: float = 120.0
+    CACHE_MAX_ENTRIES: int = 512
+
+    # Local OHLCV bar store (daily history is only fetched for missing date ranges)
+    BAR_STORE_DIR: str = str(Path(__file__).resolve().parent / "var" / "bars")
+    # Delta segments per symbol before they are compacted into the base files
+    BAR_STORE_MAX_SEGMENTS: int = 8
+
+    # Cache tier shared by all worker processes on the host (SQLite in WAL mode); only one
+    # worker refreshes a key at a time. Unset, it is on only when WEB_CONCURRENCY > 1.
+    SHARED_CACHE_ENABLED: Optional[bool] = None
+    SHARED_CACHE_PATH: str = str(Path(__file__).resolve().parent / "var" / "shared_cache.sqlite")
+    # A worker's refresh lease on a key expires after this long if it never releases it
+    SHARED_CACHE_LEASE_SECONDS: float = 10.0
+    # How often workers waiting on another worker's lease check for its result
+    SHARED_CACHE_POLL_SECONDS: float = 0.05
+
+    # Upstream request budgets: a token bucket per upstream (requests per second, 0 disables).
+    # The rate backs off on throttling/errors and recovers on success; calls that would
+    # wait longer than RATE_LIMIT_MAX_WAIT are shed (stale data or 503 + Retry-After).
+    MARKET_DATA_RATE_LIMIT: float = 5.0
+    MARKET_DATA_BURST: int = 20
+    GEMINI_RATE_LIMIT: float = 2.0
+    GEMINI_BURST: int = 10
+    RATE_LIMIT_MAX_WAIT: float = 2.0
+    RATE_LIMIT_MAX_QUEUE: int = 256
+    # Worker processes on the host (uvicorn --workers). The budgets above are for the whole
+    # host and each worker's limiters get an even share of them.
+    WEB_CONCURRENCY: int = 1
+
+    # Symbol universe for /symbols/search (CSV: symbol,name,exchange,type, most popular first)
+    SYMBOLS_FILE: str = str(Path(__file__).resolve().parent / "data" / "symbols.csv")
+
+    # Default cap on points returned per chart series (LTTB downsampling)
+    HISTORY_MAX_POINTS: int = 1000
+
+    # Streaming quotes (/api/v1/stream)
+    STREAM_POLL_INTERVAL: float = 5.0
+    # Clients that cannot take a message within this many seconds are disconnected
+    STREAM_SEND_TIMEOUT: float = 5.0
+
+    # Background refresher: keeps recently requested symbols warm (seconds)
+    REFRESHER_ENABLED: bool = True
+    REFRESH_MIN_INTERVAL: float = 5.0
+    REFRESH_MAX_INTERVAL: float = 120.0
+    # Symbols nobody requested for this long stop being refreshed
+    REFRESH_IDLE_TTL: float = 900.0
+    REFRESH_DEMAND_HALF_LIFE: float = 300.0
+
+    # Sentiment cache: keyed by symbol + change-percent bucket
+    SENTIMENT_CACHE_TTL: float = 600.0
+    SENTIMENT_CACHE_MAX_ENTRIES: int = 256
+    SENTIMENT_BUCKET_PCT: float = 0.5
+    # A cached analysis is discarded once the price moves more than this percent
+    SENTIMENT_INVALIDATE_PCT: float = 1.0
+
+    # Gamification: per-user points and badges in an embedded SQLite database.
+    # Increments are buffered in memory and flushed in one transaction every GAMIFICATION_FLUSH_INTERVAL seconds.
+    GAMIFICATION_DB_PATH: str = str(Path(__file__).resolve().parent / "var" / "gamification.sqlite")
+    GAMIFICATION_FLUSH_INTERVAL: float = 2.0
+    # How long a worker serves a user's cached totals before re-reading them (other workers' points)
+    GAMIFICATION_CACHE_TTL: float = 60.0
+    GAMIFICATION_POINTS_PER_ANALYSIS: int = 10
+
+    # Gemini call limits
+    GEMINI_MAX_CONCURRENCY: int = 4
+    GEMINI_TIMEOUT_SECONDS: float = 8.0
+    # How long a sentiment request waits for Gemini before answering with the local score (0 waits for Gemini)
+    SENTIMENT_LATENCY_BUDGET_SECONDS: float = 2.5
+    # Consecutive failures before the breaker opens, and how long it stays open
+    GEMINI_BREAKER_FAILURES: int = 5
+    GEMINI_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Sentiment micro-batching: concurrent requests within this window share one Gemini call
+    SENTIMENT_BATCH_WINDOW_MS: float = 15.0
+    SENTIMENT_BATCH_MAX_SIZE: int = 20
+
+    # Response compression (brotli when installed, else gzip); smaller bodies are sent as-is
+    COMPRESSION_MIN_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+
+    # Event loop lag probe for /metrics (seconds between probes)
+    LOOP_LAG_PROBE_INTERVAL: float = 0.5
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 @lru_cache
@@ -1,13 +1,55 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from . import metrics
+from .compression import CompressionMiddleware
 from .config import get_settings
 from .routers import api
+from .services import ai_service, concurrency, gamification, providers, refresher, stream_hub, symbol_index
+import asyncio
 
 settings = get_settings()
 
+loop_lag_probe = metrics.LoopLagProbe(settings.LOOP_LAG_PROBE_INTERVAL)
+
+def _warm_up():
+    """
+    Imports the market data stack (provider SDK, pandas) that the first
+    market requests would otherwise load on demand.
+    """
+    providers.get_provider()
+    import pandas  # noqa: F401
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy SDKs (Gemini, yfinance/pandas) are imported lazily; warm them on
+    # worker threads so the first requests don't pay for the imports
+    ai_service.start()
+    warming = asyncio.get_running_loop().run_in_executor(None, _warm_up)
+    # Symbol search index: a few milliseconds to build from SYMBOLS_FILE
+    symbol_index.load()
+    loop_lag_probe.start()
+    gamification.get_store().start()
+    if settings.REFRESHER_ENABLED:
+        refresher.get_refresher().start()
+    yield
+    await loop_lag_probe.stop()
+    await refresher.get_refresher().stop()
+    await stream_hub.shutdown()
+    # Write the points earned since the last flush
+    await gamification.get_store().stop()
+    await ai_service.close()
+    try:
+        await warming
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+    # Release the upstream thread pool on shutdown
+    concurrency.shutdown_executor()
+
 app = FastAPI(
     title=settings.APP_NAME,
-    version=settings.VERSION
+    version=settings.VERSION,
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -21,6 +63,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY
+)
+
+# Outermost, so latency includes compression and CORS handling
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include Routers
 app.include_router(api.router)
 
@@ -28,6 +80,13 @@ app.include_router(api.router)
 def read_root():
     return {"message": "TraderPulse API is running"}
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """
+    Prometheus text exposition of request, upstream, cache and event loop metrics.
+    """
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,316 @@
+import asyncio
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[str, Dict[str, str], float]
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Metrics are updated from executor threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name + "_total", dict(zip(self.labelnames, key)), value
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> float:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0.0
+
+    def sum(self, **labels) -> float:
+        state = self._values.get(self._key(labels))
+        return state[-2] if state else 0.0
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield self.name + "_sum", labels, state[-2]
+            yield self.name + "_count", labels, state[-1]
+
+class Registry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text
+    exposition format. Collectors are called at scrape time for values that
+    are already tracked elsewhere (e.g. cache hit counters).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[_Metric, Iterable[Sample]]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[_Metric, Iterable[Sample]]]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        families = [(metric, metric.samples()) for metric in self._metrics.values()]
+        for collector in self._collectors:
+            families.extend(collector())
+
+        lines = []
+        for metric, samples in families:
+            family = metric.name + "_total" if metric.kind == "counter" else metric.name
+            lines.append(f"# HELP {family} {metric.documentation}")
+            lines.append(f"# TYPE {family} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+http_request_duration = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+http_requests_in_flight = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."
+)
+upstream_requests = REGISTRY.counter(
+    "upstream_requests", "Calls to upstream services by outcome.", ("upstream", "operation", "outcome")
+)
+upstream_duration = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Upstream call latency, including failed calls.", ("upstream", "operation")
+)
+event_loop_lag = REGISTRY.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran the lag probe's timer.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+event_loop_lag_last = REGISTRY.gauge(
+    "event_loop_lag_last_seconds", "Most recent event loop lag probe reading."
+)
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """
+    Times one upstream call and counts it as "success" or "error".
+    Callers can record other outcomes (timeouts, rejections) themselves.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        upstream_requests.inc(upstream=upstream, operation=operation, outcome="error")
+        raise
+    else:
+        upstream_requests.inc(upstream=upstream, operation=operation, outcome="success")
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, upstream=upstream, operation=operation)
+
+_cache_requests = Counter("cache_requests", "Cache lookups by result.", ("cache", "result"))
+_cache_evictions = Counter("cache_evictions", "Entries evicted to stay under max_entries.", ("cache",))
+_cache_entries = Gauge("cache_entries", "Entries currently held.", ("cache",))
+
+_cache_sources: List[Callable[[], Iterable]] = []
+
+def register_caches(caches: Callable[[], Iterable]):
+    """
+    Exports hit/stale/miss/eviction counters and sizes of TTLCache instances.
+    `caches` is called on every scrape, so the counters the caches already
+    keep are read as they are instead of being counted twice.
+    """
+    _cache_sources.append(caches)
+
+def _collect_caches():
+    requests, evictions, entries = [], [], []
+    for source in _cache_sources:
+        for cache in source():
+            for result, value in (("hit", cache.hits), ("stale", cache.stale_hits), ("miss", cache.misses)):
+                requests.append(("cache_requests_total", {"cache": cache.name, "result": result}, value))
+            evictions.append(("cache_evictions_total", {"cache": cache.name}, cache.evictions))
+            entries.append(("cache_entries", {"cache": cache.name}, len(cache)))
+    return [(_cache_requests, requests), (_cache_evictions, evictions), (_cache_entries, entries)]
+
+REGISTRY.add_collector(_collect_caches)
+
+class MetricsMiddleware:
+    """
+    Records per-route latency histograms and the in-flight request gauge.
+    Routes are labelled by their template (e.g. /api/v1/stocks/{symbol}) so
+    label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status)
+            )
+
+class LoopLagProbe:
+    """
+    Sleeps for `interval` seconds in a loop and records how much later than
+    requested the event loop woke it up. Sustained lag means something is
+    blocking the loop or it is saturated.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            event_loop_lag.observe(lag)
+            event_loop_lag_last.set(lag)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,64 @@
+from dataclasses import asdict, dataclass, is_dataclass
+from typing import Optional
+
+@dataclass(frozen=True, slots=True)
+class StockQuote:
+    """
+    Snapshot of a symbol's price. Numeric fields are plain numbers:
+    `change_percent` is in percent (0.61 means +0.61%).
+    """
+    symbol: str
+    price: float
+    change_percent: float
+    volume: int
+    as_of: str  # ISO 8601, UTC
+    # Mean daily volume of the preceding sessions, when the provider reports it
+    average_volume: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "price": self.price,
+            "change_percent": self.change_percent,
+            "volume": self.volume,
+            "average_volume": self.average_volume,
+            "as_of": self.as_of
+        }
+
+    def same_values(self, other: "StockQuote") -> bool:
+        """
+        True when only `as_of` differs, i.e. a refetch that brought nothing new.
+        """
+        return (self.symbol, self.price, self.change_percent, self.volume) == \
+            (other.symbol, other.price, other.change_percent, other.volume)
+
+@dataclass(frozen=True, slots=True)
+class PricePoint:
+    """
+    One chart point: bar date (or date and time for intraday bars) and close.
+    """
+    date: str
+    close: float
+
+@dataclass(frozen=True, slots=True)
+class Symbol:
+    """
+    One entry of the searchable symbol universe (`data/symbols.csv`).
+    `type` is equity, etf, index, crypto, currency or future.
+    """
+    symbol: str
+    name: str
+    exchange: str
+    type: str
+
+def to_builtin(value):
+    """
+    `default=` hook for encoders that do not understand the models (stdlib json, msgpack).
+    """
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
@@ -1,52 +1,430 @@
-from fastapi import APIRouter, HTTPException
-from ..services import market_service, ai_service
+import asyncio
+import math
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from ..config import get_settings
+from ..services import market_service, ai_service, gamification, indicators, refresher, stream_hub, symbol_index
+from ..services.rate_limiter import RateLimited
+from .responses import NO_STORE, FastJSONResponse, cached_json, dumps, latest_as_of, public_policy
 
-router = APIRouter(prefix="/api/v1")
+router = APIRouter(prefix="/api/v1", default_response_class=FastJSONResponse)
+
+MAX_BATCH_SYMBOLS = 50
+
+# The symbol universe only changes on deploy
+SYMBOL_SEARCH_POLICY = public_policy(3600, 86400)
+
+def _parse_symbols(symbols: str):
+    """
+    Parses a comma separated symbol list, normalizing case and removing duplicates.
+    """
+    parsed = []
+    for symbol in symbols.split(","):
+        symbol = symbol.strip().upper()
+        if symbol and symbol not in parsed:
+            parsed.append(symbol)
+
+    if not parsed:
+        raise HTTPException(status_code=400, detail="At least one symbol is required")
+    if len(parsed) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per request")
+    return parsed
+
+def _market_policy() -> str:
+    """
+    Market responses may be reused for as long as the server would serve its own cached quote.
+    """
+    settings = get_settings()
+    return public_policy(settings.QUOTE_CACHE_TTL, settings.CACHE_STALE_TTL)
+
+def _rate_limited(e: RateLimited) -> HTTPException:
+    """
+    503 for a request shed by an upstream rate limiter with nothing cached to serve instead.
+    """
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after))), "Cache-Control": NO_STORE}
+    )
+
+def _sentiment_policy(*analyses: dict) -> str:
+    """
+    Local scores stand in for a Gemini answer that may be ready on the next request, so they are not reused.
+    """
+    if any(analysis.get("source") == "local" for analysis in analyses):
+        return NO_STORE
+    return _market_policy()
+
+def _no_store(response: Response):
+    response.headers["Cache-Control"] = NO_STORE
+
+def _user_id(x_user_id: Optional[str] = Header(None, pattern=r"^[A-Za-z0-9_.-]{1,64}$")) -> str:
+    """
+    The caller's id from the `X-User-Id` header (the frontend keeps one per browser).
+    Requests without it share the anonymous profile.
+    """
+    return x_user_id or gamification.ANONYMOUS
+
+def _credit(user_id: str, symbol: str, analysis: dict):
+    gamification.get_store().record_analysis(user_id, symbol, analysis.get("sentiment"))
+
+@router.get("/stocks")
+async def get_stocks_batch(request: Request, symbols: str = Query(..., description="Comma separated symbols, e.g. AAPL,MSFT")):
+    """
+    Returns real-time quotes for several symbols in one request.
+    Unknown symbols are reported in `errors` instead of failing the batch.
+    """
+    symbol_list = _parse_symbols(symbols)
+    try:
+        result = await market_service.get_realtime_stock_data_batch(symbol_list)
+    except RateLimited as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    as_of = latest_as_of(*[quote.as_of for quote in result["quotes"].values()])
+    return cached_json(request, result, _market_policy(), as_of)
+
+@router.get("/symbols/search")
+async def search_symbols(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=64, description="Ticker or company name fragment, typos allowed"),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Returns ranked ticker and company-name matches from the local symbol universe.
+    Never calls the market data provider.
+    """
+    results = symbol_index.get_index().search(q, limit)
+    return cached_json(request, {"query": q, "results": results}, SYMBOL_SEARCH_POLICY)
 
 @router.get("/stocks/{symbol}")
-async def get_stock_data(symbol: str):
+async def get_stock_data(
+    request: Request,
+    symbol: str,
+    period: str = Query("1mo", description="History range, e.g. 1d, 5d, 1mo, 1y, 5y, max"),
+    interval: str = Query("1d", description="Bar size: 1m, 5m, 15m, 30m, 1h or 1d"),
+    max_points: Optional[int] = Query(None, ge=3, le=5000, description="Downsample the history to at most this many points")
+):
     """
     Returns current price, change, volume, and historical data for charting.
     """
+    try:
+        market_service.validate_history_range(period, interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The quote comes first: an unknown symbol must not cost a history fetch.
+    # Cancelling a concurrent history call would not help, since the fetch is
+    # shared (and shielded) between callers and keeps its upstream slot.
     try:
         realtime_data = await market_service.get_realtime_stock_data(symbol)
         if not realtime_data:
             raise HTTPException(status_code=404, detail="Symbol not found")
-            
-        historical_data = await market_service.get_historical_data(symbol)
-        
-        return {
-            "realtime": realtime_data,
-            "historical": historical_data
-        }
+        series = await market_service.get_historical_series(
+            symbol,
+            period=period,
+            interval=interval,
+            max_points=max_points or get_settings().HISTORY_MAX_POINTS
+        )
+    except HTTPException:
+        raise
+    except RateLimited as e:
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/sentiment/{symbol}")
-async def get_sentiment(symbol: str):
+    content = {
+        "realtime": realtime_data,
+        "historical": series.to_points() if series else []
+    }
+    as_of = latest_as_of(realtime_data.as_of, series.as_of if series else None)
+    return cached_json(request, content, _market_policy(), as_of)
+
+@router.get("/indicators/{symbol}")
+async def get_indicators(
+    request: Request,
+    symbol: str,
+    period: str = Query("1y", description="History range, e.g. 1d, 5d, 1mo, 1y, 5y, max"),
+    interval: str = Query("1d", description="Bar size: 1m, 5m, 15m, 30m, 1h or 1d"),
+    max_points: Optional[int] = Query(None, ge=3, le=5000, description="Downsample the result to at most this many points")
+):
     """
-    Returns AI-generated sentiment analysis.
+    Returns SMA, EMA, RSI, MACD, Bollinger bands and VWAP over the symbol's history,
+    plus the latest value of each.
     """
     try:
-        # We need some market data context for the AI
+        market_service.validate_history_range(period, interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        result = await indicators.get_indicators(
+            symbol,
+            period=period,
+            interval=interval,
+            max_points=max_points or get_settings().HISTORY_MAX_POINTS
+        )
+    except RateLimited as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not result:
+        raise HTTPException(status_code=404, detail="Symbol not found")
+    return cached_json(request, result, _market_policy(), result["as_of"])
+
+def _ndjson(message: dict) -> bytes:
+    return dumps(message) + b"\n"
+
+def _sse(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+@router.get("/dashboard/{symbol}")
+async def get_dashboard(
+    symbol: str,
+    user_id: str = Depends(_user_id),
+    period: str = Query("1mo", description="History range, e.g. 1d, 5d, 1mo, 1y, 5y, max"),
+    interval: str = Query("1d", description="Bar size: 1m, 5m, 15m, 30m, 1h or 1d"),
+    max_points: Optional[int] = Query(None, ge=3, le=5000, description="Downsample the history to at most this many points"),
+    sentiment: bool = Query(True, description="Include the sentiment (false when the client streams it separately)")
+):
+    """
+    Returns everything the dashboard shows for one symbol as an NDJSON stream.
+
+    The quote is looked up first, so an unknown symbol costs no history
+    fetch; the history and sentiment then load concurrently, the sentiment
+    reusing the same quote snapshot, so one page view costs one quote lookup. Each
+    part is sent as soon as it is ready, one JSON object per line:
+    `{"type": "quote" | "history" | "sentiment", "data": ...}`, or
+    `{"type": "error", "part": ..., "detail": ...}` if a part fails.
+    """
+    try:
+        market_service.validate_history_range(period, interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    symbol = symbol.upper()
+    # The quote comes first, as in get_stock_data: an unknown symbol must not
+    # cost a history fetch, and the shared fetch cannot be cancelled
+    try:
         realtime_data = await market_service.get_realtime_stock_data(symbol)
-        if not realtime_data:
-            raise HTTPException(status_code=404, detail="Symbol not found")
-            
+    except RateLimited as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not realtime_data:
+        raise HTTPException(status_code=404, detail="Symbol not found")
+
+    history_task = asyncio.ensure_future(market_service.get_historical_data(
+        symbol,
+        period=period,
+        interval=interval,
+        max_points=max_points or get_settings().HISTORY_MAX_POINTS
+    ))
+
+    parts = {history_task: "history"}
+    sentiment_task = None
+    if sentiment:
+        sentiment_task = asyncio.ensure_future(ai_service.analyze_sentiment(symbol, realtime_data))
+        parts[sentiment_task] = "sentiment"
+
+    async def stream():
+        pending = set(parts)
+        try:
+            yield _ndjson({"type": "quote", "data": realtime_data})
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        yield _ndjson({"type": "error", "part": parts[task], "detail": str(task.exception())})
+                    else:
+                        if task is sentiment_task:
+                            _credit(user_id, symbol, task.result())
+                        yield _ndjson({"type": parts[task], "data": task.result()})
+        finally:
+            # Client went away: stop waiting on whatever is left
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers={"Cache-Control": NO_STORE})
+
+@router.websocket("/stream")
+async def stream_quotes(websocket: WebSocket, symbols: str = ""):
+    """
+    Streams quote updates over a WebSocket.
+
+    Subscribe with `?symbols=AAPL,MSFT` and/or by sending
+    `{"action": "subscribe" | "unsubscribe", "symbols": [...]}`.
+    Messages: `{"type": "quotes", "quotes": {...}, "errors": {...}}`.
+    """
+    await websocket.accept()
+    hub = stream_hub.get_hub()
+    initial = _parse_symbols(symbols) if symbols.strip(",").strip() else []
+    subscription = hub.subscribe(initial)
+    send_timeout = get_settings().STREAM_SEND_TIMEOUT
+
+    async def send_updates():
+        while True:
+            update = await subscription.next_update()
+            try:
+                await asyncio.wait_for(websocket.send_text(dumps(update).decode()), timeout=send_timeout)
+            except asyncio.TimeoutError:
+                # Slow consumer: drop it rather than buffering for it
+                await websocket.close(code=1013, reason="Client too slow")
+                return
+
+    async def receive_commands():
+        while True:
+            message = await websocket.receive_json()
+            requested = [str(s).strip().upper() for s in message.get("symbols", []) if str(s).strip()]
+            if message.get("action") == "subscribe":
+                room = MAX_BATCH_SYMBOLS - len(subscription.symbols)
+                hub.update(subscription, add=requested[:max(room, 0)])
+            elif message.get("action") == "unsubscribe":
+                hub.update(subscription, remove=requested)
+
+    sender = asyncio.create_task(send_updates())
+    receiver = asyncio.create_task(receive_commands())
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        hub.unsubscribe(subscription)
+        for task in (sender, receiver):
+            task.cancel()
+        for task in (sender, receiver):
+            try:
+                await task
+            except (asyncio.CancelledError, WebSocketDisconnect):
+                pass
+            except Exception as e:
+                print(f"Stream connection closed: {e}")
+
+@router.get("/sentiment")
+async def get_sentiment_batch(
+    request: Request,
+    symbols: str = Query(..., description="Comma separated symbols, e.g. AAPL,MSFT"),
+    user_id: str = Depends(_user_id)
+):
+    """
+    Returns AI-generated sentiment for several symbols.
+    Uncached symbols are analyzed together in a single Gemini call.
+    """
+    symbol_list = _parse_symbols(symbols)
+    try:
+        quotes = await market_service.get_realtime_stock_data_batch(symbol_list)
+        sentiments = await ai_service.analyze_sentiment_batch(quotes["quotes"])
+    except RateLimited as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for symbol, analysis in sentiments.items():
+        _credit(user_id, symbol, analysis)
+    # Each analysis is only as recent as the quote it was generated from
+    as_of = latest_as_of(*[quote.as_of for quote in quotes["quotes"].values()])
+    return cached_json(request, {"sentiments": sentiments, "errors": quotes["errors"]},
+                       _sentiment_policy(*sentiments.values()), as_of)
+
+async def _sentiment_context(symbol: str):
+    """
+    The quote a sentiment analysis is based on, or the HTTP error to return instead.
+    """
+    try:
+        realtime_data = await market_service.get_realtime_stock_data(symbol)
+    except RateLimited as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not realtime_data:
+        raise HTTPException(status_code=404, detail="Symbol not found")
+    return realtime_data
+
+@router.get("/sentiment/{symbol}/stream")
+async def stream_sentiment(symbol: str, user_id: str = Depends(_user_id)):
+    """
+    Streams AI-generated sentiment analysis as Server-Sent Events: `sentiment`
+    with the label as soon as Gemini has produced it, `justification` events
+    with the explanation as it is generated (`{"text": ...}` pieces to append),
+    and `done` with the complete, validated result, which replaces anything
+    streamed before it.
+    """
+    symbol = symbol.upper()
+    realtime_data = await _sentiment_context(symbol)
+
+    async def events():
+        async for event, data in ai_service.stream_sentiment(symbol, realtime_data):
+            if event == "done":
+                _credit(user_id, symbol, data)
+            yield _sse(event, data)
+
+    # X-Accel-Buffering: keep reverse proxies from holding the events back
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": NO_STORE, "X-Accel-Buffering": "no"})
+
+@router.get("/sentiment/{symbol}")
+async def get_sentiment(request: Request, symbol: str, user_id: str = Depends(_user_id)):
+    """
+    Returns AI-generated sentiment analysis, or the local momentum score
+    (`"source": "local"`) when Gemini is slow or unavailable.
+    """
+    # We need some market data context for the AI
+    realtime_data = await _sentiment_context(symbol)
+
+    try:
         analysis = await ai_service.analyze_sentiment(symbol, realtime_data)
-        return analysis
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    _credit(user_id, symbol, analysis)
+    return cached_json(request, analysis, _sentiment_policy(analysis), realtime_data.as_of)
 
-@router.get("/gamification/status")
-async def get_gamification_status():
+@router.get("/gamification/status", dependencies=[Depends(_no_store)])
+async def get_gamification_status(user_id: str = Depends(_user_id)):
     """
-    Returns mock data for user points and badges.
+    Returns the caller's level, analysis points, badges and progress to the next level.
+    Points are earned by requesting sentiment analyses.
     """
-    # Mock data as per requirements
-    return {
-        "investor_level": "Intermedio",
-        "analysis_points": 1250,
-        "badges": ["Primer Análisis", "Toro de Oro", "Visualizador"],
-        "next_level_progress": 75 # percent
-    }
+    return await gamification.get_store().aget_status(user_id)
+
+@router.get("/system/cache", dependencies=[Depends(_no_store)])
+async def get_cache_stats():
+    """
+    Returns hit/miss/eviction counters and entry ages for the market data and sentiment caches.
+    """
+    return {**(await market_service.cache_stats()), "sentiment": ai_service.cache_stats()}
+
+@router.get("/system/stream", dependencies=[Depends(_no_store)])
+async def get_stream_stats():
+    """
+    Returns subscriber count, polled symbols and conflation counters for the streaming hub.
+    """
+    return stream_hub.get_hub().stats()
+
+@router.get("/system/refresher", dependencies=[Depends(_no_store)])
+async def get_refresher_stats():
+    """
+    Returns queue depth, scheduling lag and per-symbol refresh rates for the background refresher.
+    """
+    return refresher.get_refresher().stats()
+
+@router.get("/system/rate-limits", dependencies=[Depends(_no_store)])
+async def get_rate_limit_stats():
+    """
+    Returns the current rate, tokens, queue and shed counters of each upstream's rate limiter.
+    """
+    return {"market_data": market_service.limiter_stats(), "gemini": ai_service.limiter_stats()}
+
+@router.get("/system/gamification", dependencies=[Depends(_no_store)])
+async def get_gamification_stats():
+    """
+    Returns pending increments and flush counters for the gamification store.
+    """
+    return gamification.get_store().stats()
+
+@router.get("/system/ai", dependencies=[Depends(_no_store)])
+async def get_ai_stats():
+    """
+    Returns Gemini circuit breaker state, call outcome counters and latency percentiles.
+    """
+    return ai_service.stats()
@@ -0,0 +1,128 @@
+import hashlib
+import json
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Optional, Tuple, Union
+
+from fastapi import Request, Response
+
+from ..models import to_builtin
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: without it clients always get JSON
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        # orjson encodes the slots dataclasses in models.py natively
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=to_builtin).encode("utf-8")
+
+def wants_msgpack(request: Request) -> bool:
+    """
+    True when the client explicitly accepts MessagePack and it is installed.
+    """
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "").lower()
+    return any(media_type in accept for media_type in MSGPACK_TYPES)
+
+def encode(request: Request, content: Any) -> Tuple[bytes, str]:
+    """
+    Serializes `content` as MessagePack or JSON depending on the Accept header.
+    """
+    if wants_msgpack(request):
+        return msgpack.packb(content, default=to_builtin), MSGPACK_TYPES[0]
+    return dumps(content), "application/json"
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with orjson when it is installed.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+# Cache-Control policies
+NO_STORE = "no-store"
+
+def public_policy(max_age: float, stale_while_revalidate: float = 0) -> str:
+    """
+    Lets browsers and a CDN reuse a response for `max_age` seconds, then serve
+    it stale for up to `stale_while_revalidate` seconds while revalidating.
+    """
+    policy = f"public, max-age={int(max_age)}"
+    if stale_while_revalidate:
+        policy += f", stale-while-revalidate={int(stale_while_revalidate)}"
+    return policy
+
+def to_timestamp(as_of: Union[str, float, None]) -> Optional[float]:
+    """
+    Accepts epoch seconds or an ISO 8601 string (as found in quotes' `as_of`).
+    """
+    if as_of is None:
+        return None
+    if isinstance(as_of, str):
+        try:
+            return datetime.fromisoformat(as_of).timestamp()
+        except ValueError:
+            return None
+    return float(as_of)
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison: a W/ prefix added by a proxy (e.g. after compression) still matches
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[float]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+def cached_json(request: Request, content: Any, cache_control: str,
+                as_of: Union[str, float, None] = None) -> Response:
+    """
+    Serializes `content` once (JSON, or MessagePack when the client asks for
+    it) and attaches validators: a strong ETag digest of the body and a
+    Last-Modified derived from the data's as-of time. Matching conditional
+    requests get an empty 304 instead of the payload.
+    """
+    body, media_type = encode(request, content)
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    last_modified = to_timestamp(as_of)
+
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def latest_as_of(*values: Union[str, float, None]) -> Optional[float]:
+    """
+    The most recent of several as-of times, ignoring missing ones.
+    """
+    timestamps = [t for t in map(to_timestamp, values) if t is not None]
+    return max(timestamps) if timestamps else None
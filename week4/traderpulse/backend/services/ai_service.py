@@ -1,44 +1,671 @@
-from google import genai
-from google.genai import types
+from .. import metrics
 from ..config import get_settings
+from ..models import StockQuote
+from . import indicators
+from .cache import TTLCache
+from .circuit_breaker import CircuitBreaker
+from .concurrency import SingleFlight
+from .rate_limiter import AdaptiveRateLimiter, RateLimited, worker_share
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
 import json
+import math
+import re
+import threading
+import time
 
 settings = get_settings()
 
-client = genai.Client(api_key=settings.GEMINI_API_KEY)
+# Gemini SDK client. Importing the SDK is the slowest part of startup, so the
+# client is built off the event loop once the app has started (see `start`)
+client = None
+_client_lock = threading.Lock()
+_client_starting = None
 
-async def analyze_sentiment(symbol: str, market_data: dict):
+# Sentiment results keyed by symbol + quantized market snapshot
+_sentiment_cache = TTLCache(
+    "sentiment",
+    ttl=settings.SENTIMENT_CACHE_TTL,
+    max_entries=settings.SENTIMENT_CACHE_MAX_ENTRIES
+)
+_inflight = SingleFlight()
+metrics.register_caches(lambda: (_sentiment_cache,))
+
+_breaker = CircuitBreaker(
+    "gemini",
+    failure_threshold=settings.GEMINI_BREAKER_FAILURES,
+    reset_timeout=settings.GEMINI_BREAKER_RESET_SECONDS
+)
+
+# This worker's share of the request budget for Gemini, separate from the market data one
+_rate, _burst = worker_share(settings.GEMINI_RATE_LIMIT, settings.GEMINI_BURST, settings.WEB_CONCURRENCY)
+_limiter = AdaptiveRateLimiter(
+    "gemini",
+    rate=_rate,
+    burst=_burst,
+    max_wait=settings.RATE_LIMIT_MAX_WAIT,
+    max_queue=settings.RATE_LIMIT_MAX_QUEUE
+)
+
+# Created per event loop on first use
+_semaphore = None
+_semaphore_loop = None
+
+# Recent successful call latencies (seconds) and call outcome counters
+_latencies = deque(maxlen=512)
+_counters = {"calls": 0, "batched_symbols": 0, "streams": 0, "successes": 0, "failures": 0, "timeouts": 0,
+             "rejected": 0, "shed": 0, "hedged": 0}
+
+def _ensure_client():
+    global client
+    with _client_lock:
+        if client is None:
+            from google import genai
+            client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        return client
+
+def start():
+    """
+    Starts building the Gemini client on a worker thread. Called from the
+    application lifespan so the server accepts requests while the SDK loads.
+    """
+    global _client_starting
+    if client is None:
+        _client_starting = asyncio.get_running_loop().run_in_executor(None, _ensure_client)
+
+async def get_client():
+    """
+    The Gemini client, waiting for (or doing) its construction if needed.
+    """
+    if client is not None:
+        return client
+    return await asyncio.to_thread(_ensure_client)
+
+async def close():
+    """
+    Closes the Gemini client's HTTP connections on shutdown.
+    """
+    global client, _client_starting
+    if _client_starting is not None:
+        try:
+            await _client_starting
+        except Exception as e:
+            print(f"Gemini client could not be created: {e}")
+        _client_starting = None
+    current, client = client, None
+    if current is None:
+        return
+    try:
+        aio_close = getattr(current.aio, "aclose", None)
+        if aio_close is not None:
+            await aio_close()
+        if hasattr(current, "close"):
+            current.close()
+    except Exception as e:
+        print(f"Error closing Gemini client: {e}")
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+        _semaphore_loop = loop
+    return _semaphore
+
+# Local momentum score: the weighted mean of features squashed into [-1, 1].
+# Scores at or beyond these thresholds are Bullish / Bearish.
+LOCAL_BULLISH = 0.25
+LOCAL_BEARISH = -0.25
+
+def _above(value: float) -> str:
+    return "por encima" if value >= 0 else "por debajo"
+
+def _momentum_features(quote: StockQuote, technicals: Dict[str, float]) -> List[Tuple[float, float, str]]:
+    """
+    `(weight, value in [-1, 1], reason)` for every feature that can be computed.
+    """
+    price = quote.price
+    change = quote.change_percent
+    features = [(0.4, math.tanh(change / 2),
+                 f"el precio {'sube' if change >= 0 else 'cae'} un {abs(change):.2f}% en la sesión")]
+    if not price:
+        return features
+
+    sma_20 = technicals.get("sma_20")
+    if sma_20:
+        gap = (price / sma_20 - 1) * 100
+        features.append((0.15, math.tanh(gap / 3), f"cotiza {_above(gap)} de su media de 20 sesiones"))
+        sma_50 = technicals.get("sma_50")
+        if sma_50:
+            trend = (sma_20 / sma_50 - 1) * 100
+            features.append((0.1, math.tanh(trend / 3), f"la media de 20 sesiones está {_above(trend)} de la de 50"))
+    histogram = technicals.get("macd_histogram")
+    if histogram is not None:
+        features.append((0.15, math.tanh(histogram / price * 200), f"el MACD está {_above(histogram)} de su señal"))
+    rsi = technicals.get("rsi_14")
+    if rsi is not None:
+        features.append((0.1, math.tanh((rsi - 50) / 20), f"el RSI(14) está en {rsi:.0f}"))
+    # Relative volume: heavy trading confirms the session's move, light trading weakens it.
+    # Early in the session the volume so far understates it, which only leans towards Neutral.
+    if quote.average_volume and quote.volume > 0 and change:
+        relative = quote.volume / quote.average_volume
+        direction = 1 if change > 0 else -1
+        features.append((0.15, direction * math.tanh(math.log(relative)),
+                         f"el volumen es {relative:.1f} veces su media reciente"))
+    # VWAP: where the volume traded, so heavy volume at lower prices reads as support
+    vwap = technicals.get("vwap")
+    if vwap:
+        gap = (price / vwap - 1) * 100
+        features.append((0.1, math.tanh(gap / 2), f"el precio está {_above(gap)} del VWAP"))
+    return features
+
+def local_sentiment(symbol: str, market_data: StockQuote) -> dict:
+    """
+    Deterministic sentiment computed from the snapshot in microseconds: the
+    session's change and relative volume, trend and momentum indicators and
+    the price against VWAP (indicators only when already in memory). Served, marked with
+    `"source": "local"`, whenever Gemini cannot answer in time or at all.
+    """
+    technicals = indicators.latest(symbol, market_data) or {}
+    features = _momentum_features(market_data, technicals)
+    score = sum(weight * value for weight, value, _ in features) / sum(weight for weight, _, _ in features)
+    if score >= LOCAL_BULLISH:
+        sentiment = "Bullish"
+    elif score <= LOCAL_BEARISH:
+        sentiment = "Bearish"
+    else:
+        sentiment = "Neutral"
+
+    strongest = sorted(features, key=lambda feature: -abs(feature[0] * feature[1]))
+    # The main reason, and the next one if it actually moved the score
+    reasons = " y ".join([strongest[0][2]] + [reason for weight, value, reason in strongest[1:2]
+                                              if abs(weight * value) >= 0.01])
+    return {
+        "sentiment": sentiment,
+        "justification": f"Estimación local por impulso, sin IA: {reasons}.",
+        "source": "local",
+        "score": round(score, 3)
+    }
+
+def _percentile(values, fraction: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 4)
+
+def limiter_stats() -> dict:
+    return _limiter.stats()
+
+def stats() -> dict:
+    """
+    Circuit breaker state and Gemini call timings.
+    """
+    latencies = list(_latencies)
+    calls = _counters["calls"]
+    return {
+        "breaker": _breaker.stats(),
+        "rate_limiter": _limiter.stats(),
+        "max_concurrency": settings.GEMINI_MAX_CONCURRENCY,
+        "timeout_seconds": settings.GEMINI_TIMEOUT_SECONDS,
+        **_counters,
+        "avg_batch_size": round(_counters["batched_symbols"] / calls, 2) if calls else None,
+        "latency_seconds": {
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "max": round(max(latencies), 4) if latencies else None
+        }
+    }
+
+def _snapshot_key(symbol: str, market_data: StockQuote):
     """
-    Uses Gemini 3 Flash to analyze market data and return sentiment in Spanish.
+    Quantizes the market snapshot so small moves share a cached analysis:
+    change percent is bucketed into SENTIMENT_BUCKET_PCT wide buckets.
     """
+    return (symbol.upper(), math.floor(market_data.change_percent / settings.SENTIMENT_BUCKET_PCT))
+
+def _price_moved(cached_price: float, price: float) -> bool:
+    if not cached_price:
+        return False
+    return abs(price - cached_price) / cached_price * 100 > settings.SENTIMENT_INVALIDATE_PCT
+
+def _cached_result(key, price: float) -> Optional[dict]:
+    cached = _sentiment_cache.get(key)
+    if cached is not None and not _price_moved(cached["price"], price):
+        return cached["result"]
+    return None
+
+def cache_stats() -> dict:
+    return _sentiment_cache.stats()
+
+def clear_cache():
+    _sentiment_cache.clear()
+
+async def analyze_sentiment(symbol: str, market_data: StockQuote):
+    """
+    Returns the sentiment for a market snapshot, reusing a cached analysis
+    while the change percent stays in the same bucket and the price has not
+    moved more than SENTIMENT_INVALIDATE_PCT since it was generated.
+
+    Waits at most SENTIMENT_LATENCY_BUDGET_SECONDS for Gemini, then answers
+    with the local score. The Gemini call carries on and caches its result
+    for the next caller.
+    """
+    key = _snapshot_key(symbol, market_data)
+    price = market_data.price
+
+    cached = _cached_result(key, price)
+    if cached is not None:
+        return cached
+
+    call = _inflight.do(key, lambda: _analyze_and_cache(key, symbol, market_data, price))
+    budget = settings.SENTIMENT_LATENCY_BUDGET_SECONDS
+    if budget <= 0:
+        return await call
+    try:
+        # SingleFlight shields the shared call, so giving up here does not cancel it
+        return await asyncio.wait_for(call, timeout=budget)
+    except asyncio.TimeoutError:
+        _counters["hedged"] += 1
+        return local_sentiment(symbol, market_data)
+
+async def analyze_sentiment_batch(snapshots: Dict[str, StockQuote]) -> Dict[str, dict]:
+    """
+    Analyzes several symbols at once. Cache misses are collected by the
+    micro-batcher, so they reach Gemini as a single prompt.
+    """
+    symbols = list(snapshots)
+    results = await asyncio.gather(*[analyze_sentiment(symbol, snapshots[symbol]) for symbol in symbols])
+    return dict(zip(symbols, results))
+
+async def _analyze_and_cache(key, symbol: str, market_data: StockQuote, price: float):
+    result, ok = await _get_batcher().submit(symbol.upper(), market_data)
+    if ok:
+        _sentiment_cache.set(key, {"result": result, "price": price})
+    return result
+
+class _SentimentBatcher:
+    """
+    Collects single-symbol sentiment requests for up to
+    SENTIMENT_BATCH_WINDOW_MS and sends them to Gemini as one prompt.
+    Each waiting caller receives the entry for its own symbol.
+    """
+
+    def __init__(self, window: float, max_size: int):
+        self.window = window
+        self.max_size = max_size
+        self._pending: Dict[str, StockQuote] = {}
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def submit(self, symbol: str, market_data: StockQuote) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        # The same symbol twice in one window shares a slot (latest snapshot wins)
+        self._pending[symbol] = market_data
+        self._waiters.setdefault(symbol, []).append(future)
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        waiters, self._waiters = self._waiters, {}
+        task = asyncio.ensure_future(self._run(pending, waiters))
+        _batch_tasks.add(task)
+        task.add_done_callback(_batch_tasks.discard)
+
+    async def _run(self, pending: Dict[str, StockQuote], waiters: Dict[str, List[asyncio.Future]]):
+        try:
+            results = await _generate_sentiments(pending)
+        except Exception as e:
+            print(f"Sentiment batch failed: {e}")
+            results = {}
+        for symbol, futures in waiters.items():
+            result = results.get(symbol)
+            # Local scores are not cached, so the next caller tries Gemini again
+            outcome = (result, True) if result is not None else (local_sentiment(symbol, pending[symbol]), False)
+            for future in futures:
+                if not future.done():
+                    future.set_result(outcome)
+
+_batcher = None
+_batcher_loop = None
+# Strong references to in-flight batch and stream calls
+_batch_tasks = set()
+
+def _get_batcher() -> _SentimentBatcher:
+    global _batcher, _batcher_loop
+    loop = asyncio.get_running_loop()
+    if _batcher is None or _batcher_loop is not loop:
+        _batcher = _SentimentBatcher(settings.SENTIMENT_BATCH_WINDOW_MS / 1000, settings.SENTIMENT_BATCH_MAX_SIZE)
+        _batcher_loop = loop
+    return _batcher
+
+def _record_call(outcome: str, started: float):
+    metrics.upstream_requests.inc(upstream="gemini", operation="sentiment", outcome=outcome)
+    metrics.upstream_duration.observe(time.perf_counter() - started, upstream="gemini", operation="sentiment")
+
+async def _admit() -> bool:
+    """
+    Takes a Gemini request token and checks the circuit breaker. False when
+    the call must be skipped (the caller falls back).
+    """
+    try:
+        await _limiter.acquire()
+    except RateLimited:
+        _counters["shed"] += 1
+        metrics.upstream_requests.inc(upstream="gemini", operation="sentiment", outcome="shed")
+        return False
+    if not _breaker.allow():
+        _counters["rejected"] += 1
+        metrics.upstream_requests.inc(upstream="gemini", operation="sentiment", outcome="rejected")
+        return False
+    return True
+
+def _record_success(started: float):
+    _counters["successes"] += 1
+    _latencies.append(time.perf_counter() - started)
+    _breaker.record_success()
+    _limiter.record_success()
+    _record_call("success", started)
+
+def _record_failure(error: Exception, started: float, symbols: List[str]):
+    _breaker.record_failure()
+    if isinstance(error, asyncio.TimeoutError):
+        _counters["timeouts"] += 1
+        _limiter.record_failure()
+        _record_call("timeout", started)
+        print(f"Gemini API timeout after {settings.GEMINI_TIMEOUT_SECONDS}s for {symbols}")
+    else:
+        _counters["failures"] += 1
+        _limiter.record_failure(error)
+        _record_call("error", started)
+        print(f"Gemini API Error: {error}")
+
+def _validate(entry) -> bool:
+    return (
+        isinstance(entry, dict)
+        and entry.get("sentiment") in ("Bullish", "Bearish", "Neutral")
+        and isinstance(entry.get("justification"), str)
+    )
+
+def _market_context(symbol: str, quote: StockQuote) -> dict:
+    """
+    The quote, plus daily technical indicators when they are already in memory
+    (nothing is fetched for them).
+    """
+    context = quote.to_dict()
+    technicals = indicators.latest(symbol, quote)
+    if technicals:
+        context["indicators"] = {name: round(value, 6) for name, value in technicals.items()}
+    return context
+
+async def _generate_sentiments(snapshots: Dict[str, StockQuote]) -> Dict[str, dict]:
+    """
+    Uses Gemini 3 Flash to analyze market data for one or more symbols and
+    return sentiment in Spanish, in a single structured-output call.
+    Returns the valid results by symbol; symbols missing from it (all of
+    them when the call fails) are answered with the local score.
+
+    Calls go through the SDK's async client, are capped at
+    GEMINI_MAX_CONCURRENCY in flight, must finish within
+    GEMINI_TIMEOUT_SECONDS (including time spent waiting for a slot), and
+    are skipped entirely while the circuit breaker is open or when the
+    rate limiter sheds them (GEMINI_RATE_LIMIT).
+    """
+    symbols = list(snapshots)
+    if not await _admit():
+        return {}
+
+    prompt = f"""
+    Act as a financial analyst. Analyze the following market data, keyed by symbol:
+    {json.dumps({symbol: _market_context(symbol, quote) for symbol, quote in snapshots.items()})}
+
+    Symbols: {", ".join(symbols)}
     
+    Provide a sentiment analysis for each symbol.
+    Output must be strict JSON: one object with exactly one key per symbol, each following this schema:
+    {{
+        "<SYMBOL>": {{
+            "sentiment": "Bullish" | "Bearish" | "Neutral",
+            "justification": "A brief explanation in Spanish (max 2 sentences)."
+        }}
+    }}
+    """
+
+    async def call():
+        gemini = await get_client()
+        from google.genai import types
+        async with _get_semaphore():
+            return await gemini.aio.models.generate_content(
+                model="gemini-2.0-flash", # Using Flash as requested (2.0 is current flash version usually)
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json"
+                )
+            )
+
+    _counters["calls"] += 1
+    _counters["batched_symbols"] += len(symbols)
+    started = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(call(), timeout=settings.GEMINI_TIMEOUT_SECONDS)
+        payload = json.loads(response.text)
+        if not isinstance(payload, dict):
+            raise ValueError("Expected a JSON object keyed by symbol")
+    except Exception as e:
+        _record_failure(e, started, symbols)
+        return {}
+
+    _record_success(started)
+
+    results = {}
+    for symbol in symbols:
+        entry = payload.get(symbol)
+        if _validate(entry):
+            results[symbol] = {"sentiment": entry["sentiment"], "justification": entry["justification"]}
+        else:
+            print(f"Gemini response missing or invalid for {symbol}")
+    return results
+
+class _SentimentStreamParser:
+    """
+    Pulls the `sentiment` label and the `justification` text out of a JSON
+    object that arrives in chunks, so both can be forwarded before the
+    object is complete. The text is decoded as far as it is unambiguous
+    (an escape sequence split across chunks waits for the next one).
+    """
+
+    _LABEL = re.compile(r'"sentiment"\s*:\s*"(Bullish|Bearish|Neutral)"')
+    _TEXT_START = re.compile(r'"justification"\s*:\s*"')
+    _PLAIN = re.compile(r'[^"\\]+')
+
+    def __init__(self):
+        self.buffer = ""
+        self.sentiment: Optional[str] = None
+        self.text_done = False
+        self._position: Optional[int] = None  # next undecoded character of the justification
+
+    def feed(self, chunk: str) -> List[Tuple[str, dict]]:
+        """
+        Adds a chunk and returns the events it completes.
+        """
+        self.buffer += chunk
+        events = []
+        if self.sentiment is None:
+            match = self._LABEL.search(self.buffer)
+            if match:
+                self.sentiment = match.group(1)
+                events.append(("sentiment", {"sentiment": self.sentiment}))
+        if self._position is None:
+            match = self._TEXT_START.search(self.buffer)
+            if match:
+                self._position = match.end()
+        if self._position is not None and not self.text_done:
+            text = self._decode()
+            if text:
+                events.append(("justification", {"text": text}))
+        return events
+
+    def _decode(self) -> str:
+        buffer, position, parts = self.buffer, self._position, []
+        while position < len(buffer):
+            plain = self._PLAIN.match(buffer, position)
+            if plain:
+                parts.append(plain.group())
+                position = plain.end()
+                continue
+            if buffer[position] == '"':
+                self.text_done = True
+                position += 1
+                break
+            # Backslash escape; \uD83D\uDE00-style surrogate pairs take two
+            end = position + 2
+            if buffer[position + 1:position + 2] == "u":
+                end = position + 6
+                if buffer[position + 2:position + 4].upper() in ("D8", "D9", "DA", "DB"):
+                    end = position + 12
+            if end > len(buffer):
+                break
+            try:
+                parts.append(json.loads(f'"{buffer[position:end]}"'))
+            except ValueError:
+                parts.append(buffer[position:end])
+            position = end
+        self._position = position
+        return "".join(parts)
+
+async def stream_sentiment(symbol: str, market_data: StockQuote) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Streams the sentiment for a market snapshot as Gemini generates it:
+    `("sentiment", {"sentiment"})` as soon as the label is parsed, then
+    `("justification", {"text"})` pieces of the explanation, and finally
+    `("done", result)` with the validated object. Cached analyses are sent
+    the same way at once. If the call fails or its output is invalid, the
+    final event carries the local score instead, replacing anything streamed.
+    Successful results are cached like `analyze_sentiment`'s.
+    """
+    symbol = symbol.upper()
+    key = _snapshot_key(symbol, market_data)
+    result = _cached_result(key, market_data.price)
+    if result is not None:
+        yield "sentiment", {"sentiment": result["sentiment"]}
+        yield "justification", {"text": result["justification"]}
+        yield "done", result
+        return
+
+    result = None
+    # aclosing: a client leaving mid-stream closes the call right away, not when it is collected
+    async with aclosing(_generate_sentiment_stream(symbol, market_data)) as events:
+        async for event, data in events:
+            if event == "done":
+                result = data
+            else:
+                yield event, data
+    if result is not None:
+        _sentiment_cache.set(key, {"result": result, "price": market_data.price})
+    yield "done", result or local_sentiment(symbol, market_data)
+
+async def _generate_sentiment_stream(symbol: str, market_data: StockQuote) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    One streamed single-symbol Gemini call, under the same rate limit,
+    breaker, concurrency cap and GEMINI_TIMEOUT_SECONDS deadline as batched
+    calls. Ends with `("done", result)` only when the output is valid.
+
+    The call is read by a separate task into a queue, so its concurrency
+    slot is released as soon as Gemini is done, however slowly the client
+    reads the events.
+    """
+    if not await _admit():
+        return
+
     prompt = f"""
     Act as a financial analyst. Analyze the following market data for {symbol}:
-    {json.dumps(market_data)}
-    
-    Provide a sentiment analysis.
-    Output must be strict JSON with the following schema:
+    {json.dumps(_market_context(symbol, market_data))}
+
+    Output must be strict JSON with exactly these keys, in this order:
     {{
         "sentiment": "Bullish" | "Bearish" | "Neutral",
         "justification": "A brief explanation in Spanish (max 2 sentences)."
     }}
     """
-    
+
+    _counters["calls"] += 1
+    _counters["streams"] += 1
+    _counters["batched_symbols"] += 1
+    events: asyncio.Queue = asyncio.Queue()
+    reader = asyncio.ensure_future(_read_sentiment_stream(symbol, prompt, events))
+    _batch_tasks.add(reader)
+    reader.add_done_callback(_batch_tasks.discard)
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash", # Using Flash as requested (2.0 is current flash version usually)
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json"
-            )
-        )
-        
-        result = json.loads(response.text)
-        return result
-    except Exception as e:
-        # Mock response on failure
-        print(f"Gemini API Error: {e}")
-        return {
-            "sentiment": "Neutral",
-            "justification": "No se pudo obtener el análisis en este momento. Datos simulados."
-        }
+        while True:
+            event = await events.get()
+            if event is None:
+                return
+            yield event
+    finally:
+        # The client went away mid-stream: stop the call (no-op once it has finished)
+        reader.cancel()
+
+async def _read_sentiment_stream(symbol: str, prompt: str, events: asyncio.Queue):
+    """
+    Puts the parsed events of one streamed call on `events`, then None.
+    Every way out records an outcome: success or failure, or, when the
+    call is cancelled, the release of the breaker probe it may hold.
+    """
+    started = time.perf_counter()
+    deadline = asyncio.get_running_loop().time() + settings.GEMINI_TIMEOUT_SECONDS
+    parser = _SentimentStreamParser()
+    settled = False
+    try:
+        try:
+            gemini = await get_client()
+            from google.genai import types
+            async with _get_semaphore():
+                chunks = await asyncio.wait_for(
+                    gemini.aio.models.generate_content_stream(
+                        model="gemini-2.0-flash",
+                        contents=prompt,
+                        config=types.GenerateContentConfig(response_mime_type="application/json")
+                    ),
+                    timeout=deadline - asyncio.get_running_loop().time()
+                )
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(),
+                                                           timeout=deadline - asyncio.get_running_loop().time())
+                        except StopAsyncIteration:
+                            break
+                        for event in parser.feed(chunk.text or ""):
+                            events.put_nowait(event)
+                finally:
+                    close = getattr(chunks, "aclose", None)
+                    if close is not None:
+                        await close()
+            payload = json.loads(parser.buffer)
+        except Exception as e:
+            settled = True
+            _record_failure(e, started, [symbol])
+            return
+
+        settled = True
+        _record_success(started)
+        if _validate(payload):
+            events.put_nowait(("done", {"sentiment": payload["sentiment"], "justification": payload["justification"]}))
+        else:
+            print(f"Gemini response missing or invalid for {symbol}")
+    finally:
+        if not settled:
+            # Abandoned, not failed: only free the half-open probe so the breaker can close again
+            _breaker.release()
+        events.put_nowait(None)
@@ -0,0 +1,399 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialized
+    fcntl = None
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+COLUMNS = ("open", "high", "low", "close", "volume")
+FRAME_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+_DELTA_PATTERN = re.compile(r"^delta-(\d+)\.npz$")
+
+class BarStore:
+    """
+    Local on-disk OHLCV store, one directory per interval and symbol.
+
+    Each symbol keeps a compacted base (one `.npy` file per column, opened
+    memory-mapped) plus small append-only delta segments written by gap fills.
+    Reads merge base and deltas, with later segments winning on duplicate
+    timestamps. `compact` folds the deltas back into the base.
+
+    Layout::
+
+        {root}/{interval}/{SYMBOL}/meta.json
+        {root}/{interval}/{SYMBOL}/base/{time,open,high,low,close,volume}.npy
+        {root}/{interval}/{SYMBOL}/delta-000001.npz
+    """
+
+    def __init__(self, root: str, max_segments: int = 8):
+        self.root = root
+        self.max_segments = max_segments
+        self._locks: Dict[str, "_SymbolLock"] = {}
+        self._locks_guard = threading.Lock()
+
+    # -- paths and locking -------------------------------------------------
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, interval, symbol.upper())
+
+    def _lock(self, symbol: str, interval: str) -> "_SymbolLock":
+        key = f"{interval}/{symbol.upper()}"
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = _SymbolLock(os.path.join(self.root, interval, f".{symbol.upper()}.lock"))
+            return lock
+
+    def _deltas(self, path: str) -> List[str]:
+        if not os.path.isdir(path):
+            return []
+        names = [name for name in os.listdir(path) if _DELTA_PATTERN.match(name)]
+        return [os.path.join(path, name) for name in sorted(names)]
+
+    # -- metadata ------------------------------------------------------------
+
+    def meta(self, symbol: str, interval: str = "1d") -> Optional[dict]:
+        """
+        Returns the stored metadata (first/last bar, coverage, last fetch time) or None.
+        """
+        path = os.path.join(self._dir(symbol, interval), "meta.json")
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, path: str, meta: dict):
+        _atomic_write(os.path.join(path, "meta.json"), json.dumps(meta, indent=2).encode())
+
+    def symbols(self, interval: str = "1d") -> List[str]:
+        path = os.path.join(self.root, interval)
+        if not os.path.isdir(path):
+            return []
+        return sorted(name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name)))
+
+    # -- reads -------------------------------------------------------------
+
+    def read(self, symbol: str, interval: str = "1d", start: Optional["pd.Timestamp"] = None) -> "pd.DataFrame":
+        """
+        Returns stored bars from `start` (inclusive) onwards as an OHLCV DataFrame.
+        """
+        with self._lock(symbol, interval):
+            columns = self._load(self._dir(symbol, interval), _to_ns(start))
+        return _to_frame(columns)
+
+    def _load(self, path: str, start_ns: Optional[int] = None) -> Dict[str, np.ndarray]:
+        parts = []
+
+        base = _load_base(os.path.join(path, "base"))
+        if base is not None:
+            offset = int(np.searchsorted(base["time"], start_ns)) if start_ns is not None else 0
+            # Only the requested slice is copied out of the memory map, so the
+            # result stays valid after a compaction replaces the base files
+            parts.append({name: np.array(values[offset:]) for name, values in base.items()})
+
+        for delta in self._deltas(path):
+            with np.load(delta) as segment:
+                times = segment["time"]
+                mask = times >= start_ns if start_ns is not None else slice(None)
+                parts.append({name: segment[name][mask] for name in ("time",) + COLUMNS})
+
+        return _merge(parts)
+
+    # -- writes ------------------------------------------------------------
+
+    def write(self, symbol: str, interval: str, bars: "pd.DataFrame",
+              covered_from: Optional["pd.Timestamp"] = None, inception: bool = False,
+              last_action: Optional[str] = None):
+        """
+        Appends `bars` as a new delta segment and updates the coverage metadata.
+
+        `covered_from` is the start of the range that was requested upstream:
+        once fetched, nothing before it is missing for dates after it, even if
+        the symbol simply has no bars there. `inception` marks a full-history fetch.
+        `last_action` is the date of the latest split or dividend the bars are
+        adjusted for.
+        """
+        with self._lock(symbol, interval):
+            self._write(symbol, interval, bars, covered_from, inception, last_action)
+
+    def replace(self, symbol: str, interval: str, bars: "pd.DataFrame",
+                covered_from: Optional["pd.Timestamp"] = None, inception: bool = False,
+                last_action: Optional[str] = None):
+        """
+        Same as `write`, but drops every bar stored for the symbol first, in
+        one step for readers. Used when a split or dividend has re-adjusted
+        the whole history.
+        """
+        with self._lock(symbol, interval):
+            shutil.rmtree(self._dir(symbol, interval), ignore_errors=True)
+            self._write(symbol, interval, bars, covered_from, inception, last_action)
+
+    def _write(self, symbol: str, interval: str, bars: "pd.DataFrame", covered_from: Optional["pd.Timestamp"],
+               inception: bool, last_action: Optional[str]):
+        import pandas as pd
+        path = self._dir(symbol, interval)
+        meta = self.meta(symbol, interval)
+        if bars.empty and meta is None:
+            # Nothing known about this symbol; do not create an empty entry
+            return
+
+        os.makedirs(path, exist_ok=True)
+        if not bars.empty:
+            columns = _from_frame(bars)
+            sequence = len(self._deltas(path)) + 1
+            while os.path.exists(os.path.join(path, f"delta-{sequence:06d}.npz")):
+                sequence += 1
+            _atomic_savez(os.path.join(path, f"delta-{sequence:06d}.npz"), columns)
+
+        meta = meta or {"symbol": symbol.upper(), "interval": interval, "covered_from": None,
+                        "inception": False, "last_action": None, "checksum": None, "base_rows": 0}
+        if covered_from is not None:
+            covered = pd.Timestamp(covered_from).strftime("%Y-%m-%d")
+            if meta["covered_from"] is None or covered < meta["covered_from"]:
+                meta["covered_from"] = covered
+        meta["inception"] = meta["inception"] or inception
+        if last_action is not None and last_action > (meta.get("last_action") or ""):
+            meta["last_action"] = last_action
+        meta["fetched_at"] = time.time()
+        if getattr(bars.index, "tz", None) is not None:
+            # Bars are stored in UTC; intraday consumers convert back to exchange time
+            meta["timezone"] = str(bars.index.tz)
+
+        times = self._load(path)["time"]
+        if len(times):
+            meta["first"] = pd.Timestamp(int(times[0])).strftime("%Y-%m-%d")
+            meta["last"] = pd.Timestamp(int(times[-1])).strftime("%Y-%m-%d")
+            if meta["covered_from"] is None or meta["first"] < meta["covered_from"]:
+                meta["covered_from"] = meta["first"]
+        self._write_meta(path, meta)
+
+        if len(self._deltas(path)) > self.max_segments:
+            self._compact(path, meta)
+
+    def compact(self, symbol: str, interval: str = "1d"):
+        """
+        Folds all delta segments into a new base, replacing it atomically.
+        """
+        path = self._dir(symbol, interval)
+        with self._lock(symbol, interval):
+            meta = self.meta(symbol, interval)
+            if meta is not None:
+                self._compact(path, meta)
+
+    def _compact(self, path: str, meta: dict):
+        columns = self._load(path)
+        staging = os.path.join(path, f"base.tmp-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in ("time",) + COLUMNS:
+            np.save(os.path.join(staging, f"{name}.npy"), columns[name])
+
+        base = os.path.join(path, "base")
+        retired = os.path.join(path, f"base.old-{os.getpid()}")
+        if os.path.isdir(base):
+            os.replace(base, retired)
+        os.replace(staging, base)
+        shutil.rmtree(retired, ignore_errors=True)
+        for delta in self._deltas(path):
+            os.remove(delta)
+
+        meta["base_rows"] = int(len(columns["time"]))
+        meta["checksum"] = _checksum(columns)
+        self._write_meta(path, meta)
+
+    # -- integrity -----------------------------------------------------------
+
+    def verify(self, symbol: str, interval: str = "1d") -> List[str]:
+        """
+        Checks one symbol and returns a list of problems (empty when healthy).
+        """
+        path = self._dir(symbol, interval)
+        problems = []
+        with self._lock(symbol, interval):
+            meta = self.meta(symbol, interval)
+            if meta is None:
+                return ["missing meta.json"]
+
+            try:
+                base = _load_base(os.path.join(path, "base"))
+            except Exception as e:
+                return [f"unreadable base: {e}"]
+
+            if base is not None:
+                lengths = {len(values) for values in base.values()}
+                if len(lengths) != 1:
+                    problems.append("base columns have different lengths")
+                elif _checksum(base) != meta.get("checksum"):
+                    problems.append("base checksum mismatch")
+                elif np.any(np.diff(base["time"]) <= 0):
+                    problems.append("base timestamps are not strictly increasing")
+
+            for delta in self._deltas(path):
+                try:
+                    with np.load(delta) as segment:
+                        if len({len(segment[name]) for name in ("time",) + COLUMNS}) != 1:
+                            problems.append(f"{os.path.basename(delta)}: columns have different lengths")
+                except Exception as e:
+                    problems.append(f"{os.path.basename(delta)}: unreadable ({e})")
+
+            if not problems:
+                merged = self._load(path)
+                if np.isnan(merged["close"]).any():
+                    problems.append("missing close prices")
+
+        return problems
+
+    def verify_all(self) -> Dict[str, List[str]]:
+        """
+        Verifies every stored symbol. Keys are `{interval}/{SYMBOL}`.
+        """
+        report = {}
+        if not os.path.isdir(self.root):
+            return report
+        for interval in sorted(os.listdir(self.root)):
+            for symbol in self.symbols(interval):
+                report[f"{interval}/{symbol}"] = self.verify(symbol, interval)
+        return report
+
+# -- helpers -----------------------------------------------------------------
+
+class _SymbolLock:
+    """
+    Serializes access to one symbol across threads and, where `fcntl` is
+    available, across worker processes sharing the same store directory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "a")
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+def _to_ns(value) -> Optional[int]:
+    import pandas as pd
+    if value is None:
+        return None
+    return pd.Timestamp(value).value
+
+def _load_base(path: str) -> Optional[Dict[str, np.ndarray]]:
+    if not os.path.isdir(path):
+        return None
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ("time",) + COLUMNS}
+
+def _empty_columns() -> Dict[str, np.ndarray]:
+    columns = {"time": np.empty(0, dtype=np.int64)}
+    columns.update({name: np.empty(0, dtype=np.float64) for name in COLUMNS})
+    return columns
+
+def _merge(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """
+    Concatenates column sets in write order, keeping the last bar for each timestamp.
+    """
+    if not parts:
+        return _empty_columns()
+    if len(parts) == 1:
+        return parts[0]
+    return _sort_unique({name: np.concatenate([part[name] for part in parts]) for name in ("time",) + COLUMNS})
+
+def _sort_unique(merged: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    order = np.argsort(merged["time"], kind="stable")
+    times = merged["time"][order]
+    # Within a run of equal timestamps the stable sort keeps write order, so keep the last one
+    keep = np.append(times[1:] != times[:-1], True)
+    return {name: values[order][keep] for name, values in merged.items()}
+
+def _from_frame(bars: "pd.DataFrame") -> Dict[str, np.ndarray]:
+    import pandas as pd
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    columns = {"time": index.as_unit("ns").asi8.astype(np.int64)}
+    for name in COLUMNS:
+        frame_column = FRAME_COLUMNS[name]
+        if frame_column in bars:
+            columns[name] = bars[frame_column].to_numpy(dtype=np.float64)
+        else:
+            columns[name] = np.full(len(bars), np.nan)
+    valid = ~np.isnan(columns["close"])
+    return _sort_unique({name: values[valid] for name, values in columns.items()})
+
+def _to_frame(columns: Dict[str, np.ndarray]) -> "pd.DataFrame":
+    import pandas as pd
+    index = pd.DatetimeIndex(columns["time"].astype("datetime64[ns]"), name="Date")
+    return pd.DataFrame({FRAME_COLUMNS[name]: columns[name] for name in COLUMNS}, index=index)
+
+def _checksum(columns: Dict[str, np.ndarray]) -> int:
+    crc = 0
+    for name in ("time",) + COLUMNS:
+        crc = zlib.crc32(np.ascontiguousarray(columns[name]).tobytes(), crc)
+    return crc
+
+def _atomic_write(path: str, data: bytes):
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _atomic_savez(path: str, columns: Dict[str, np.ndarray]):
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        np.savez(f, **columns)
+    os.replace(tmp, path)
+
+if __name__ == "__main__":
+    from ..config import get_settings
+
+    parser = argparse.ArgumentParser(description="Maintain the local OHLCV bar store.")
+    parser.add_argument("command", choices=["verify", "compact"])
+    parser.add_argument("--root", default=None, help="Store directory (defaults to BAR_STORE_DIR)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    store = BarStore(args.root or settings.BAR_STORE_DIR, settings.BAR_STORE_MAX_SEGMENTS)
+
+    if args.command == "verify":
+        report = store.verify_all()
+        for key, problems in report.items():
+            print(f"{key}: {'OK' if not problems else '; '.join(problems)}")
+        raise SystemExit(1 if any(report.values()) else 0)
+
+    for interval in sorted(os.listdir(store.root)) if os.path.isdir(store.root) else []:
+        for symbol in store.symbols(interval):
+            store.compact(symbol, interval)
+            print(f"Compacted {interval}/{symbol}")
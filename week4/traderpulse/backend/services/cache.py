@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+class TTLCache:
+    """
+    Bounded in-process cache with a TTL, a stale-while-revalidate window and LRU eviction.
+
+    An entry younger than `ttl` is fresh. Between `ttl` and `ttl + stale_ttl` it is
+    stale: callers may serve it immediately while refreshing it in the background.
+    Older entries are treated as misses, but are kept until they are replaced or
+    evicted so `last_known` can still serve them when the upstream is unavailable.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int, stale_ttl: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[object, float]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: Hashable) -> Tuple[str, Optional[object]]:
+        """
+        Returns `(status, value)` where status is FRESH, STALE or MISS.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISS, None
+
+        value, stored_at = entry
+        age = self._clock() - stored_at
+        if age < self.ttl:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return FRESH, value
+        if age < self.ttl + self.stale_ttl:
+            self.stale_hits += 1
+            self._entries.move_to_end(key)
+            return STALE, value
+
+        self.misses += 1
+        return MISS, None
+
+    def last_known(self, key: Hashable):
+        """
+        Returns the value held for `key` at any age, or None. Not counted in the stats.
+        """
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def get(self, key: Hashable):
+        """
+        Returns the cached value if it is fresh, otherwise None.
+        """
+        status, value = self.lookup(key)
+        return value if status == FRESH else None
+
+    def set(self, key: Hashable, value, age: float = 0.0):
+        """
+        Stores `value`. `age` backdates it, for values that were already
+        that many seconds old when they arrived (e.g. from a shared tier).
+        """
+        self._entries[key] = (value, self._clock() - age)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.stale_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        now = self._clock()
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            # Least recently used first
+            "entries": [
+                {"key": ":".join(str(part) for part in key) if isinstance(key, tuple) else str(key),
+                 "age_seconds": round(now - stored_at, 3)}
+                for key, (_, stored_at) in self._entries.items()
+            ]
+        }
@@ -0,0 +1,80 @@
+import time
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Fails fast after `failure_threshold` consecutive failures.
+
+    While open, calls are rejected without reaching the upstream. After
+    `reset_timeout` seconds one probe call is let through (half-open): its
+    success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self._state = CLOSED
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+
+    def release(self):
+        """
+        For a call abandoned before it had an outcome (e.g. its client went
+        away): frees the half-open probe slot without counting anything.
+        """
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        was_probe = self._probe_in_flight
+        self._probe_in_flight = False
+        if was_probe or self.consecutive_failures >= self.failure_threshold:
+            if self._state != OPEN or was_probe:
+                self.times_opened += 1
+            self._state = OPEN
+            self._opened_at = self._clock()
+
+    def stats(self) -> dict:
+        state = self.state
+        retry_in: Optional[float] = None
+        if state == OPEN:
+            retry_in = round(self.reset_timeout - (self._clock() - self._opened_at), 3)
+        return {
+            "name": self.name,
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in_seconds": retry_in
+        }
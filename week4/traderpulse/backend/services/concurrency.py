@@ -0,0 +1,62 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from ..config import get_settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the shared, bounded thread pool used for blocking upstream calls.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().UPSTREAM_MAX_WORKERS,
+            thread_name_prefix="upstream"
+        )
+    return _executor
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """
+    Runs a synchronous function on the upstream executor so it never blocks the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+def shutdown_executor():
+    """
+    Stops the upstream executor. Called from the application lifespan on shutdown.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: while a call is in flight,
+    every other caller with that key awaits the same result instead of
+    starting a new upstream fetch.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        # shield: a cancelled caller must not cancel the fetch shared with the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
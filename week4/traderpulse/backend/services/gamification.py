@@ -0,0 +1,349 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from .. import metrics
+from ..config import get_settings
+from .cache import FRESH, TTLCache
+
+ANONYMOUS = "anonymous"
+
+# Reads of a user's row per cache miss before serving the in-memory increments alone
+MAX_READ_ATTEMPTS = 3
+
+# (points needed, level name), ascending
+LEVELS: List[Tuple[int, str]] = [
+    (0, "Principiante"),
+    (500, "Intermedio"),
+    (2500, "Avanzado"),
+    (10000, "Experto"),
+]
+
+# (badge, aggregate field, threshold), in the order they are shown
+BADGES: List[Tuple[str, str, int]] = [
+    ("Primer Análisis", "analyses", 1),
+    ("Analista Constante", "analyses", 50),
+    ("Toro de Oro", "bullish", 10),
+    ("Oso Vigilante", "bearish", 10),
+    ("Visualizador", "symbols", 5),
+    ("Explorador de Mercados", "symbols", 20),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    points INTEGER NOT NULL DEFAULT 0,
+    analyses INTEGER NOT NULL DEFAULT 0,
+    bullish INTEGER NOT NULL DEFAULT 0,
+    bearish INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_symbols (user_id TEXT NOT NULL, symbol TEXT NOT NULL, PRIMARY KEY (user_id, symbol));
+CREATE TABLE IF NOT EXISTS flushes (owner TEXT PRIMARY KEY, seq INTEGER NOT NULL);
+"""
+
+@dataclass
+class _Delta:
+    """
+    Increments for one user not yet written to the database.
+    """
+    points: int = 0
+    analyses: int = 0
+    bullish: int = 0
+    bearish: int = 0
+    symbols: Set[str] = field(default_factory=set)
+
+    def add(self, other: "_Delta"):
+        self.points += other.points
+        self.analyses += other.analyses
+        self.bullish += other.bullish
+        self.bearish += other.bearish
+        self.symbols |= other.symbols
+
+def _empty_profile() -> dict:
+    return {"points": 0, "analyses": 0, "bullish": 0, "bearish": 0, "symbols": set()}
+
+def _apply(profile: dict, delta: _Delta):
+    profile["points"] += delta.points
+    profile["analyses"] += delta.analyses
+    profile["bullish"] += delta.bullish
+    profile["bearish"] += delta.bearish
+    profile["symbols"] |= delta.symbols
+
+def summarize(profile: dict) -> dict:
+    """
+    The public view of an aggregate: level, points, badges and progress
+    towards the next level (percent).
+    """
+    points = profile["points"]
+    counts = {**profile, "symbols": len(profile["symbols"])}
+    level_index = max(i for i, (needed, _) in enumerate(LEVELS) if points >= needed)
+    if level_index + 1 < len(LEVELS):
+        floor, ceiling = LEVELS[level_index][0], LEVELS[level_index + 1][0]
+        progress = int(100 * (points - floor) / (ceiling - floor))
+    else:
+        progress = 100
+    return {
+        "investor_level": LEVELS[level_index][1],
+        "analysis_points": points,
+        "badges": [badge for badge, name, threshold in BADGES if counts[name] >= threshold],
+        "next_level_progress": progress
+    }
+
+class GamificationStore:
+    """
+    Per-user points and badge counters in an embedded SQLite database, written
+    behind the requests that earn them.
+
+    `record_analysis` only updates memory: a pending delta per user and the
+    user's cached aggregate, if any. A background task flushes all pending
+    deltas every `flush_interval` seconds in one transaction, so the sentiment
+    path never waits on the disk.
+
+    Reads are served from the aggregate cache. On a miss the user's row is
+    read (on a worker thread for `aget_profile`) and the deltas not yet in it
+    are added on top. Each flush stores its sequence number in the same
+    transaction, which tells a read whether an in-progress flush is already
+    in the row.
+
+    Several worker processes can share the file; each sees the others'
+    points once its cached aggregate expires (`cache_ttl`).
+    """
+
+    def __init__(self, path: str, flush_interval: float = 2.0, cache_ttl: float = 60.0,
+                 max_cached_users: int = 4096, points_per_analysis: int = 10, busy_timeout: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.points_per_analysis = points_per_analysis
+        self.busy_timeout = busy_timeout
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._profiles = TTLCache("gamification", ttl=cache_ttl, max_entries=max_cached_users)
+        self._pending: Dict[str, _Delta] = {}
+        # The batch being written by the current flush, if any
+        self._flushing: Optional[Tuple[int, Dict[str, _Delta]]] = None
+        self._seq = 0
+        # Sequence number of the last batch this process wrote
+        self._written_seq = 0
+        self._task: Optional[asyncio.Task] = None
+        self._local = threading.local()
+        self.flushes = 0
+        self.flushed_users = 0
+        self.flush_failures = 0
+        self.last_flush_seconds = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # Reads and flushes run on worker threads; each thread gets its own connection
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            # WAL: reads never wait for a flush in progress
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    # -- hot path ------------------------------------------------------------
+
+    def record_analysis(self, user_id: str, symbol: str, sentiment: Optional[str] = None):
+        """
+        Credits one sentiment analysis to `user_id`. Memory only.
+        """
+        delta = _Delta(
+            points=self.points_per_analysis,
+            analyses=1,
+            bullish=int(sentiment == "Bullish"),
+            bearish=int(sentiment == "Bearish"),
+            symbols={symbol.upper()}
+        )
+        self._pending.setdefault(user_id, _Delta()).add(delta)
+        cached = self._profiles.get(user_id)
+        if cached is not None:
+            _apply(cached, delta)
+
+    # -- reads ---------------------------------------------------------------
+
+    def get_profile(self, user_id: str) -> dict:
+        """
+        The user's aggregate counters (`points`, `analyses`, `bullish`,
+        `bearish`, `symbols`), including increments not flushed yet.
+        """
+        status, cached = self._profiles.lookup(user_id)
+        if status == FRESH:
+            return cached
+        read = self._read(user_id)
+        if read is None:
+            return self._merge(user_id, _empty_profile(), -1, cache=False)
+        return self._merge(user_id, *read)
+
+    async def aget_profile(self, user_id: str) -> dict:
+        """
+        Same as `get_profile`, but a cache miss reads the database on a
+        worker thread instead of the event loop.
+        """
+        status, cached = self._profiles.lookup(user_id)
+        if status == FRESH:
+            return cached
+        for _ in range(MAX_READ_ATTEMPTS):
+            read = await asyncio.to_thread(self._read, user_id)
+            if read is None:
+                break
+            # A flush that committed after the read left memory without being
+            # in the row; read again rather than lose its increments
+            if read[1] >= self._written_seq:
+                return self._merge(user_id, *read)
+        # Serve what memory holds, uncached, so the next request reads again
+        return self._merge(user_id, _empty_profile(), -1, cache=False)
+
+    def _merge(self, user_id: str, profile: dict, flushed_seq: int, cache: bool = True) -> dict:
+        if self._flushing is not None and self._flushing[0] > flushed_seq and user_id in self._flushing[1]:
+            _apply(profile, self._flushing[1][user_id])
+        if user_id in self._pending:
+            _apply(profile, self._pending[user_id])
+        if cache:
+            self._profiles.set(user_id, profile)
+        return profile
+
+    def get_status(self, user_id: str) -> dict:
+        return summarize(self.get_profile(user_id))
+
+    async def aget_status(self, user_id: str) -> dict:
+        return summarize(await self.aget_profile(user_id))
+
+    def _read(self, user_id: str) -> Optional[Tuple[dict, int]]:
+        """
+        The user's row and the last flush of this process it includes, or
+        None when the database could not be read.
+        """
+        profile = _empty_profile()
+        flushed_seq = 0
+        try:
+            connection = self._connection()
+            # One read transaction, so the row and the flush marker agree
+            with connection:
+                connection.execute("BEGIN")
+                row = connection.execute(
+                    "SELECT points, analyses, bullish, bearish FROM users WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                symbols = connection.execute(
+                    "SELECT symbol FROM user_symbols WHERE user_id = ?", (user_id,)
+                ).fetchall()
+                marker = connection.execute("SELECT seq FROM flushes WHERE owner = ?", (self.owner,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Gamification read failed for {user_id}: {e}")
+            return None
+        if row is not None:
+            profile.update(points=row[0], analyses=row[1], bullish=row[2], bearish=row[3])
+        profile["symbols"] = {symbol for (symbol,) in symbols}
+        if marker is not None:
+            flushed_seq = marker[0]
+        return profile, flushed_seq
+
+    # -- write-behind --------------------------------------------------------
+
+    async def flush(self):
+        """
+        Writes every pending delta in one transaction on a worker thread.
+        Failed batches are put back and retried on the next flush.
+        """
+        if not self._pending or self._flushing is not None:
+            return
+        self._seq += 1
+        batch = (self._seq, self._pending)
+        self._pending = {}
+        self._flushing = batch
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write, *batch)
+        except Exception as e:
+            self.flush_failures += 1
+            print(f"Gamification flush failed ({len(batch[1])} users): {e}")
+            # Put the batch back and fold in what arrived meanwhile
+            for user_id, delta in self._pending.items():
+                batch[1].setdefault(user_id, _Delta()).add(delta)
+            self._pending = batch[1]
+        else:
+            self._written_seq = batch[0]
+            self.flushes += 1
+            self.flushed_users += len(batch[1])
+        finally:
+            self._flushing = None
+            self.last_flush_seconds = time.perf_counter() - started
+
+    def _write(self, seq: int, batch: Dict[str, _Delta]):
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT INTO users (user_id, points, analyses, bullish, bearish, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET points = points + excluded.points, "
+                "analyses = analyses + excluded.analyses, bullish = bullish + excluded.bullish, "
+                "bearish = bearish + excluded.bearish, updated_at = excluded.updated_at",
+                [(user_id, d.points, d.analyses, d.bullish, d.bearish, now) for user_id, d in batch.items()]
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO user_symbols (user_id, symbol) VALUES (?, ?)",
+                [(user_id, symbol) for user_id, d in batch.items() for symbol in d.symbols]
+            )
+            connection.execute(
+                "INSERT INTO flushes (owner, seq) VALUES (?, ?) ON CONFLICT(owner) DO UPDATE SET seq = excluded.seq",
+                (self.owner, seq)
+            )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """
+        Stops the flush loop and writes whatever is still pending.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "pending_users": len(self._pending),
+            "pending_analyses": sum(delta.analyses for delta in self._pending.values()),
+            "flushes": self.flushes,
+            "flushed_users": self.flushed_users,
+            "flush_failures": self.flush_failures,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+            "cached_users": len(self._profiles)
+        }
+
+_store: Optional[GamificationStore] = None
+metrics.register_caches(lambda: (_store._profiles,) if _store is not None else ())
+
+def get_store() -> GamificationStore:
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = GamificationStore(
+            settings.GAMIFICATION_DB_PATH,
+            flush_interval=settings.GAMIFICATION_FLUSH_INTERVAL,
+            cache_ttl=settings.GAMIFICATION_CACHE_TTL,
+            points_per_analysis=settings.GAMIFICATION_POINTS_PER_ANALYSIS
+        )
+    return _store
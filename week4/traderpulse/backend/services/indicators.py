@@ -0,0 +1,593 @@
+import copy
+import math
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .. import metrics
+from ..config import get_settings
+from ..models import StockQuote
+from . import market_service
+from .cache import TTLCache
+from .series import PriceSeries, lttb_indices
+
+settings = get_settings()
+
+# Indicator parameters (the usual charting defaults)
+SMA_WINDOWS = (20, 50)
+EMA_SPAN = 20
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_WINDOW, BOLLINGER_K = 20, 2.0
+
+DAY_NS = 86_400 * 10**9
+
+# Full indicator arrays per (symbol, period, interval), reused while the history series is
+# unchanged and extended from the incremental state when it gains or revises bars
+_values_cache = TTLCache("indicators", ttl=settings.REFRESH_IDLE_TTL, max_entries=settings.CACHE_MAX_ENTRIES)
+# Incremental state per (symbol, period, interval): new bars and live quotes update it in O(1)
+_state_cache = TTLCache("indicator_state", ttl=settings.REFRESH_IDLE_TTL, max_entries=settings.CACHE_MAX_ENTRIES)
+# Most recently synced daily state per symbol, used to enrich sentiment prompts
+_daily_keys: Dict[str, Tuple[str, str, str]] = {}
+metrics.register_caches(lambda: (_values_cache, _state_cache))
+
+def cache_stats() -> dict:
+    return {"values": _values_cache.stats(), "state": _state_cache.stats()}
+
+def clear_cache():
+    _values_cache.clear()
+    _state_cache.clear()
+    _daily_keys.clear()
+
+# Vectorized kernels. Every kernel returns an array as long as its input,
+# with NaN where the indicator is still warming up.
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = sliding_window_view(values, window).mean(axis=1)
+    return out
+
+def _ewm(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """
+    Exponential moving average seeded with the simple average of the first
+    `period` values, so the first defined value sits at index `period - 1`.
+    """
+    import pandas as pd
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    seeded = values[period - 1:].astype(np.float64)
+    seeded[0] = values[:period].mean()
+    # pandas runs the recursion in compiled code
+    out[period - 1:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    return _ewm(values, span, 2.0 / (span + 1))
+
+def _wilder_averages(closes: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Wilder-smoothed average gains and losses, aligned with `closes[1:]`.
+    """
+    changes = np.diff(closes)
+    gains = np.clip(changes, 0, None)
+    losses = np.clip(-changes, 0, None)
+    return _ewm(gains, period, 1.0 / period), _ewm(losses, period, 1.0 / period)
+
+def _rsi_value(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        value = 100.0 - 100.0 / (1.0 + rs)
+    # No losses: 100 if there were gains, 50 for a flat window
+    return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), value)
+
+def rsi(closes: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    out = np.full(len(closes), np.nan)
+    if len(closes) > period:
+        avg_gain, avg_loss = _wilder_averages(closes, period)
+        out[1:] = np.where(np.isnan(avg_gain), np.nan, _rsi_value(avg_gain, avg_loss))
+    return out
+
+def macd(closes: np.ndarray, fast: int = MACD_FAST, slow: int = MACD_SLOW,
+         signal: int = MACD_SIGNAL) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the MACD line, its signal line and the histogram.
+    """
+    line = ema(closes, fast) - ema(closes, slow)
+    signal_line = np.full(len(closes), np.nan)
+    if len(closes) >= slow:
+        signal_line[slow - 1:] = ema(line[slow - 1:], signal)
+    return line, signal_line, line - signal_line
+
+def bollinger(closes: np.ndarray, window: int = BOLLINGER_WINDOW,
+              k: float = BOLLINGER_K) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the middle, upper and lower bands (population standard deviation).
+    """
+    middle = sma(closes, window)
+    std = np.full(len(closes), np.nan)
+    if len(closes) >= window:
+        std[window - 1:] = sliding_window_view(closes, window).std(axis=1)
+    return middle, middle + k * std, middle - k * std
+
+def vwap(prices: np.ndarray, volumes: np.ndarray, sessions: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Volume-weighted average price, cumulated from the start of each session
+    (`sessions` holds a session id per bar; None means one session).
+    NaN wherever no volume has traded yet.
+    """
+    pv = np.cumsum(prices * volumes)
+    cv = np.cumsum(volumes)
+    if sessions is not None and len(sessions):
+        starts = np.flatnonzero(np.r_[True, sessions[1:] != sessions[:-1]])
+        lengths = np.diff(np.r_[starts, len(sessions)])
+        pv = pv - np.repeat(np.r_[0.0, pv][starts], lengths)
+        cv = cv - np.repeat(np.r_[0.0, cv][starts], lengths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cv > 0, pv / cv, np.nan)
+
+def _typical_prices(series: PriceSeries) -> np.ndarray:
+    if series.highs is None or series.lows is None:
+        return series.closes
+    typical = (series.highs + series.lows + series.closes) / 3.0
+    return np.where(np.isnan(typical), series.closes, typical)
+
+def _volumes(series: PriceSeries) -> np.ndarray:
+    if series.volumes is None:
+        return np.zeros(len(series))
+    return np.nan_to_num(series.volumes)
+
+def _sessions(series: PriceSeries, intraday: bool) -> Optional[np.ndarray]:
+    # Intraday VWAP restarts every (UTC) day; daily VWAP is anchored at the first bar
+    return series.times // DAY_NS if intraday else None
+
+def compute(series: PriceSeries, intraday: bool = False) -> Dict[str, np.ndarray]:
+    """
+    All indicators over a full series, one array per indicator.
+    """
+    closes = series.closes
+    values = {f"sma_{window}": sma(closes, window) for window in SMA_WINDOWS}
+    values[f"ema_{EMA_SPAN}"] = ema(closes, EMA_SPAN)
+    values[f"rsi_{RSI_PERIOD}"] = rsi(closes, RSI_PERIOD)
+    values["macd"], values["macd_signal"], values["macd_histogram"] = macd(closes)
+    values["bb_middle"], values["bb_upper"], values["bb_lower"] = bollinger(closes)
+    values["vwap"] = vwap(_typical_prices(series), _volumes(series), _sessions(series, intraday))
+    return values
+
+# Incremental state. Each component supports `push` (a new bar) and
+# `replace` (the latest bar changed, e.g. today's partial bar), both O(1).
+
+def _finite(value) -> Optional[float]:
+    return None if value is None or math.isnan(value) else float(value)
+
+class _Window:
+    """
+    Running sum and sum of squares over the last `size` values.
+    """
+
+    def __init__(self, size: int):
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.squares = 0.0
+
+    def seed(self, values: np.ndarray):
+        for value in values[-self.values.maxlen:].tolist():
+            self.push(value)
+
+    def push(self, value: float):
+        if len(self.values) == self.values.maxlen:
+            old = self.values[0]
+            self.total -= old
+            self.squares -= old * old
+        self.values.append(value)
+        self.total += value
+        self.squares += value * value
+
+    def replace(self, value: float):
+        old = self.values[-1]
+        self.values[-1] = value
+        self.total += value - old
+        self.squares += value * value - old * old
+
+    def mean(self) -> Optional[float]:
+        if len(self.values) < self.values.maxlen:
+            return None
+        return self.total / len(self.values)
+
+    def std(self) -> Optional[float]:
+        mean = self.mean()
+        if mean is None:
+            return None
+        return math.sqrt(max(self.squares / len(self.values) - mean * mean, 0.0))
+
+class _EMA:
+    """
+    Same recursion as `_ewm`: the simple average of the first `period`
+    inputs, then exponential smoothing.
+    """
+
+    def __init__(self, period: int, alpha: float):
+        self.period = period
+        self.alpha = alpha
+        self.count = 0
+        self.total = 0.0  # sum of the first `period` inputs
+        self.last = None
+        self.value = None
+        self.prev = None  # value before the latest input
+
+    def seed(self, inputs: np.ndarray, averages: np.ndarray):
+        n = len(inputs)
+        self.count = n
+        self.total = float(inputs[:self.period].sum())
+        self.last = float(inputs[-1]) if n else None
+        self.value = _finite(averages[-1]) if n else None
+        self.prev = _finite(averages[-2]) if n >= 2 else None
+
+    def push(self, value: float):
+        self.prev = self.value
+        self.count += 1
+        if self.count <= self.period:
+            self.total += value
+        self.last = value
+        self.value = self._next(value)
+
+    def replace(self, value: float):
+        if self.count <= self.period:
+            self.total += value - self.last
+        self.last = value
+        self.value = self._next(value)
+
+    def _next(self, value: float) -> Optional[float]:
+        if self.count < self.period:
+            return None
+        if self.count == self.period:
+            return self.total / self.period
+        return (1 - self.alpha) * self.prev + self.alpha * value
+
+class _RSI:
+    def __init__(self, period: int):
+        self.gains = _EMA(period, 1.0 / period)
+        self.losses = _EMA(period, 1.0 / period)
+        self.last_close = None
+        self.prev_close = None  # close before the latest one
+
+    def seed(self, closes: np.ndarray):
+        if len(closes) >= 2:
+            changes = np.diff(closes)
+            avg_gain, avg_loss = _wilder_averages(closes, self.gains.period)
+            self.gains.seed(np.clip(changes, 0, None), avg_gain)
+            self.losses.seed(np.clip(-changes, 0, None), avg_loss)
+            self.prev_close = float(closes[-2])
+        if len(closes):
+            self.last_close = float(closes[-1])
+
+    def push(self, close: float):
+        if self.last_close is not None:
+            change = close - self.last_close
+            self.gains.push(max(change, 0.0))
+            self.losses.push(max(-change, 0.0))
+        self.prev_close, self.last_close = self.last_close, close
+
+    def replace(self, close: float):
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            self.gains.replace(max(change, 0.0))
+            self.losses.replace(max(-change, 0.0))
+        self.last_close = close
+
+    def value(self) -> Optional[float]:
+        if self.gains.value is None:
+            return None
+        return float(_rsi_value(np.float64(self.gains.value), np.float64(self.losses.value)))
+
+class _MACD:
+    def __init__(self, fast: int, slow: int, signal: int):
+        self.fast = _EMA(fast, 2.0 / (fast + 1))
+        self.slow = _EMA(slow, 2.0 / (slow + 1))
+        self.signal = _EMA(signal, 2.0 / (signal + 1))
+
+    def seed(self, closes: np.ndarray):
+        fast, slow = ema(closes, self.fast.period), ema(closes, self.slow.period)
+        self.fast.seed(closes, fast)
+        self.slow.seed(closes, slow)
+        line = (fast - slow)[self.slow.period - 1:]
+        self.signal.seed(line, ema(line, self.signal.period))
+
+    def line(self) -> Optional[float]:
+        if self.slow.value is None:
+            return None
+        return self.fast.value - self.slow.value
+
+    def push(self, close: float):
+        self.fast.push(close)
+        self.slow.push(close)
+        if self.slow.value is not None:
+            self.signal.push(self.line())
+
+    def replace(self, close: float):
+        self.fast.replace(close)
+        self.slow.replace(close)
+        # The slow EMA's warm-up state does not change on replace, so the
+        # signal line already received a value for this bar iff it has one now
+        if self.slow.value is not None:
+            self.signal.replace(self.line())
+
+class _VWAP:
+    def __init__(self):
+        self.session = None
+        self.pv = 0.0
+        self.volume = 0.0
+        self.last_pv = 0.0
+        self.last_volume = 0.0
+
+    def seed(self, prices: np.ndarray, volumes: np.ndarray, sessions: Optional[np.ndarray]):
+        if not len(prices):
+            return
+        start = 0
+        if sessions is not None:
+            self.session = int(sessions[-1])
+            start = int(np.searchsorted(sessions, sessions[-1]))
+        else:
+            self.session = 0
+        self.pv = float(np.dot(prices[start:], volumes[start:]))
+        self.volume = float(volumes[start:].sum())
+        self.last_pv = float(prices[-1] * volumes[-1])
+        self.last_volume = float(volumes[-1])
+
+    def push(self, price: float, volume: float, session: int):
+        if session != self.session:
+            self.session, self.pv, self.volume = session, 0.0, 0.0
+        self.last_pv, self.last_volume = price * volume, volume
+        self.pv += self.last_pv
+        self.volume += volume
+
+    def replace(self, price: float, volume: float):
+        self.pv += price * volume - self.last_pv
+        self.volume += volume - self.last_volume
+        self.last_pv, self.last_volume = price * volume, volume
+
+    def value(self) -> Optional[float]:
+        return self.pv / self.volume if self.volume > 0 else None
+
+class IndicatorState:
+    """
+    Latest value of every indicator for one series, updated bar by bar in
+    O(1) instead of recomputing the whole window. `push`/`replace` match what
+    `compute` would return for the extended series.
+    """
+
+    def __init__(self, intraday: bool = False):
+        self.intraday = intraday
+        self.origin = None    # key of the first bar the state was built from
+        self.last_key = None
+        self.last_close = None
+        self.last_high = None
+        self.last_low = None
+        self.has_range = False  # whether typical prices use highs and lows
+        self.windows = {window: _Window(window) for window in set(SMA_WINDOWS) | {BOLLINGER_WINDOW}}
+        self.ema = _EMA(EMA_SPAN, 2.0 / (EMA_SPAN + 1))
+        self.rsi = _RSI(RSI_PERIOD)
+        self.macd = _MACD(MACD_FAST, MACD_SLOW, MACD_SIGNAL)
+        self.vwap = _VWAP()
+
+    def _key(self, time_ns: int) -> int:
+        # Daily bars are matched by date, whatever time of day the provider stamps them with
+        return int(time_ns) if self.intraday else int(time_ns) // DAY_NS
+
+    def _session(self, time_ns: int) -> int:
+        return int(time_ns) // DAY_NS if self.intraday else 0
+
+    @classmethod
+    def from_series(cls, series: PriceSeries, intraday: bool = False) -> "IndicatorState":
+        state = cls(intraday)
+        closes = series.closes
+        if not len(closes):
+            return state
+        state.origin = state._key(series.times[0])
+        state.last_key = state._key(series.times[-1])
+        state.last_close = float(closes[-1])
+        state.has_range = series.highs is not None and series.lows is not None
+        state.last_high = float(series.highs[-1]) if state.has_range else state.last_close
+        state.last_low = float(series.lows[-1]) if state.has_range else state.last_close
+        for window in state.windows.values():
+            window.seed(closes)
+        state.ema.seed(closes, ema(closes, EMA_SPAN))
+        state.rsi.seed(closes)
+        state.macd.seed(closes)
+        state.vwap.seed(_typical_prices(series), _volumes(series), _sessions(series, intraday))
+        return state
+
+    def update(self, time_ns: int, close: float, high: Optional[float] = None,
+               low: Optional[float] = None, volume: Optional[float] = None) -> bool:
+        """
+        Applies one bar: a bar with the latest bar's time replaces it, a later
+        one is appended. Older bars are ignored (returns False).
+        """
+        key = self._key(time_ns)
+        if self.last_key is not None and key < self.last_key:
+            return False
+        high = close if high is None or math.isnan(high) else high
+        low = close if low is None or math.isnan(low) else low
+        volume = 0.0 if volume is None or math.isnan(volume) else float(volume)
+        price = (high + low + close) / 3.0 if self.has_range else close
+
+        if key == self.last_key:
+            for window in self.windows.values():
+                window.replace(close)
+            self.ema.replace(close)
+            self.rsi.replace(close)
+            self.macd.replace(close)
+            self.vwap.replace(price, volume)
+        else:
+            for window in self.windows.values():
+                window.push(close)
+            self.ema.push(close)
+            self.rsi.push(close)
+            self.macd.push(close)
+            self.vwap.push(price, volume, self._session(time_ns))
+            if self.origin is None:
+                self.origin = key
+            self.last_key = key
+        self.last_close, self.last_high, self.last_low = close, high, low
+        return True
+
+    def sync(self, series: PriceSeries, on_bar: Optional[Callable[[int], None]] = None) -> bool:
+        """
+        Brings the state up to date with a reloaded series by replaying only
+        the bars from the state's latest one onwards, calling `on_bar` with
+        each replayed bar's index. Returns False when the series does not
+        extend this state (different first bar, or the state holds a bar the
+        series lacks) and the state must be rebuilt.
+        """
+        if not len(series) or self.last_key is None or self._key(series.times[0]) != self.origin:
+            return False
+        keys = series.times // DAY_NS if not self.intraday else series.times
+        position = int(np.searchsorted(keys, self.last_key))
+        if position >= len(keys) or keys[position] != self.last_key:
+            return False
+
+        for i in range(position, len(series)):
+            self.update(
+                int(series.times[i]),
+                float(series.closes[i]),
+                float(series.highs[i]) if series.highs is not None else None,
+                float(series.lows[i]) if series.lows is not None else None,
+                float(series.volumes[i]) if series.volumes is not None else None
+            )
+            if on_bar is not None:
+                on_bar(i)
+        return True
+
+    def apply_quote(self, quote: StockQuote) -> bool:
+        """
+        Folds a live quote into the latest daily bar (or opens the next one).
+        The bar is the quote's trading date in MARKET_TIMEZONE, not its UTC
+        date. A quote dated after the last bar that merely repeats its close
+        is ignored: the market is closed and there is no new bar yet.
+        """
+        import pandas as pd
+        if self.intraday or self.last_key is None:
+            return False
+        session = pd.Timestamp(quote.as_of).tz_convert(settings.MARKET_TIMEZONE).tz_localize(None).normalize()
+        time_ns = session.value
+        key = self._key(time_ns)
+        if key == self.last_key:
+            return self.update(time_ns, quote.price, max(self.last_high, quote.price),
+                               min(self.last_low, quote.price), quote.volume)
+        if key > self.last_key and quote.price != self.last_close:
+            return self.update(time_ns, quote.price, volume=quote.volume)
+        return False
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """
+        Latest value of every indicator, with the same keys as `compute`.
+        """
+        middle = self.windows[BOLLINGER_WINDOW].mean()
+        std = self.windows[BOLLINGER_WINDOW].std()
+        line = self.macd.line()
+        signal = self.macd.signal.value
+        values = {f"sma_{window}": self.windows[window].mean() for window in SMA_WINDOWS}
+        values.update({
+            f"ema_{EMA_SPAN}": self.ema.value,
+            f"rsi_{RSI_PERIOD}": self.rsi.value(),
+            "macd": line,
+            "macd_signal": signal,
+            "macd_histogram": line - signal if line is not None and signal is not None else None,
+            "bb_middle": middle,
+            "bb_upper": middle + BOLLINGER_K * std if middle is not None else None,
+            "bb_lower": middle - BOLLINGER_K * std if middle is not None else None,
+            "vwap": self.vwap.value(),
+        })
+        return values
+
+def _to_list(values: np.ndarray) -> list:
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+def _load_values(key: Tuple[str, str, str], series: PriceSeries,
+                 intraday: bool) -> Tuple[Dict[str, np.ndarray], IndicatorState]:
+    """
+    The indicator arrays and latest state for `series`. When the series only
+    revises and extends the bars already computed, the state replays just
+    those bars and their values are written over the cached arrays' tail;
+    anything else is computed in full.
+    """
+    cached = _values_cache.get(key)
+    state = _state_cache.get(key)
+    if cached is not None and state is not None:
+        if cached["as_of"] == series.as_of and cached["length"] == len(series):
+            return cached["values"], state
+
+        rows: Dict[int, Dict[str, Optional[float]]] = {}
+
+        def record(i: int):
+            rows[i] = state.snapshot()
+
+        # The state must end on the last bar the arrays hold
+        if state.sync(series, record) and rows and min(rows) == cached["length"] - 1:
+            start = min(rows)
+            values = {}
+            for name, column in cached["values"].items():
+                tail = [rows[i][name] for i in range(start, len(series))]
+                values[name] = np.concatenate([column[:start], np.array(tail, dtype=np.float64)])
+            return _store_values(key, series, intraday, values, state), state
+
+    state = IndicatorState.from_series(series, intraday)
+    return _store_values(key, series, intraday, compute(series, intraday), state), state
+
+def _store_values(key: Tuple[str, str, str], series: PriceSeries, intraday: bool,
+                  values: Dict[str, np.ndarray], state: IndicatorState) -> Dict[str, np.ndarray]:
+    _values_cache.set(key, {"as_of": series.as_of, "length": len(series), "values": values})
+    _state_cache.set(key, state)
+    if not intraday:
+        _daily_keys[key[0]] = key
+    return values
+
+async def get_indicators(symbol: str, period: str = "1y", interval: str = "1d",
+                         max_points: Optional[int] = None) -> Optional[dict]:
+    """
+    Technical indicators over the symbol's history. Indicators are computed
+    on the full-resolution series; the returned arrays are then downsampled
+    at the same LTTB points as the closes. Returns None when no bars are
+    available.
+    """
+    symbol = symbol.upper()
+    series = await market_service.get_historical_series(symbol, period, interval)
+    if not series:
+        return None
+
+    values, state = _load_values((symbol, period, interval), series, interval != "1d")
+
+    if max_points and len(series) > max_points:
+        indices = lttb_indices(series.times / 1e9, series.closes, max_points)
+        series = series.take(indices)
+        values = {name: column[indices] for name, column in values.items()}
+
+    return {
+        "symbol": symbol,
+        "period": period,
+        "interval": interval,
+        "dates": series.dates,
+        "close": series.closes.tolist(),
+        "indicators": {name: _to_list(column) for name, column in values.items()},
+        "latest": state.snapshot(),
+        "as_of": series.as_of
+    }
+
+def latest(symbol: str, quote: Optional[StockQuote] = None) -> Optional[Dict[str, float]]:
+    """
+    Latest daily indicators for a symbol if they are already held in memory,
+    with `quote` folded into today's bar. Never fetches anything, so callers
+    on the request path (the sentiment prompt) pay nothing when it is missing.
+    The quote is applied to a copy: the cached state only follows the bars.
+    """
+    key = _daily_keys.get(symbol.upper())
+    state = _state_cache.get(key) if key else None
+    if state is None:
+        return None
+    if quote is not None:
+        state = copy.deepcopy(state)
+        state.apply_quote(quote)
+    return {name: value for name, value in state.snapshot().items() if value is not None}
@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional
+
+import numpy as np
+
+from .providers.base import period_start
+from .series import PriceSeries
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MINUTE_NS = 60 * 10**9
+DAY_NS = 86_400 * 10**9
+
+# Bar widths of the intervals that can be derived from finer bars
+INTERVAL_NS = {
+    "1m": MINUTE_NS,
+    "5m": 5 * MINUTE_NS,
+    "15m": 15 * MINUTE_NS,
+    "30m": 30 * MINUTE_NS,
+    "1h": 60 * MINUTE_NS,
+}
+
+# Periods counted in trading sessions rather than calendar days (as Yahoo does)
+_SESSION_PERIODS = {"1d": 1, "5d": 5}
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+def resample(columns: Dict[str, np.ndarray], width: int, origin: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Vectorized OHLCV resampling of fine bars into bars `width` nanoseconds wide.
+
+    `columns` holds `wall` (exchange-local wall clock, used for bucketing),
+    `time` (UTC) and the price columns, sorted by time. Buckets are anchored
+    at each session's first bar, so hourly bars start at 9:30 like Yahoo's.
+    `origin` re-anchors the first session at a known bucket start (used when
+    resampling only the tail of a series). The result also has `row`, the
+    index of each bucket's first input bar.
+    """
+    wall = columns["wall"]
+    n = len(wall)
+    if n == 0:
+        empty = {name: values[:0] for name, values in columns.items()}
+        empty["row"] = np.empty(0, dtype=np.int64)
+        return empty
+
+    day = wall // DAY_NS
+    session_starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    anchor = np.repeat(wall[session_starts], np.diff(np.r_[session_starts, n]))
+    if origin is not None:
+        anchor[day == origin // DAY_NS] = origin
+    bucket = anchor + (wall - anchor) // width * width
+
+    edges = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    last = np.r_[edges[1:] - 1, n - 1]
+    return {
+        "wall": bucket[edges],
+        # Same UTC offset as the bucket's first bar
+        "time": bucket[edges] + (columns["time"][edges] - wall[edges]),
+        "open": columns["open"][edges],
+        "high": np.fmax.reduceat(columns["high"], edges),
+        "low": np.fmin.reduceat(columns["low"], edges),
+        "close": columns["close"][last],
+        "volume": np.add.reduceat(np.nan_to_num(columns["volume"]), edges),
+        "row": edges,
+    }
+
+@dataclass
+class _View:
+    """
+    One derived interval, with the fine row each of its bars starts at.
+    """
+    generation: int
+    columns: Dict[str, np.ndarray]
+
+class IntradayBars:
+    """
+    The finest intraday bars held for one symbol, and every coarser interval
+    derived from them.
+
+    New fine bars are merged in as they are fetched: the last held bar (which
+    may have been partial) is replaced and later ones appended. Derived
+    intervals are then updated incrementally: only their last bar, which the
+    new fine bars may extend, and the bars after it are recomputed. A merge
+    that does not continue the held bars (e.g. after a gap) rebuilds them.
+    """
+
+    def __init__(self, interval: str):
+        self.interval = interval
+        self.columns: Dict[str, np.ndarray] = {name: np.empty(0) for name in PRICE_COLUMNS}
+        self.columns["wall"] = np.empty(0, dtype=np.int64)
+        self.columns["time"] = np.empty(0, dtype=np.int64)
+        self.fetched_at = 0.0  # epoch seconds of the last upstream fetch
+        self._generation = 0
+        self._views: Dict[str, _View] = {}
+
+    def __len__(self) -> int:
+        return len(self.columns["time"])
+
+    def merge(self, bars: "pd.DataFrame", timezone: Optional[str] = None):
+        """
+        Merges stored bars (naive UTC index, as the bar store returns them)
+        whose times are in `timezone`.
+        """
+        import pandas as pd
+        if bars.empty:
+            return
+        index = pd.DatetimeIndex(bars.index)
+        times = index.as_unit("ns").asi8
+        wall = times
+        if timezone:
+            wall = index.tz_localize("UTC").tz_convert(timezone).tz_localize(None).as_unit("ns").asi8
+        incoming = {"wall": wall, "time": times}
+        incoming.update({name: bars[name.capitalize()].to_numpy(dtype=np.float64) for name in PRICE_COLUMNS})
+
+        held = self.columns["time"]
+        if len(held) and held[-1] >= times[0]:
+            # Continues the held bars: replace from the last held one onwards
+            tail = times >= held[-1]
+            if not tail.any():
+                return
+            cut = int(np.searchsorted(held, times[tail][0]))
+            self.columns = {name: np.concatenate([self.columns[name][:cut], incoming[name][tail]])
+                            for name in incoming}
+        else:
+            self.columns = incoming
+            self._generation += 1
+
+    def _view(self, interval: str) -> Dict[str, np.ndarray]:
+        width = INTERVAL_NS[interval]
+        view = self._views.get(interval)
+        if view is not None and view.generation == self._generation and len(view.columns["row"]):
+            start = int(view.columns["row"][-1])
+            tail = resample({name: values[start:] for name, values in self.columns.items()}, width,
+                            origin=int(view.columns["wall"][-1]))
+            tail["row"] = tail["row"] + start
+            view.columns = {name: np.concatenate([values[:-1], tail[name]]) for name, values in view.columns.items()}
+        else:
+            view = self._views[interval] = _View(self._generation, resample(self.columns, width))
+        return view.columns
+
+    def series(self, interval: str, period: str) -> Optional[PriceSeries]:
+        """
+        Bars of `interval` covering `period`, computed locally.
+        """
+        import pandas as pd
+        if not len(self):
+            return None
+        columns = self.columns if interval == self.interval else self._view(interval)
+        wall = columns["wall"]
+
+        day = wall // DAY_NS
+        if period in _SESSION_PERIODS:
+            sessions = np.unique(day)
+            first = int(np.searchsorted(day, sessions[max(len(sessions) - _SESSION_PERIODS[period], 0)]))
+        else:
+            last_day = pd.Timestamp(int(day[-1]) * DAY_NS)
+            start = period_start(period, last_day)
+            first = int(np.searchsorted(wall, start.value)) if start is not None else 0
+
+        # "2024-05-01T09:30" -> "2024-05-01 09:30"; several times faster than strftime
+        stamps = np.datetime_as_string(wall[first:].astype("datetime64[ns]"), unit="m").tolist()
+        dates = [stamp.replace("T", " ") for stamp in stamps]
+        return PriceSeries(
+            dates=dates,
+            times=columns["time"][first:],
+            closes=columns["close"][first:],
+            as_of=self.fetched_at,
+            highs=columns["high"][first:],
+            lows=columns["low"][first:],
+            volumes=columns["volume"][first:]
+        )
@@ -1,84 +1,679 @@
-import yfinance as yf
+import asyncio
+import functools
+import math
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .. import metrics
 from ..config import get_settings
+from ..models import StockQuote
+from . import providers, refresher
+from .bar_store import BarStore
+from .cache import FRESH, STALE, TTLCache
+from .concurrency import SingleFlight, run_blocking
+from .intraday import IntradayBars
+from .providers.base import last_action_date, period_start
+from .rate_limiter import BACKGROUND, INTERACTIVE, AdaptiveRateLimiter, RateLimited, is_throttle, worker_share
+from .series import PriceSeries, downsample, series_from_bars
+from .shared_cache import SharedCache
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 settings = get_settings()
 
-async def get_realtime_stock_data(symbol: str):
+HISTORY_PERIODS = ("1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max")
+HISTORY_INTERVALS = ("1m", "5m", "15m", "30m", "1h", "1d")
+
+# Yahoo only serves intraday bars for recent ranges. For each period only the
+# finest interval available is fetched; the coarser ones are resampled from it.
+_INTRADAY_PERIODS = {
+    "1m": ("1d", "5d"),
+    "5m": ("1d", "5d", "1mo"),
+    "15m": ("1d", "5d", "1mo"),
+    "30m": ("1d", "5d", "1mo"),
+    "1h": ("1d", "5d", "1mo", "3mo", "6mo", "1y"),
+}
+
+# Created on first use so tests and tools can point it elsewhere
+_bar_store: Optional[BarStore] = None
+
+# Cache tier shared with the other worker processes on this host (SHARED_CACHE_ENABLED)
+_shared_cache: Optional[SharedCache] = None
+
+# Concurrent requests for the same data share one upstream fetch
+_inflight = SingleFlight()
+
+# This worker's share of the request budget for the market data provider
+_rate, _burst = worker_share(settings.MARKET_DATA_RATE_LIMIT, settings.MARKET_DATA_BURST, settings.WEB_CONCURRENCY)
+_limiter = AdaptiveRateLimiter(
+    "market_data",
+    rate=_rate,
+    burst=_burst,
+    max_wait=settings.RATE_LIMIT_MAX_WAIT,
+    max_queue=settings.RATE_LIMIT_MAX_QUEUE
+)
+
+_quote_cache = TTLCache(
+    "quotes",
+    ttl=settings.QUOTE_CACHE_TTL,
+    stale_ttl=settings.CACHE_STALE_TTL,
+    max_entries=settings.CACHE_MAX_ENTRIES
+)
+_history_cache = TTLCache(
+    "history",
+    ttl=settings.HISTORY_CACHE_TTL,
+    stale_ttl=settings.CACHE_STALE_TTL,
+    max_entries=settings.CACHE_MAX_ENTRIES
+)
+
+# Intraday series expire sooner so the current (partial) bar keeps up with the market
+_intraday_cache = TTLCache(
+    "intraday",
+    ttl=settings.INTRADAY_CACHE_TTL,
+    stale_ttl=settings.CACHE_STALE_TTL,
+    max_entries=settings.CACHE_MAX_ENTRIES
+)
+# Finest intraday bars per (symbol, interval), updated incrementally; every intraday series is derived from these
+_intraday_bars = TTLCache("intraday_bars", ttl=settings.REFRESH_IDLE_TTL, max_entries=settings.CACHE_MAX_ENTRIES)
+
+metrics.register_caches(lambda: (_quote_cache, _history_cache, _intraday_cache, _intraday_bars))
+
+# Strong references to background refreshes so they are not garbage collected mid-flight
+_background_tasks = set()
+
+async def cache_stats() -> dict:
+    """
+    Hit/miss/eviction counters and entry ages for the market data caches.
+    The shared tier's counts are read on a worker thread.
+    """
+    stats = {
+        "quotes": _quote_cache.stats(),
+        "history": _history_cache.stats(),
+        "intraday": _intraday_cache.stats(),
+        "intraday_bars": _intraday_bars.stats()
+    }
+    shared = get_shared_cache()
+    if shared is not None:
+        stats["shared"] = await shared.astats()
+    return stats
+
+def limiter_stats() -> dict:
+    return _limiter.stats()
+
+def clear_caches():
+    _quote_cache.clear()
+    _history_cache.clear()
+    _intraday_cache.clear()
+    _intraday_bars.clear()
+
+def shared_cache_enabled() -> bool:
+    """
+    SHARED_CACHE_ENABLED, or by default whether there are other workers to share with.
+    """
+    if settings.SHARED_CACHE_ENABLED is not None:
+        return settings.SHARED_CACHE_ENABLED
+    return settings.WEB_CONCURRENCY > 1
+
+def get_shared_cache() -> Optional[SharedCache]:
+    global _shared_cache
+    if _shared_cache is None and shared_cache_enabled():
+        _shared_cache = SharedCache(
+            settings.SHARED_CACHE_PATH,
+            lease_seconds=settings.SHARED_CACHE_LEASE_SECONDS,
+            max_age=max(settings.QUOTE_CACHE_TTL, settings.HISTORY_CACHE_TTL) + settings.CACHE_STALE_TTL
+        )
+    return _shared_cache
+
+def _shared_key(key: tuple) -> str:
+    return ":".join(str(part) for part in key)
+
+def _spawn(coro: Awaitable):
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_done)
+
+def _on_background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    # Refreshes shed by the rate limiter are simply retried on the next request
+    if not task.cancelled() and task.exception() is not None and not isinstance(task.exception(), RateLimited):
+        print(f"Background refresh failed: {task.exception()}")
+
+async def _call_upstream(func: Callable, *args, priority: int = INTERACTIVE):
     """
-    Fetches real-time stock data from yfinance.
+    Runs a blocking provider call on the upstream executor once the rate
+    limiter grants it a token. Throttling responses surface as RateLimited.
     """
     try:
-        ticker = yf.Ticker(symbol)
-        # fast_info provides basic realtime data without full download
-        info = ticker.fast_info
-        
-        # yfinance fast_info keys: 
-        # last_price, previous_close, open, day_high, day_low, year_high, year_low...
-        # We need to calculate change percent manually or fetch from ticker.info (slower)
-        # Using fast_info for speed.
-        
-        price = info.last_price
-        prev_close = info.previous_close
-        
-        if prev_close and prev_close != 0:
-            change_percent = ((price - prev_close) / prev_close) * 100
-        else:
-            change_percent = 0.0
-            
-        return {
-            "symbol": symbol.upper(),
-            "price": str(price), # preserving string format for frontend consistency if needed, checking existing impl
-            "change_percent": f"{change_percent:.4f}%",
-            "volume": str(int(info.last_volume)) if hasattr(info, 'last_volume') else "0"
-        }
+        await _limiter.acquire(priority)
+    except RateLimited:
+        metrics.upstream_requests.inc(upstream=_limiter.name, operation="request", outcome="shed")
+        raise
+    try:
+        return await run_blocking(func, *args)
+    except Exception as e:
+        if is_throttle(e):
+            raise RateLimited(_limiter.name, _limiter.retry_after()) from e
+        raise
+
+def _call_provider(operation: str, call: Callable):
+    """
+    Calls the provider (on the upstream executor), timing the call and
+    feeding its outcome back to the rate limiter.
+    """
+    provider = providers.get_provider()
+    try:
+        with metrics.track_upstream(provider.name, operation):
+            result = call(provider)
     except Exception as e:
+        _limiter.record_failure(e)
+        raise
+    _limiter.record_success()
+    return result
+
+async def _load(cache: TTLCache, key: Hashable, fetch: Callable[[int], Awaitable], priority: int = INTERACTIVE):
+    """
+    Fetches a value through the single-flight group and stores non-empty results.
+    `fetch` takes the rate limiter priority of the call.
+    """
+    async def load():
+        shared = get_shared_cache()
+        if shared is not None:
+            return await _load_shared(shared, cache, key, fetch, priority)
+        value = await fetch(priority)
+        if value:
+            cache.set(key, value)
+        return value
+
+    return await _inflight.do(key, load)
+
+async def _load_shared(shared: SharedCache, cache: TTLCache, key: tuple, fetch: Callable[[int], Awaitable],
+                       priority: int):
+    """
+    Reuses another worker's fresh entry, otherwise takes the key's lease and
+    fetches. While another worker holds the lease, this one serves that
+    worker's previous entry if it is within the stale window, or waits for
+    its result; an abandoned lease expires after SHARED_CACHE_LEASE_SECONDS.
+    """
+    name = _shared_key(key)
+    while True:
+        entry = await shared.aget(name)
+        if entry is not None and entry[1] < cache.ttl:
+            cache.set(key, entry[0], age=entry[1])
+            return entry[0]
+        if await shared.aacquire(name):
+            break
+        if entry is not None and entry[1] < cache.ttl + cache.stale_ttl:
+            cache.set(key, entry[0], age=entry[1])
+            return entry[0]
+        await asyncio.sleep(settings.SHARED_CACHE_POLL_SECONDS)
+
+    try:
+        value = await fetch(priority)
+        if value:
+            await shared.aset(name, value)
+            cache.set(key, value)
+        return value
+    finally:
+        await shared.arelease(name)
+
+async def _cached(cache: TTLCache, key: Hashable, fetch: Callable[[], Awaitable]):
+    """
+    Serves fresh entries directly, serves stale entries while refreshing them
+    in the background, and fetches on a miss. A miss the rate limiter sheds
+    is served the last value held at any age, if there is one.
+    """
+    status, value = cache.lookup(key)
+    if status == FRESH:
+        return value
+    if status == STALE:
+        _spawn(_load(cache, key, fetch, BACKGROUND))
+        return value
+    try:
+        return await _load(cache, key, fetch)
+    except RateLimited:
+        value = await _last_known(cache, key)
+        if value is None:
+            raise
+        return value
+
+async def _last_known(cache: TTLCache, key: tuple):
+    """
+    The newest value this worker or, with the shared tier, any worker still holds, however old.
+    """
+    value = cache.last_known(key)
+    shared = get_shared_cache()
+    if value is None and shared is not None:
+        entry = await shared.aget(_shared_key(key))
+        value = entry[0] if entry is not None else None
+    return value
+
+def _build_quote(symbol: str, price: float, prev_close: Optional[float], volume,
+                 average_volume: Optional[float] = None) -> StockQuote:
+    """
+    Builds the quote shared by the single and batch endpoints.
+    """
+    if prev_close and prev_close != 0:
+        change_percent = ((price - prev_close) / prev_close) * 100
+    else:
+        change_percent = 0.0
+
+    return StockQuote(
+        symbol=symbol.upper(),
+        price=float(price),
+        change_percent=round(change_percent, 4),
+        volume=int(volume) if volume is not None and not math.isnan(volume) else 0,
+        as_of=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        average_volume=float(average_volume) if average_volume and not math.isnan(average_volume) else None
+    )
+
+def _build_quote_from_raw(symbol: str, raw: dict) -> StockQuote:
+    return _build_quote(symbol, raw["price"], raw.get("previous_close"), raw.get("volume"), raw.get("average_volume"))
+
+def _fetch_quote_sync(symbol: str) -> Optional[StockQuote]:
+    """
+    Blocking provider quote lookup. Runs on the upstream executor.
+    """
+    try:
+        raw = _call_provider("quote", lambda provider: provider.fetch_quote(symbol))
+        return _build_quote_from_raw(symbol, raw) if raw else None
+    except Exception as e:
+        if is_throttle(e):
+            raise
         print(f"Error fetching data for {symbol}: {e}")
         return None
 
-async def get_historical_data(symbol: str):
+async def get_realtime_stock_data(symbol: str) -> Optional[StockQuote]:
     """
-    Fetches daily time series for charting using yfinance.
+    Fetches real-time stock data from the market data provider.
     """
-    try:
-        # Download last 1 month of data, 1 day interval
-        df = yf.download(symbol, period="1mo", interval="1d", progress=False)
-        
-        if df.empty:
-            return []
-
-        chart_data = []
-        
-        # yfinance returns a DataFrame with DatetimeIndex
-        # Iterating directly to handle the index (Date) correctly
-        for date, row in df.iterrows():
-            # date is typically a Timestamp
+    symbol = symbol.upper()
+    quote = await _cached(_quote_cache, ("quote", symbol), _quote_loader(symbol))
+    if quote is not None:
+        refresher.record_demand(symbol)
+    return quote
+
+def _quote_loader(symbol: str):
+    return lambda priority: _call_upstream(_fetch_quote_sync, symbol, priority=priority)
+
+def _fetch_quotes_batch_sync(symbols: List[str]) -> Dict[str, StockQuote]:
+    """
+    Blocking multi-ticker provider request. Runs on the upstream executor.
+    """
+    raw_quotes = _call_provider("quotes", lambda provider: provider.fetch_quotes(symbols))
+    return {symbol: _build_quote_from_raw(symbol, raw) for symbol, raw in raw_quotes.items()}
+
+async def get_realtime_stock_data_batch(symbols: List[str]) -> dict:
+    """
+    Fetches real-time data for several symbols with a single multi-ticker
+    provider request. Symbols that cannot be resolved are reported
+    individually in `errors` instead of failing the whole batch.
+    """
+    symbols = [s.upper() for s in symbols]
+
+    quotes = {}
+    missing = []
+    stale = []
+    for symbol in symbols:
+        status, quote = _quote_cache.lookup(("quote", symbol))
+        if status == FRESH:
+            quotes[symbol] = quote
+        elif status == STALE:
+            quotes[symbol] = quote
+            stale.append(symbol)
+        else:
+            missing.append(symbol)
+
+    shared = get_shared_cache()
+    if shared is not None and missing:
+        # Quotes another worker already fetched
+        for symbol, (quote, age) in (await _adopt_shared_quotes(shared, missing)).items():
+            quotes[symbol] = quote
+            missing.remove(symbol)
+            if age >= _quote_cache.ttl:
+                stale.append(symbol)
+
+    if stale:
+        _spawn(_fetch_quotes_batch(stale, background=True))
+
+    failed = set()
+    limited = None
+    if missing:
+        try:
+            quotes.update(await _fetch_quotes_batch(missing))
+        except RateLimited as e:
+            limited = e
+            for symbol in missing:
+                quote = await _last_known(_quote_cache, ("quote", symbol))
+                if quote is not None:
+                    quotes[symbol] = quote
+        except Exception as e:
+            print(f"Error fetching batch data for {missing}: {e}")
+            failed.update(missing)
+
+    if limited is not None and not quotes:
+        raise limited
+
+    errors = {}
+    for symbol in symbols:
+        if symbol in failed:
+            errors[symbol] = "Upstream error"
+        elif limited is not None and symbol not in quotes:
+            errors[symbol] = "Rate limited, retry later"
+        elif symbol not in quotes:
+            errors[symbol] = "Symbol not found"
+
+    for symbol in quotes:
+        refresher.record_demand(symbol)
+    return {
+        "quotes": {symbol: quotes[symbol] for symbol in symbols if symbol in quotes},
+        "errors": errors
+    }
+
+async def refresh_quotes(symbols: List[str]) -> Dict[str, StockQuote]:
+    """
+    Re-fetches quotes into the cache without counting as demand. Used by the background refresher.
+    """
+    return await _fetch_quotes_batch([s.upper() for s in symbols], background=True)
+
+async def _adopt_shared_quotes(shared: SharedCache, symbols: List[str]) -> Dict[str, Tuple[StockQuote, float]]:
+    """
+    Copies quotes other workers stored (fresh or within the stale window)
+    into this worker's cache. Returns `{symbol: (quote, age_seconds)}`.
+    """
+    entries = await shared.aget_many(_shared_key(("quote", symbol)) for symbol in symbols)
+    adopted = {}
+    for symbol in symbols:
+        entry = entries.get(_shared_key(("quote", symbol)))
+        if entry is not None and entry[1] < _quote_cache.ttl + _quote_cache.stale_ttl:
+            _quote_cache.set(("quote", symbol), entry[0], age=entry[1])
+            adopted[symbol] = entry
+    return adopted
+
+async def _fetch_quotes_batch(symbols: List[str], background: bool = False) -> Dict[str, StockQuote]:
+    """
+    One coalesced multi-ticker fetch; every resolved quote is written to the
+    quote cache (and the shared tier, when enabled). With the shared tier,
+    only symbols whose lease this worker takes are fetched. Background
+    refreshes skip the others, and those refreshed within
+    REFRESH_MIN_INTERVAL; interactive calls wait for the holder's result,
+    as `_load_shared` does, and fetch what it leaves unresolved themselves.
+    """
+    priority = BACKGROUND if background else INTERACTIVE
+
+    async def load():
+        shared = get_shared_cache()
+        if shared is None:
+            quotes = await _call_upstream(_fetch_quotes_batch_sync, symbols, priority=priority)
+            for symbol, quote in quotes.items():
+                _quote_cache.set(("quote", symbol), quote)
+            return quotes
+
+        quotes = {}
+
+        async def adopt(pending: List[str]) -> List[str]:
+            adopted = await _adopt_shared_quotes(shared, pending)
+            quotes.update({symbol: quote for symbol, (quote, _) in adopted.items()})
+            return [symbol for symbol in pending if symbol not in adopted]
+
+        wanted = symbols
+        if background:
+            recent = {symbol: quote for symbol, (quote, age) in (await _adopt_shared_quotes(shared, symbols)).items()
+                      if age < settings.REFRESH_MIN_INTERVAL}
+            quotes.update(recent)
+            wanted = [symbol for symbol in symbols if symbol not in recent]
+
+        while wanted:
+            names = {_shared_key(("quote", symbol)): symbol for symbol in wanted}
+            leased = await shared.aacquire_many(names)
+            held = [names[name] for name in leased]
             try:
-                date_str = date.strftime('%Y-%m-%d')
-            except AttributeError:
-                # Fallback if date is not a timestamp (unlikely with yfinance)
-                date_str = str(date).split(' ')[0]
-
-            # Depending on yfinance version, columns could be MultiIndex or simple.
-            # Usually 'Close' is the column name.
-            close_val = row['Close']
-            
-            # handle potential multi-index (e.g. if multiple tickers downloaded) or scalar
-            if hasattr(close_val, 'item'): 
-                val = close_val.item()
-            else:
-                val = float(close_val)
-                
-            chart_data.append({
-                "date": date_str,
-                "close": val
-            })
-            
-        # Ensure standard order if needed, but 'download' usually returns chronological.
-        # The frontend likely expects chronological or reverse.
-        # Original code: reversed(dates) -> forward order (oldest to newest).
-        # yfinance returns oldest to newest by default.
-        return chart_data
-        
+                fetched = await _call_upstream(_fetch_quotes_batch_sync, held, priority=priority) if held else {}
+                await shared.aset_many({_shared_key(("quote", symbol)): quote for symbol, quote in fetched.items()})
+            finally:
+                await shared.arelease(*leased)
+            for symbol, quote in fetched.items():
+                _quote_cache.set(("quote", symbol), quote)
+            quotes.update(fetched)
+
+            wanted = [symbol for symbol in wanted if symbol not in held]
+            if background or not wanted:
+                break
+            # Another worker is fetching these: use its result instead of fetching them too
+            wanted = await adopt(wanted)
+            if wanted:
+                await asyncio.sleep(settings.SHARED_CACHE_POLL_SECONDS)
+                wanted = await adopt(wanted)
+        return quotes
+
+    return await _inflight.do(("batch", tuple(sorted(symbols))), load)
+
+def validate_history_range(period: str, interval: str):
+    """
+    Raises ValueError for period/interval combinations we cannot serve.
+    """
+    if period not in HISTORY_PERIODS:
+        raise ValueError(f"Unsupported period '{period}'. Use one of: {', '.join(HISTORY_PERIODS)}")
+    if interval not in HISTORY_INTERVALS:
+        raise ValueError(f"Unsupported interval '{interval}'. Use one of: {', '.join(HISTORY_INTERVALS)}")
+    if interval in _INTRADAY_PERIODS and period not in _INTRADAY_PERIODS[interval]:
+        allowed = ", ".join(_INTRADAY_PERIODS[interval])
+        raise ValueError(f"Interval '{interval}' is only available for periods: {allowed}")
+
+async def get_historical_data(symbol: str, period: str = "1mo", interval: str = "1d",
+                              max_points: Optional[int] = None):
+    """
+    Fetches a close-price time series for charting. Daily bars are served
+    from the local bar store (only missing ranges are downloaded). Intraday
+    series are resampled from the finest interval available for the period,
+    which is also kept in the bar store and refreshed incrementally, so
+    switching intervals does not call the provider. Series longer than
+    `max_points` are downsampled with LTTB.
+    """
+    series = await get_historical_series(symbol, period, interval, max_points)
+    return series.to_points() if series else []
+
+async def get_historical_series(symbol: str, period: str = "1mo", interval: str = "1d",
+                                max_points: Optional[int] = None) -> Optional[PriceSeries]:
+    """
+    Same as `get_historical_data` but returns the PriceSeries itself (with its
+    `as_of` load time), or None when no bars are available.
+    """
+    symbol = symbol.upper()
+    series = await _cached(_series_cache(interval), ("history", symbol, period, interval),
+                           _history_loader(symbol, period, interval))
+    if not series:
+        return None
+    refresher.record_demand(symbol, period, interval)
+    if max_points:
+        series = downsample(series, max_points)
+    return series
+
+async def refresh_history(symbol: str, period: str, interval: str):
+    """
+    Re-fetches a history series into the cache without counting as demand.
+    """
+    symbol = symbol.upper()
+    await _load(_series_cache(interval), ("history", symbol, period, interval),
+                _history_loader(symbol, period, interval), BACKGROUND)
+
+def source_interval(period: str) -> str:
+    """
+    The finest intraday interval the provider serves for `period`.
+    """
+    return next(interval for interval, periods in _INTRADAY_PERIODS.items() if period in periods)
+
+def _series_cache(interval: str) -> TTLCache:
+    return _history_cache if interval == "1d" else _intraday_cache
+
+def _history_loader(symbol: str, period: str, interval: str):
+    if interval != "1d":
+        return lambda priority: _load_intraday_series(symbol, period, interval, priority)
+    return lambda priority: _load_daily_series(symbol, period, priority)
+
+async def _load_intraday_series(symbol: str, period: str, interval: str, priority: int) -> Optional[PriceSeries]:
+    """
+    Resamples the series from the symbol's finest bars for the period. The
+    provider is only called when those bars are older than INTRADAY_CACHE_TTL.
+    """
+    key = ("bars", symbol, source_interval(period))
+    bars = _intraday_bars.get(key)
+    if bars is None or time.time() - bars.fetched_at >= settings.INTRADAY_CACHE_TTL:
+        bars = await _inflight.do(key, lambda: _refresh_intraday_bars(key, priority))
+    return bars.series(interval, period)
+
+async def _refresh_intraday_bars(key: tuple, priority: int) -> IntradayBars:
+    _, symbol, interval = key
+    bars = _intraday_bars.last_known(key) or IntradayBars(interval)
+    held = bars.columns["time"]
+    since = int(held[-1]) if len(held) else None
+    frame, timezone, fetched_at = await _call_upstream(_load_intraday_bars_sync, symbol, interval, since,
+                                                       priority=priority)
+    # Merged on the event loop: series for other intervals are derived from the same object
+    bars.merge(frame, timezone)
+    bars.fetched_at = fetched_at
+    _intraday_bars.set(key, bars)
+    return bars
+
+def get_bar_store() -> BarStore:
+    global _bar_store
+    if _bar_store is None:
+        _bar_store = BarStore(settings.BAR_STORE_DIR, settings.BAR_STORE_MAX_SEGMENTS)
+    return _bar_store
+
+def _download_bars_sync(symbol: str, interval: str = "1d", **kwargs) -> "pd.DataFrame":
+    return _call_provider("bars", lambda provider: provider.fetch_bars(symbol, interval=interval, **kwargs))
+
+def _plan_daily_downloads(symbol: str, period: str) -> List[Tuple[dict, dict, bool]]:
+    """
+    The downloads that bring the stored daily bars up to `period`: older
+    history the store does not cover yet, and bars since the last stored one
+    (which may still be today's partial bar). Each is a triple of
+    `fetch_bars` and `BarStore.write` keyword arguments and whether the
+    download replaces everything stored (bars stored before prices were
+    adjusted, which have no `last_action`).
+    """
+    import pandas as pd
+    today = pd.Timestamp.today().normalize()
+    start = period_start(period, today)
+    tomorrow = today + pd.Timedelta(days=1)
+    meta = get_bar_store().meta(symbol, "1d")
+    requested = {"covered_from": start, "inception": start is None}
+
+    if meta is None:
+        download = {"period": "max"} if start is None else {"start": start, "end": tomorrow}
+        return [(download, requested, False)]
+    if "last_action" not in meta:
+        return [_rebuild_download(meta, requested) + (True,)]
+
+    plan = []
+    covered_from = pd.Timestamp(meta["covered_from"])
+    if not meta["inception"] and (start is None or start < covered_from):
+        download = {"period": "max"} if start is None else {"start": start, "end": covered_from}
+        plan.append((download, requested, False))
+    if time.time() - meta.get("fetched_at", 0) >= settings.HISTORY_CACHE_TTL:
+        plan.append(({"start": pd.Timestamp(meta["last"]), "end": tomorrow}, {}, False))
+    return plan
+
+def _rebuild_download(meta: dict, requested: dict) -> Tuple[dict, dict]:
+    """
+    The download (and write arguments) that re-fetches everything stored for
+    a symbol, plus the range being requested.
+    """
+    import pandas as pd
+    if meta["inception"] or requested.get("inception"):
+        return {"period": "max"}, {"covered_from": None, "inception": True}
+    covered_from = pd.Timestamp(meta["covered_from"])
+    if requested.get("covered_from") is not None:
+        covered_from = min(covered_from, pd.Timestamp(requested["covered_from"]))
+    tomorrow = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    return {"start": covered_from, "end": tomorrow}, {"covered_from": covered_from, "inception": False}
+
+def _store_daily_bars(symbol: str, bars: "pd.DataFrame", write: dict, replace: bool) -> Optional[Tuple[dict, dict]]:
+    """
+    Stores downloaded daily bars. Bars carrying a split or dividend newer
+    than the one the stored history is adjusted for are not written: the
+    action re-adjusts every earlier price, so the download that rebuilds the
+    whole history is returned instead.
+    """
+    store = get_bar_store()
+    action = last_action_date(bars)
+    if replace:
+        store.replace(symbol, "1d", bars, last_action=action, **write)
+        return None
+    meta = store.meta(symbol, "1d")
+    if meta is not None and action is not None and action > (meta.get("last_action") or ""):
+        return _rebuild_download(meta, write)
+    store.write(symbol, "1d", bars, last_action=action, **write)
+    return None
+
+def _read_daily_series(symbol: str, period: str) -> Optional[PriceSeries]:
+    import pandas as pd
+    df = get_bar_store().read(symbol, "1d", start=period_start(period, pd.Timestamp.today().normalize()))
+    if df.empty:
+        return None
+    # Bars are ordered oldest to newest, which is what the chart expects.
+    series = series_from_bars(df)
+    series.as_of = time.time()
+    return series
+
+async def _load_daily_series(symbol: str, period: str, priority: int) -> Optional[PriceSeries]:
+    """
+    Serves daily bars from the store, downloading only what is missing, and
+    everything again after a split or dividend. Each download takes its own
+    rate limiter token; throttling surfaces as RateLimited, other provider
+    errors serve whatever the store holds.
+    """
+    try:
+        for download, write, replace in await run_blocking(_plan_daily_downloads, symbol, period):
+            bars = await _call_upstream(functools.partial(_download_bars_sync, symbol, **download), priority=priority)
+            rebuild = await run_blocking(_store_daily_bars, symbol, bars, write, replace)
+            if rebuild is not None:
+                download, write = rebuild
+                bars = await _call_upstream(functools.partial(_download_bars_sync, symbol, **download),
+                                            priority=priority)
+                await run_blocking(_store_daily_bars, symbol, bars, write, True)
+                # The rebuild covers the rest of the plan
+                break
+    except RateLimited:
+        raise
+    except Exception as e:
+        print(f"Error filling history gaps for {symbol}: {e}")
+
+    try:
+        return await run_blocking(_read_daily_series, symbol, period)
     except Exception as e:
         print(f"Error fetching historical data for {symbol}: {e}")
-        return []
+        return None
+
+def _load_intraday_bars_sync(symbol: str, interval: str,
+                             since: Optional[int] = None) -> Tuple["pd.DataFrame", Optional[str], float]:
+    """
+    Brings the stored `interval` bars up to date and returns those from
+    `since` (UTC epoch nanoseconds) onwards, or the whole window the provider
+    serves. Only bars since the last stored one are downloaded, which also
+    updates that bar if it was still forming. Returns the bars, their exchange
+    time zone and when they were last fetched.
+    """
+    import pandas as pd
+    store = get_bar_store()
+    window = _INTRADAY_PERIODS[interval][-1]
+    window_start = period_start(window, pd.Timestamp.now(tz="UTC").tz_localize(None).normalize())
+    meta = store.meta(symbol, interval)
+
+    try:
+        if meta is None or pd.Timestamp(meta["last"]) < window_start:
+            store.write(symbol, interval, _download_bars_sync(symbol, interval=interval, period=window))
+        elif time.time() - meta.get("fetched_at", 0) >= settings.INTRADAY_CACHE_TTL:
+            last = store.read(symbol, interval, start=pd.Timestamp(meta["last"])).index[-1]
+            store.write(symbol, interval, _download_bars_sync(symbol, interval=interval, start=last.tz_localize("UTC")))
+    except Exception as e:
+        if is_throttle(e):
+            raise
+        # Serve whatever we already hold
+        print(f"Error fetching {interval} bars for {symbol}: {e}")
+
+    meta = store.meta(symbol, interval) or {}
+    start = pd.Timestamp(since) if since is not None else window_start
+    return store.read(symbol, interval, start=start), meta.get("timezone"), meta.get("fetched_at", 0.0)
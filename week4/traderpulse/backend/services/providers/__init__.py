@@ -0,0 +1,44 @@
+from typing import Optional
+
+from ...config import get_settings
+from .base import MarketDataProvider
+
+_provider: Optional[MarketDataProvider] = None
+
+def create_provider(name: str) -> MarketDataProvider:
+    """
+    Builds a provider by name: "yfinance" (live), "record" (live + capture to
+    disk) or "replay" (recorded responses with injected latency, no network).
+    """
+    settings = get_settings()
+    if name == "yfinance":
+        from .yfinance_provider import YFinanceProvider
+        return YFinanceProvider()
+    if name == "record":
+        from .recording import RecordingProvider
+        from .yfinance_provider import YFinanceProvider
+        return RecordingProvider(YFinanceProvider(), settings.MARKET_DATA_RECORDINGS_DIR)
+    if name == "replay":
+        from .recording import ReplayProvider
+        return ReplayProvider(
+            settings.MARKET_DATA_RECORDINGS_DIR,
+            latency_ms=settings.REPLAY_LATENCY_MS,
+            jitter_ms=settings.REPLAY_JITTER_MS
+        )
+    raise ValueError(f"Unknown market data provider '{name}'")
+
+def get_provider() -> MarketDataProvider:
+    """
+    Returns the provider selected by MARKET_DATA_PROVIDER.
+    """
+    global _provider
+    if _provider is None:
+        _provider = create_provider(get_settings().MARKET_DATA_PROVIDER)
+    return _provider
+
+def set_provider(provider: MarketDataProvider):
+    """
+    Replaces the active provider (benchmarks, tests).
+    """
+    global _provider
+    _provider = provider
@@ -0,0 +1,74 @@
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Optional per-bar corporate actions (0 on bars without one)
+ACTION_COLUMNS = ["Dividends", "Stock Splits"]
+
+# pd.DateOffset arguments per period (pandas is imported on first use)
+_PERIOD_OFFSETS = {
+    "1d": {"days": 1},
+    "5d": {"days": 5},
+    "1mo": {"months": 1},
+    "3mo": {"months": 3},
+    "6mo": {"months": 6},
+    "1y": {"years": 1},
+    "2y": {"years": 2},
+    "5y": {"years": 5},
+    "10y": {"years": 10},
+}
+
+def period_start(period: str, today: "pd.Timestamp") -> Optional["pd.Timestamp"]:
+    """
+    First date covered by a yfinance-style period, or None for "max".
+    """
+    import pandas as pd
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=today.year, month=1, day=1)
+    return today - pd.DateOffset(**_PERIOD_OFFSETS[period])
+
+def last_action_date(bars: "pd.DataFrame") -> Optional[str]:
+    """
+    Date (YYYY-MM-DD) of the latest split or dividend in `bars`, or None.
+    """
+    import pandas as pd
+    columns = [column for column in ACTION_COLUMNS if column in bars]
+    if not columns or bars.empty:
+        return None
+    dates = bars.index[(bars[columns].fillna(0) != 0).any(axis=1)]
+    return pd.Timestamp(dates.max()).strftime("%Y-%m-%d") if len(dates) else None
+
+def empty_bars() -> "pd.DataFrame":
+    import pandas as pd
+    return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+
+class MarketDataProvider(ABC):
+    """
+    Source of raw market data. Methods are synchronous; market_service runs
+    them on the upstream executor.
+
+    Quotes are plain dicts: `{"price": float, "previous_close": float | None, "volume": float | None}`.
+    Bars are DataFrames indexed by timestamp with `BAR_COLUMNS`, prices
+    adjusted for splits and dividends, plus `ACTION_COLUMNS` when the
+    provider reports corporate actions.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def fetch_quote(self, symbol: str) -> Optional[dict]:
+        """Latest quote for one symbol, or None if it cannot be resolved."""
+
+    @abstractmethod
+    def fetch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        """Latest quotes for several symbols in one upstream request. Unknown symbols are left out."""
+
+    @abstractmethod
+    def fetch_bars(self, symbol: str, interval: str = "1d", start: Optional["pd.Timestamp"] = None,
+                   end: Optional["pd.Timestamp"] = None, period: Optional[str] = None) -> "pd.DataFrame":
+        """OHLCV bars for `period`, or for `[start, end)` when no period is given."""
@@ -0,0 +1,163 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .base import BAR_COLUMNS, MarketDataProvider, empty_bars, period_start
+
+class _Recordings:
+    """
+    On-disk layout shared by the recording and replay providers::
+
+        {root}/quotes/{SYMBOL}.json
+        {root}/bars/{interval}/{SYMBOL}.json
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _quote_path(self, symbol: str) -> str:
+        return os.path.join(self.root, "quotes", f"{symbol.upper()}.json")
+
+    def _bars_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, "bars", interval, f"{symbol.upper()}.json")
+
+    def load_quote(self, symbol: str) -> Optional[dict]:
+        return _read_json(self._quote_path(symbol))
+
+    def save_quote(self, symbol: str, quote: dict):
+        with self._lock:
+            _write_json(self._quote_path(symbol), quote)
+
+    def load_bars(self, symbol: str, interval: str) -> pd.DataFrame:
+        data = _read_json(self._bars_path(symbol, interval))
+        if not data:
+            return empty_bars()
+        index = pd.DatetimeIndex(np.array(data["time"], dtype="int64").astype("datetime64[ns]"), name="Date")
+        columns = {name: np.array(data[name], dtype="float64") for name in BAR_COLUMNS}
+        return pd.DataFrame(columns, index=index)
+
+    def merge_bars(self, symbol: str, interval: str, bars: pd.DataFrame):
+        """
+        Adds newly seen bars to the recording; later captures win on duplicate timestamps.
+        """
+        if bars.empty:
+            return
+        with self._lock:
+            merged = pd.concat([self.load_bars(symbol, interval), _naive(bars)])
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            _write_json(self._bars_path(symbol, interval), {
+                "time": merged.index.as_unit("ns").asi8.tolist(),
+                # NaN is not valid JSON
+                **{name: [None if np.isnan(v) else v for v in merged[name].to_numpy(dtype="float64").tolist()]
+                   for name in BAR_COLUMNS}
+            })
+
+class RecordingProvider(MarketDataProvider):
+    """
+    Passes every call through to another provider and captures the responses
+    to disk so they can be served later by `ReplayProvider`.
+    """
+
+    name = "record"
+
+    def __init__(self, inner: MarketDataProvider, root: str):
+        self.inner = inner
+        self.recordings = _Recordings(root)
+
+    def fetch_quote(self, symbol: str) -> Optional[dict]:
+        quote = self.inner.fetch_quote(symbol)
+        if quote is not None:
+            self.recordings.save_quote(symbol, quote)
+        return quote
+
+    def fetch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        quotes = self.inner.fetch_quotes(symbols)
+        for symbol, quote in quotes.items():
+            self.recordings.save_quote(symbol, quote)
+        return quotes
+
+    def fetch_bars(self, symbol: str, interval: str = "1d", start: Optional[pd.Timestamp] = None,
+                   end: Optional[pd.Timestamp] = None, period: Optional[str] = None) -> pd.DataFrame:
+        bars = self.inner.fetch_bars(symbol, interval=interval, start=start, end=end, period=period)
+        self.recordings.merge_bars(symbol, interval, bars)
+        return bars
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded responses without any network access.
+
+    Each call sleeps `latency_ms` plus a uniform `jitter_ms` drawn from a
+    seeded generator, so load tests see realistic but repeatable upstream
+    latency. Symbols that were never recorded behave like unknown symbols.
+    """
+
+    name = "replay"
+
+    def __init__(self, root: str, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.recordings = _Recordings(root)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _delay(self):
+        with self._random_lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        delay = (self.latency_ms + jitter) / 1000
+        if delay > 0:
+            time.sleep(delay)
+
+    def fetch_quote(self, symbol: str) -> Optional[dict]:
+        self._delay()
+        return self.recordings.load_quote(symbol)
+
+    def fetch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        self._delay()
+        quotes = {}
+        for symbol in symbols:
+            quote = self.recordings.load_quote(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def fetch_bars(self, symbol: str, interval: str = "1d", start: Optional[pd.Timestamp] = None,
+                   end: Optional[pd.Timestamp] = None, period: Optional[str] = None) -> pd.DataFrame:
+        self._delay()
+        bars = self.recordings.load_bars(symbol, interval)
+        if bars.empty:
+            return bars
+        if period:
+            # Periods are relative to the last recorded bar so replays do not drift with the wall clock
+            start, end = period_start(period, bars.index[-1].normalize()), None
+        if start is not None:
+            bars = bars[bars.index >= pd.Timestamp(start)]
+        if end is not None:
+            bars = bars[bars.index < pd.Timestamp(end)]
+        return bars
+
+def _naive(bars: pd.DataFrame) -> pd.DataFrame:
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is not None:
+        bars = bars.set_axis(index.tz_convert("UTC").tz_localize(None))
+    return bars[[column for column in BAR_COLUMNS if column in bars]].astype("float64")
+
+def _read_json(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _write_json(path: str, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
@@ -0,0 +1,100 @@
+from typing import Dict, List, Optional
+
+import pandas as pd
+import yfinance as yf
+
+from .base import ACTION_COLUMNS, BAR_COLUMNS, MarketDataProvider, empty_bars
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Live Yahoo Finance data through the `yfinance` library.
+    """
+
+    name = "yfinance"
+
+    def fetch_quote(self, symbol: str) -> Optional[dict]:
+        ticker = yf.Ticker(symbol)
+        # fast_info provides basic realtime data without full download
+        info = ticker.fast_info
+
+        # yfinance fast_info keys:
+        # last_price, previous_close, open, day_high, day_low, year_high, year_low...
+        # We need to calculate change percent manually or fetch from ticker.info (slower)
+        # Using fast_info for speed.
+        return {
+            "price": info.last_price,
+            "previous_close": info.previous_close,
+            "volume": info.last_volume if hasattr(info, 'last_volume') else None,
+            # Computed from the same cached daily prices as last_price: no extra request
+            "average_volume": getattr(info, "ten_day_average_volume", None)
+        }
+
+    def fetch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        # The last two daily bars give us the latest price and the previous close.
+        # 5d covers weekends and market holidays.
+        df = yf.download(
+            symbols,
+            period="5d",
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False
+        )
+        return split_batch_download(df, symbols)
+
+    def fetch_bars(self, symbol: str, interval: str = "1d", start: Optional[pd.Timestamp] = None,
+                   end: Optional[pd.Timestamp] = None, period: Optional[str] = None) -> pd.DataFrame:
+        kwargs = {"period": period} if period else {"start": start, "end": end}
+        # Adjusted prices, with the split and dividend columns so the bar store
+        # can tell when an action has rewritten the history it holds
+        df = yf.download(
+            symbol,
+            interval=interval,
+            auto_adjust=True,
+            actions=True,
+            multi_level_index=False,
+            progress=False,
+            **kwargs
+        )
+        return normalize_bars(df)
+
+def normalize_bars(df) -> pd.DataFrame:
+    """
+    Reduces a single-ticker yfinance frame to plain OHLCV columns, plus the
+    corporate action columns when present.
+    """
+    if df is None or df.empty:
+        return empty_bars()
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.droplevel(1, axis=1)
+    return df[[column for column in BAR_COLUMNS + ACTION_COLUMNS if column in df]]
+
+def split_batch_download(df, symbols: List[str]) -> Dict[str, dict]:
+    """
+    Splits a multi-ticker `yf.download(..., group_by="ticker")` frame into
+    one raw quote per symbol. Symbols without usable rows are left out.
+    """
+    quotes = {}
+    if df is None or df.empty:
+        return quotes
+
+    available = set(df.columns.get_level_values(0))
+    for symbol in symbols:
+        if symbol not in available:
+            continue
+
+        bars = df[symbol].dropna(subset=["Close"])
+        if bars.empty:
+            continue
+
+        closes = bars["Close"]
+        volumes = bars["Volume"] if "Volume" in bars else None
+        quotes[symbol] = {
+            "price": float(closes.iloc[-1]),
+            "previous_close": float(closes.iloc[-2]) if len(closes) > 1 else None,
+            "volume": float(volumes.iloc[-1]) if volumes is not None else None,
+            # The sessions before the latest one (up to four in the 5d window)
+            "average_volume": float(volumes.iloc[:-1].mean()) if volumes is not None and len(volumes) > 1 else None
+        }
+
+    return quotes
@@ -0,0 +1,240 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+# Queue priorities: lower is served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+class RateLimited(Exception):
+    """
+    Raised when a call is shed because the upstream's budget is exhausted.
+    `retry_after` estimates when a token will be available again (seconds).
+    """
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"{upstream} request budget exhausted, retry in {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+def is_throttle(error: BaseException) -> bool:
+    """
+    Whether an upstream error means "slow down" (HTTP 429 or the SDK's
+    rate limit / quota exception) rather than an ordinary failure.
+    """
+    for attribute in ("code", "status_code", "status"):
+        if getattr(error, attribute, None) in (429, "429", "RESOURCE_EXHAUSTED"):
+            return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in ("ratelimit", "rate limit", "too many requests", "429", "resource_exhausted"))
+
+def worker_share(rate: float, burst: int, workers: int) -> Tuple[float, int]:
+    """
+    One worker's share of a host-wide budget split between `workers` processes.
+    """
+    workers = max(workers, 1)
+    return rate / workers, max(burst // workers, 1)
+
+class AdaptiveRateLimiter:
+    """
+    Process-wide token bucket for one upstream, with AIMD rate control.
+
+    Tokens refill at `rate` per second up to `burst`. A call that finds the
+    bucket empty waits in a priority queue (interactive requests before
+    background refreshes) unless its expected wait exceeds `max_wait` or the
+    queue is full, in which case it is shed with `RateLimited` right away.
+
+    Upstream feedback adjusts the rate (AIMD): each success adds `increase`
+    back, up to the configured rate, and failures cut it and pause the
+    bucket for a jittered exponential backoff (see `record_failure`).
+
+    A `rate` of 0 disables limiting. The feedback methods may be called from
+    the upstream executor's threads; queueing happens on the event loop.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_wait: float = 2.0, max_queue: int = 256,
+                 min_rate: Optional[float] = None, increase: Optional[float] = None,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, error_threshold: int = 3,
+                 clock: Callable[[], float] = time.monotonic, jitter: Callable[[], float] = random.random):
+        self.name = name
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.min_rate = min_rate if min_rate is not None else rate / 20
+        # Additive increase: recover the full rate after ~20 successes
+        self.increase = increase if increase is not None else rate / 20
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.error_threshold = error_threshold
+        self._clock = clock
+        self._jitter = jitter
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._consecutive_failures = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop = None
+        self.granted = 0
+        self.queued = 0
+        self.shed = 0
+        self.throttled = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rate > 0
+
+    def _refill(self, now: float):
+        # Caller holds the lock. Nothing accrues while paused.
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            self._tokens = min(float(self.burst), self._tokens + (now - start) * self.rate)
+        self._updated = max(self._updated, now)
+
+    def _wait_estimate(self, now: float, ahead: int) -> float:
+        missing = ahead + 1 - self._tokens
+        wait = max(missing, 0.0) / self.rate
+        return max(self._paused_until - now, 0.0) + wait
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters from a previous loop can never be woken
+            self._queue = []
+            self._timer = None
+            self._loop = loop
+
+    async def acquire(self, priority: int = INTERACTIVE):
+        """
+        Takes one token, waiting in the queue if needed. Raises RateLimited
+        when the call is shed instead.
+        """
+        if not self.enabled:
+            return
+        self._bind_loop()
+        now = self._clock()
+        with self._lock:
+            self._refill(now)
+            if not self._queue and now >= self._paused_until and self._tokens >= 1:
+                self._tokens -= 1
+                self.granted += 1
+                return
+            ahead = sum(1 for entry in self._queue if entry[0] <= priority and not entry[2].done())
+            estimate = self._wait_estimate(now, ahead)
+
+        if len(self._queue) >= self.max_queue or estimate > self.max_wait:
+            self.shed += 1
+            raise RateLimited(self.name, estimate)
+
+        future = self._loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), future))
+        self.queued += 1
+        self._schedule(now)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            # Overtaken by higher priority calls or a backoff started meanwhile
+            future.cancel()
+            self.shed += 1
+            with self._lock:
+                retry_after = self._wait_estimate(self._clock(), len(self._queue))
+            raise RateLimited(self.name, retry_after)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        self.granted += 1
+
+    def _schedule(self, now: float):
+        if self._timer is not None or not self._queue:
+            return
+        with self._lock:
+            delay = self._wait_estimate(now, 0)
+        self._timer = self._loop.call_later(delay, self._drain)
+
+    def _drain(self):
+        self._timer = None
+        now = self._clock()
+        with self._lock:
+            self._refill(now)
+            while self._queue and now >= self._paused_until and self._tokens >= 1:
+                _, _, future = heapq.heappop(self._queue)
+                if future.done():
+                    continue
+                self._tokens -= 1
+                future.set_result(None)
+            while self._queue and self._queue[0][2].done():
+                heapq.heappop(self._queue)
+        self._schedule(now)
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        """
+        Backs off after a failed upstream call. Throttling halves the rate and
+        pauses the bucket at once; ordinary errors (often just a bad symbol)
+        only trim the rate and pause once `error_threshold` happen in a row.
+        The pause grows exponentially with consecutive failures and is
+        jittered so waiting callers don't retry in lockstep.
+        """
+        throttled = error is not None and is_throttle(error)
+        with self._lock:
+            if throttled:
+                self.throttled += 1
+            else:
+                self.errors += 1
+            self._consecutive_failures += 1
+            if not throttled and self._consecutive_failures < self.error_threshold:
+                return
+            self.rate = max(self.min_rate, self.rate * (0.5 if throttled else 0.8))
+
+            backoff = min(self.backoff_max, self.backoff_base * 2 ** (self._consecutive_failures - 1))
+            # Equal jitter: at least half the backoff, so the pause always means something
+            pause = backoff * (0.5 + 0.5 * self._jitter())
+            now = self._clock()
+            self._refill(now)
+            self._paused_until = max(self._paused_until, now + pause)
+            self._tokens = min(self._tokens, 0.0)
+
+    def retry_after(self) -> float:
+        """
+        Seconds until a new call would likely get a token.
+        """
+        if not self.enabled:
+            return 0.0
+        now = self._clock()
+        with self._lock:
+            self._refill(now)
+            return self._wait_estimate(now, len(self._queue))
+
+    def stats(self) -> dict:
+        now = self._clock()
+        with self._lock:
+            self._refill(now)
+            tokens = self._tokens
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "rate_per_second": round(self.rate, 4),
+            "max_rate_per_second": self.max_rate,
+            "burst": self.burst,
+            "tokens": round(tokens, 3),
+            "queued_now": sum(1 for entry in self._queue if not entry[2].done()),
+            "paused_for_seconds": round(max(self._paused_until - now, 0.0), 3),
+            "granted": self.granted,
+            "queued": self.queued,
+            "shed": self.shed,
+            "throttled": self.throttled,
+            "errors": self.errors
+        }
@@ -0,0 +1,226 @@
+import asyncio
+import heapq
+import math
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config import get_settings
+
+# History series kept warm per symbol (the most recently requested ones)
+MAX_HISTORY_KEYS = 8
+
+class _SymbolState:
+    def __init__(self, now: float):
+        self.score = 0.0
+        self.last_request = now
+        self.tracked_since = now
+        self.due = now
+        self.interval = 0.0
+        self.refreshes = 0
+        self.last_refresh: Optional[float] = None
+        # (period, interval) -> None, oldest request first
+        self.history_keys: Dict[Tuple[str, str], None] = {}
+        self.last_history_refresh = now
+
+class MarketRefresher:
+    """
+    Keeps recently requested symbols warm in the market data cache.
+
+    Every request adds to a symbol's demand score, which decays with
+    `half_life`. Hot symbols are refreshed every `min_interval` seconds, cold
+    ones closer to `max_interval`, and symbols nobody asked for within
+    `idle_ttl` are dropped. Due quotes are refreshed together in one batch call.
+    """
+
+    def __init__(self, refresh_quotes: Callable[[List[str]], Awaitable],
+                 refresh_history: Callable[[str, str, str], Awaitable],
+                 min_interval: float, max_interval: float, idle_ttl: float,
+                 half_life: float, history_interval: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self._refresh_quotes = refresh_quotes
+        self._refresh_history = refresh_history
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_ttl = idle_ttl
+        self.half_life = half_life
+        self.history_interval = history_interval
+        self._clock = clock
+        self._symbols: Dict[str, _SymbolState] = {}
+        self._queue: List[Tuple[float, str]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.runs = 0
+        self.dropped = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    # -- demand tracking ---------------------------------------------------
+
+    def record_demand(self, symbol: str, period: Optional[str] = None, interval: Optional[str] = None):
+        now = self._clock()
+        state = self._symbols.get(symbol)
+        is_new = state is None
+        if is_new:
+            state = self._symbols[symbol] = _SymbolState(now)
+
+        state.score = self._decayed(state, now) + 1.0
+        state.last_request = now
+        if period is not None:
+            key = (period, interval or "1d")
+            state.history_keys.pop(key, None)
+            state.history_keys[key] = None
+            if len(state.history_keys) > MAX_HISTORY_KEYS:
+                del state.history_keys[next(iter(state.history_keys))]
+
+        interval_for_score = self._interval_for(state.score)
+        if is_new or now + interval_for_score < state.due:
+            # The request itself just fetched fresh data, so the next refresh is one interval away
+            self._schedule(symbol, state, now + interval_for_score)
+        state.interval = interval_for_score
+
+    def _decayed(self, state: _SymbolState, now: float) -> float:
+        return state.score * math.exp(-(now - state.last_request) * math.log(2) / self.half_life)
+
+    def _interval_for(self, score: float) -> float:
+        return min(self.max_interval, max(self.min_interval, self.max_interval / max(score, 1.0)))
+
+    def _schedule(self, symbol: str, state: _SymbolState, due: float):
+        state.due = due
+        heapq.heappush(self._queue, (due, symbol))
+        if self._wake is not None:
+            self._wake.set()
+
+    # -- scheduling loop ---------------------------------------------------
+
+    def _pop_due(self, now: float) -> List[str]:
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            scheduled, symbol = heapq.heappop(self._queue)
+            state = self._symbols.get(symbol)
+            # Entries superseded by a reschedule are skipped
+            if state is None or state.due != scheduled:
+                continue
+            if now - state.last_request > self.idle_ttl:
+                del self._symbols[symbol]
+                self.dropped += 1
+                continue
+            # Claimed: any duplicate entry for the same due time is now superseded
+            state.due = math.inf
+            lag = now - scheduled
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            due.append(symbol)
+        return due
+
+    async def run_once(self) -> List[str]:
+        """
+        Refreshes every symbol that is due and reschedules it. Returns the refreshed symbols.
+        """
+        now = self._clock()
+        due = self._pop_due(now)
+        if not due:
+            return due
+
+        try:
+            await self._refresh_quotes(due)
+        except Exception as e:
+            print(f"Background quote refresh failed: {e}")
+
+        for symbol in due:
+            state = self._symbols[symbol]
+            state.refreshes += 1
+            state.last_refresh = now
+            state.interval = self._interval_for(self._decayed(state, now))
+            if state.history_keys and now - state.last_history_refresh >= self.history_interval:
+                state.last_history_refresh = now
+                for period, interval in state.history_keys:
+                    try:
+                        await self._refresh_history(symbol, period, interval)
+                    except Exception as e:
+                        print(f"Background history refresh failed for {symbol}: {e}")
+            self._schedule(symbol, state, now + state.interval)
+
+        self.runs += 1
+        return due
+
+    async def _run(self):
+        self._wake = asyncio.Event()
+        while True:
+            self._wake.clear()
+            await self.run_once()
+            timeout = self._queue[0][0] - self._clock() if self._queue else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+
+    def stats(self) -> dict:
+        now = self._clock()
+        return {
+            "running": self.running,
+            "tracked_symbols": len(self._symbols),
+            "queue_depth": sum(1 for due, _ in self._queue if due <= now),
+            "scheduled": len(self._queue),
+            "runs": self.runs,
+            "dropped_symbols": self.dropped,
+            "last_lag_seconds": round(self.last_lag, 3),
+            "max_lag_seconds": round(self.max_lag, 3),
+            "symbols": {
+                symbol: {
+                    "demand": round(self._decayed(state, now), 3),
+                    "interval_seconds": round(state.interval, 3),
+                    "refreshes": state.refreshes,
+                    "refreshes_per_minute": round(state.refreshes * 60 / max(now - state.tracked_since, 1.0), 3),
+                    "next_refresh_in": round(state.due - now, 3),
+                    "idle_seconds": round(now - state.last_request, 3),
+                }
+                for symbol, state in sorted(self._symbols.items())
+            }
+        }
+
+_refresher: Optional[MarketRefresher] = None
+
+def get_refresher() -> MarketRefresher:
+    global _refresher
+    if _refresher is None:
+        # Imported here: market_service reports demand to this module
+        from . import market_service
+        settings = get_settings()
+        _refresher = MarketRefresher(
+            refresh_quotes=market_service.refresh_quotes,
+            refresh_history=market_service.refresh_history,
+            min_interval=settings.REFRESH_MIN_INTERVAL,
+            max_interval=settings.REFRESH_MAX_INTERVAL,
+            idle_ttl=settings.REFRESH_IDLE_TTL,
+            half_life=settings.REFRESH_DEMAND_HALF_LIFE,
+            # Refresh histories a bit before their cache entries expire
+            history_interval=settings.HISTORY_CACHE_TTL * 0.8
+        )
+    return _refresher
+
+def record_demand(symbol: str, period: Optional[str] = None, interval: Optional[str] = None):
+    """
+    Counts a request that found data. Ignored unless the refresher is
+    running: only its loop drops idle symbols, so without it the tracked
+    set would only grow.
+    """
+    if _refresher is not None and _refresher.running:
+        _refresher.record_demand(symbol, period, interval)
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+from ..models import PricePoint
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+@dataclass
+class PriceSeries:
+    """
+    Close prices kept as column arrays so they can be sliced and downsampled
+    without building one dict per bar. Highs, lows and volumes are kept when
+    the bars have them (technical indicators such as VWAP need them).
+    """
+    dates: List[str]
+    times: np.ndarray   # int64 epoch nanoseconds
+    closes: np.ndarray  # float64
+    as_of: Optional[float] = None  # epoch seconds when the bars were loaded
+    highs: Optional[np.ndarray] = None
+    lows: Optional[np.ndarray] = None
+    volumes: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.closes)
+
+    def take(self, indices: np.ndarray) -> "PriceSeries":
+        def pick(column):
+            return column[indices] if column is not None else None
+        return PriceSeries([self.dates[i] for i in indices], self.times[indices], self.closes[indices], self.as_of,
+                           pick(self.highs), pick(self.lows), pick(self.volumes))
+
+    def to_points(self) -> List[PricePoint]:
+        return [PricePoint(date, close) for date, close in zip(self.dates, self.closes.tolist())]
+
+def series_from_bars(df: "pd.DataFrame", intraday: bool = False) -> PriceSeries:
+    """
+    Vectorized DataFrame -> PriceSeries conversion (no per-row iteration).
+    """
+    import pandas as pd
+    index = pd.DatetimeIndex(df.index)
+    fmt = "%Y-%m-%d %H:%M" if intraday else "%Y-%m-%d"
+
+    def column(name):
+        return df[name].to_numpy(dtype=np.float64) if name in df.columns else None
+
+    return PriceSeries(
+        dates=index.strftime(fmt).tolist(),
+        times=index.as_unit("ns").asi8,
+        closes=df["Close"].to_numpy(dtype=np.float64),
+        highs=column("High"),
+        lows=column("Low"),
+        volumes=column("Volume")
+    )
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of the
+    `threshold` points that best preserve the visual shape of the series.
+    The first and last points are always kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bucket_size = (n - 2) / (threshold - 2)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, n)
+
+        # Third triangle vertex: average of the next bucket (the last point for the final bucket)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+
+    return indices
+
+def downsample(series: PriceSeries, max_points: int) -> PriceSeries:
+    """
+    Reduces a series to at most `max_points` points with LTTB.
+    """
+    if len(series) <= max_points:
+        return series
+    # Seconds keep the triangle areas well inside float64 precision
+    x = series.times / 1e9
+    return series.take(lttb_indices(x, series.closes, max_points))
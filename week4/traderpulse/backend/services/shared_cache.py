@@ -0,0 +1,248 @@
+import asyncio
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+"""
+
+class SharedCache:
+    """
+    Cache tier shared by every worker process on the host: a SQLite database
+    in WAL mode, so readers never block the writer. Values are pickled (only
+    processes on this host, running this code, read the file).
+
+    Besides entries it holds short leases: a worker takes a key's lease
+    before fetching it upstream, so for each key only one worker refreshes
+    at a time while the others read its result. Leases expire on their own
+    if their holder dies.
+
+    The tier is best effort: database errors are logged and treated as a
+    miss (or, for leases, as granted), so workers fall back to behaving as
+    if they were alone.
+
+    Every call blocks on SQLite (up to `busy_timeout` while another worker
+    writes) and pickles, so code on the event loop uses the `a*` variants,
+    which run the same call on a worker thread.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 10.0, max_age: float = 3600.0,
+                 busy_timeout: float = 1.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_age = max_age
+        self.busy_timeout = busy_timeout
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.leases_won = 0
+        self.leases_lost = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads. The schema is
+        # created by each thread's first call, so constructing the tier (on the
+        # event loop) touches no database.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                # Cached market data does not need to survive a power loss
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.executescript(_SCHEMA)
+            except sqlite3.Error:
+                connection.close()
+                raise
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    # -- entries -------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Returns `(value, age_seconds)` or None.
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        try:
+            rows = self._connection().execute(
+                f"SELECT key, value, stored_at FROM entries WHERE key IN ({placeholders})", keys
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Shared cache read failed: {e}")
+            rows = []
+
+        now = time.time()
+        found = {}
+        for key, blob, stored_at in rows:
+            age = max(now - stored_at, 0.0)
+            if age < self.max_age:
+                found[key] = (pickle.loads(blob), age)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: Any):
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]):
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now) for key, value in items.items()]
+        try:
+            connection = self._connection()
+            with connection:
+                connection.executemany(
+                    "INSERT INTO entries (key, value, stored_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, stored_at = excluded.stored_at",
+                    rows
+                )
+        except sqlite3.Error as e:
+            print(f"Shared cache write failed: {e}")
+            return
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.prune()
+
+    def prune(self):
+        """
+        Drops entries older than `max_age` and expired leases.
+        """
+        now = time.time()
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute("DELETE FROM entries WHERE stored_at < ?", (now - self.max_age,))
+                connection.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+        except sqlite3.Error as e:
+            print(f"Shared cache prune failed: {e}")
+
+    def clear(self):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM entries")
+            connection.execute("DELETE FROM leases")
+        self.hits = self.misses = self.leases_won = self.leases_lost = 0
+
+    # -- leases --------------------------------------------------------------
+
+    def acquire(self, key: str) -> bool:
+        """
+        Takes the refresh lease for `key` unless another worker holds an
+        unexpired one. Re-acquiring a lease this worker holds extends it.
+        """
+        return self.acquire_many([key]) == [key]
+
+    def acquire_many(self, keys: Iterable[str]) -> List[str]:
+        """
+        Tries every key in one transaction and returns the ones whose lease
+        this worker now holds.
+        """
+        keys = list(keys)
+        if not keys:
+            return []
+        now = time.time()
+        won = []
+        try:
+            connection = self._connection()
+            with connection:
+                for key in keys:
+                    cursor = connection.execute(
+                        "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                        "WHERE leases.expires_at < ? OR leases.owner = excluded.owner",
+                        (key, self.owner, now + self.lease_seconds, now)
+                    )
+                    if cursor.rowcount == 1:
+                        won.append(key)
+        except sqlite3.Error as e:
+            print(f"Shared cache lease failed for {keys}: {e}")
+            return keys
+        self.leases_won += len(won)
+        self.leases_lost += len(keys) - len(won)
+        return won
+
+    def release(self, *keys: str):
+        if not keys:
+            return
+        try:
+            connection = self._connection()
+            with connection:
+                connection.executemany("DELETE FROM leases WHERE key = ? AND owner = ?",
+                                       [(key, self.owner) for key in keys])
+        except sqlite3.Error as e:
+            # The leases simply expire
+            print(f"Shared cache lease release failed: {e}")
+
+    # -- async facade --------------------------------------------------------
+
+    async def aget(self, key: str) -> Optional[Tuple[Any, float]]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aget_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        return await asyncio.to_thread(self.get_many, list(keys))
+
+    async def aset(self, key: str, value: Any):
+        await asyncio.to_thread(self.set, key, value)
+
+    async def aset_many(self, items: Dict[str, Any]):
+        await asyncio.to_thread(self.set_many, items)
+
+    async def aacquire(self, key: str) -> bool:
+        return await asyncio.to_thread(self.acquire, key)
+
+    async def aacquire_many(self, keys: Iterable[str]) -> List[str]:
+        return await asyncio.to_thread(self.acquire_many, list(keys))
+
+    async def arelease(self, *keys: str):
+        await asyncio.to_thread(self.release, *keys)
+
+    async def astats(self) -> dict:
+        return await asyncio.to_thread(self.stats)
+
+    def stats(self) -> dict:
+        """
+        Counters of this worker, plus the entries and live leases in the
+        database (None when it cannot be read).
+        """
+        entries = leases = None
+        try:
+            connection = self._connection()
+            entries = connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            leases = connection.execute("SELECT COUNT(*) FROM leases WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Shared cache stats failed: {e}")
+        return {
+            "path": self.path,
+            "owner": self.owner,
+            "entries": entries,
+            "active_leases": leases,
+            "hits": self.hits,
+            "misses": self.misses,
+            "leases_won": self.leases_won,
+            "leases_lost": self.leases_lost
+        }
@@ -0,0 +1,170 @@
+import asyncio
+from typing import Dict, Iterable, Optional, Set
+
+from ..config import get_settings
+from ..models import StockQuote
+from . import market_service
+
+class Subscription:
+    """
+    One streaming client. Updates are conflated per symbol: if the client has
+    not drained its pending updates yet, a newer quote replaces the older one,
+    so a slow client never makes the hub buffer more than one quote per symbol.
+    """
+
+    def __init__(self, symbols: Iterable[str]):
+        self.symbols: Set[str] = set(symbols)
+        self._quotes: Dict[str, StockQuote] = {}
+        self._errors: Dict[str, str] = {}
+        self._reported_errors: Set[str] = set()
+        self._ready = asyncio.Event()
+        self.delivered = 0
+        self.conflated = 0
+
+    def offer(self, symbol: str, quote: StockQuote):
+        if symbol in self._quotes:
+            self.conflated += 1
+        self._quotes[symbol] = quote
+        self._ready.set()
+
+    def offer_error(self, symbol: str, reason: str):
+        # Each failing symbol is reported once, not on every poll
+        if symbol in self._reported_errors:
+            return
+        self._reported_errors.add(symbol)
+        self._errors[symbol] = reason
+        self._ready.set()
+
+    async def next_update(self) -> dict:
+        """
+        Waits for pending updates and returns them as one message.
+        """
+        await self._ready.wait()
+        self._ready.clear()
+        quotes, self._quotes = self._quotes, {}
+        errors, self._errors = self._errors, {}
+        self.delivered += len(quotes)
+        return {"type": "quotes", "quotes": quotes, "errors": errors}
+
+class QuoteHub:
+    """
+    Fans quote updates out to every streaming subscriber from a single poller.
+
+    The poller fetches the union of subscribed symbols with one batch request
+    per tick, so upstream load grows with distinct symbols, not with clients.
+    It starts with the first subscriber and stops when the last one leaves.
+    """
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._subscriptions: Set[Subscription] = set()
+        self._latest: Dict[str, StockQuote] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.polls = 0
+
+    def symbols(self) -> Set[str]:
+        symbols = set()
+        for subscription in self._subscriptions:
+            symbols |= subscription.symbols
+        return symbols
+
+    def subscribe(self, symbols: Iterable[str]) -> Subscription:
+        subscription = Subscription(symbols)
+        self._subscriptions.add(subscription)
+        self._prime(subscription, subscription.symbols)
+        self._ensure_polling()
+        return subscription
+
+    def update(self, subscription: Subscription, add: Iterable[str] = (), remove: Iterable[str] = ()):
+        added = set(add) - subscription.symbols
+        subscription.symbols |= added
+        subscription.symbols -= set(remove)
+        self._prime(subscription, added)
+        self._ensure_polling()
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def _prime(self, subscription: Subscription, symbols: Iterable[str]):
+        # New subscribers get the last known quote right away instead of waiting a tick
+        for symbol in symbols:
+            if symbol in self._latest:
+                subscription.offer(symbol, self._latest[symbol])
+
+    def _ensure_polling(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._poll())
+        elif self._wake is not None:
+            # Poll right away so newly added symbols do not wait a full tick
+            self._wake.set()
+
+    async def _poll(self):
+        self._wake = asyncio.Event()
+        while True:
+            self._wake.clear()
+            symbols = self.symbols()
+            if not symbols:
+                return
+            try:
+                result = await market_service.get_realtime_stock_data_batch(sorted(symbols))
+                self.polls += 1
+                self._publish(result)
+            except Exception as e:
+                print(f"Quote hub poll failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _publish(self, result: dict):
+        changed = {}
+        for symbol, quote in result["quotes"].items():
+            previous = self._latest.get(symbol)
+            # A refetch with identical values is not an update, even though its as_of moved
+            if previous is None or not previous.same_values(quote):
+                self._latest[symbol] = quote
+                changed[symbol] = quote
+
+        for subscription in list(self._subscriptions):
+            for symbol in subscription.symbols:
+                if symbol in changed:
+                    subscription.offer(symbol, changed[symbol])
+                elif symbol in result["errors"]:
+                    subscription.offer_error(symbol, result["errors"][symbol])
+
+        # Forget quotes nobody is subscribed to anymore
+        active = self.symbols()
+        for symbol in list(self._latest):
+            if symbol not in active:
+                del self._latest[symbol]
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscriptions),
+            "symbols": sorted(self.symbols()),
+            "polls": self.polls,
+            "polling": self._task is not None and not self._task.done(),
+            "conflated_updates": sum(s.conflated for s in self._subscriptions)
+        }
+
+_hub: Optional[QuoteHub] = None
+
+def get_hub() -> QuoteHub:
+    global _hub
+    if _hub is None:
+        _hub = QuoteHub(poll_interval=get_settings().STREAM_POLL_INTERVAL)
+    return _hub
+
+async def shutdown():
+    if _hub is not None:
+        await _hub.stop()
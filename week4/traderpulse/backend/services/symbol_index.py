@@ -0,0 +1,223 @@
+import csv
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..config import get_settings
+from ..models import Symbol
+
+# Words that say nothing about which company is meant
+_STOPWORDS = {
+    "a", "ag", "and", "class", "co", "company", "corp", "corporation", "group", "holding",
+    "holdings", "inc", "incorporated", "limited", "ltd", "nv", "of", "plc", "sa", "se", "the"
+}
+
+# Ranking tiers, best first
+EXACT = 0
+TICKER_PREFIX = 1
+NAME_PREFIX = 2
+WORD_PREFIX = 3
+TICKER_FUZZY = 4
+WORD_FUZZY = 5
+
+# Edit distance is only tried for terms in this length range (deletion variants grow quickly)
+_FUZZY_MIN_LENGTH = 3
+_FUZZY_MAX_LENGTH = 20
+_MAX_DISTANCE = 2
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+def _compact(text: str) -> str:
+    return _NON_ALNUM.sub("", text.lower())
+
+def _words(text: str) -> List[str]:
+    words = [word for word in _NON_ALNUM.split(text.lower()) if word]
+    significant = [word for word in words if word not in _STOPWORDS]
+    return significant or words
+
+def _deletes(term: str, distance: int) -> Set[str]:
+    """
+    Every string obtained by deleting up to `distance` characters (SymSpell).
+    Two terms within edit distance `distance` always share one of these.
+    """
+    variants = {term}
+    frontier = {term}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+def _distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (edits plus adjacent transpositions),
+    giving up with `limit + 1` once it is clearly above `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+def _max_distance(query: str) -> int:
+    if len(query) < _FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if len(query) <= 5 else _MAX_DISTANCE
+
+class SymbolIndex:
+    """
+    In-memory search over the symbol universe.
+
+    Prefix matches come from two sorted arrays searched with bisect: compact
+    tickers ("BRK-B" is "brkb") and name suffixes made of significant words
+    ("Bank of America Corporation" gives "bankamerica" and "america"). Typos
+    are matched by edit distance against tickers and name words, using a
+    precomputed deletion index so only a handful of candidates are compared.
+
+    Results are ranked by tier (exact ticker, ticker prefix, name prefix,
+    word prefix, fuzzy ticker, fuzzy word), then edit distance, then the
+    symbol's position in the data file (most popular first).
+    """
+
+    def __init__(self, symbols: Iterable[Symbol]):
+        self.symbols: List[Symbol] = []
+        self._by_key: Dict[str, int] = {}
+        tickers: List[Tuple[str, int]] = []
+        names: List[Tuple[str, int, int]] = []
+        self._terms: List[Tuple[str, int, int]] = []  # (term, symbol id, tier)
+        self._fuzzy: Dict[str, List[int]] = {}
+
+        for symbol in symbols:
+            key = _compact(symbol.symbol)
+            if not key or key in self._by_key:
+                continue
+            rank = len(self.symbols)
+            self.symbols.append(symbol)
+            self._by_key[key] = rank
+            tickers.append((key, rank))
+
+            words = _words(symbol.name)
+            for start in range(len(words)):
+                names.append(("".join(words[start:]), rank, NAME_PREFIX if start == 0 else WORD_PREFIX))
+
+            self._add_term(key, rank, TICKER_FUZZY)
+            for word in set(words):
+                self._add_term(word, rank, WORD_FUZZY)
+
+        tickers.sort()
+        names.sort()
+        self._ticker_keys = [key for key, _ in tickers]
+        self._ticker_ids = [rank for _, rank in tickers]
+        self._name_keys = [key for key, _, _ in names]
+        self._name_ids = [(rank, tier) for _, rank, tier in names]
+
+    def _add_term(self, term: str, rank: int, tier: int):
+        if not _FUZZY_MIN_LENGTH <= len(term) <= _FUZZY_MAX_LENGTH:
+            return
+        term_id = len(self._terms)
+        self._terms.append((term, rank, tier))
+        for variant in _deletes(term, _MAX_DISTANCE):
+            self._fuzzy.setdefault(variant, []).append(term_id)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "SymbolIndex":
+        """
+        Loads a CSV with `symbol,name,exchange,type` columns, most popular first.
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        return cls(
+            Symbol(row["symbol"].strip().upper(), row["name"].strip(), row.get("exchange", "").strip(),
+                   row.get("type", "").strip())
+            for row in rows if row.get("symbol", "").strip()
+        )
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def get(self, symbol: str) -> Optional[Symbol]:
+        """
+        The entry for an exact symbol ("brk-b", "BRKB" and "BRK-B" are the same).
+        """
+        rank = self._by_key.get(_compact(symbol))
+        return self.symbols[rank] if rank is not None else None
+
+    @staticmethod
+    def _prefixed(keys: List[str], ids: list, prefix: str) -> Iterable:
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            yield ids[i]
+            i += 1
+
+    def search(self, query: str, limit: int = 10) -> List[Symbol]:
+        """
+        Ranked matches for a ticker or company name fragment, typos included.
+        """
+        ticker = _compact(query)
+        if not ticker or limit <= 0:
+            return []
+        best: Dict[int, Tuple[int, int]] = {}
+
+        def offer(rank: int, tier: int, distance: int = 0):
+            score = (tier, distance)
+            if score < best.get(rank, (WORD_FUZZY + 1, 0)):
+                best[rank] = score
+
+        exact = self._by_key.get(ticker)
+        for rank in self._prefixed(self._ticker_keys, self._ticker_ids, ticker):
+            offer(rank, EXACT if rank == exact else TICKER_PREFIX)
+
+        name = "".join(_words(query))
+        for rank, tier in self._prefixed(self._name_keys, self._name_ids, name):
+            offer(rank, tier)
+
+        if len(best) < limit:
+            self._fuzzy_matches(ticker, offer)
+            if name != ticker:
+                self._fuzzy_matches(name, offer)
+
+        ranked = sorted(best, key=lambda rank: (*best[rank], rank))
+        return [self.symbols[rank] for rank in ranked[:limit]]
+
+    def _fuzzy_matches(self, term: str, offer):
+        limit = _max_distance(term)
+        if not limit:
+            return
+        seen = set()
+        for variant in _deletes(term, limit):
+            for term_id in self._fuzzy.get(variant, ()):
+                if term_id in seen:
+                    continue
+                seen.add(term_id)
+                candidate, rank, tier = self._terms[term_id]
+                distance = _distance(term, candidate, limit)
+                if 0 < distance <= limit:
+                    offer(rank, tier, distance)
+
+_index: Optional[SymbolIndex] = None
+
+def load(path: Optional[str] = None) -> SymbolIndex:
+    """
+    (Re)builds the index from SYMBOLS_FILE, or `path`. Called from the
+    application lifespan at startup.
+    """
+    global _index
+    _index = SymbolIndex.from_csv(path or get_settings().SYMBOLS_FILE)
+    return _index
+
+def get_index() -> SymbolIndex:
+    """
+    The loaded index, loading it on first use outside the app (tests, tools).
+    """
+    if _index is None:
+        return load()
+    return _index
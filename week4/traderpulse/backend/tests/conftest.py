@@ -0,0 +1,53 @@
+import pytest
+
+from backend.services import ai_service, gamification, indicators, market_service, refresher
+from backend.services.bar_store import BarStore
+from backend.services.circuit_breaker import CircuitBreaker
+from backend.services.gamification import GamificationStore
+from backend.services.rate_limiter import AdaptiveRateLimiter
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    market_service.clear_caches()
+    ai_service.clear_cache()
+    indicators.clear_cache()
+    yield
+    market_service.clear_caches()
+    ai_service.clear_cache()
+    indicators.clear_cache()
+
+@pytest.fixture(autouse=True)
+def bar_store(tmp_path, monkeypatch):
+    """
+    Keeps every test's bar store in a temporary directory.
+    """
+    store = BarStore(str(tmp_path / "bars"), max_segments=3)
+    monkeypatch.setattr(market_service, "_bar_store", store)
+    return store
+
+@pytest.fixture(autouse=True)
+def fresh_refresher(monkeypatch):
+    monkeypatch.setattr(refresher, "_refresher", None)
+
+@pytest.fixture(autouse=True)
+def fresh_ai_state(monkeypatch):
+    monkeypatch.setattr(ai_service, "_breaker", CircuitBreaker("gemini", failure_threshold=5, reset_timeout=30))
+    monkeypatch.setattr(ai_service, "_counters", {k: 0 for k in ai_service._counters})
+    monkeypatch.setattr(ai_service, "_latencies", type(ai_service._latencies)(maxlen=512))
+
+@pytest.fixture(autouse=True)
+def unlimited_upstreams(monkeypatch):
+    """
+    Lifts the upstream rate limits; rate limiting tests install their own limiters.
+    """
+    monkeypatch.setattr(market_service, "_limiter", AdaptiveRateLimiter("market_data", rate=0, burst=1))
+    monkeypatch.setattr(ai_service, "_limiter", AdaptiveRateLimiter("gemini", rate=0, burst=1))
+
+@pytest.fixture(autouse=True)
+def gamification_store(tmp_path, monkeypatch):
+    """
+    Keeps every test's points in a temporary database.
+    """
+    store = GamificationStore(str(tmp_path / "gamification.sqlite"))
+    monkeypatch.setattr(gamification, "_store", store)
+    return store
@@ -0,0 +1,320 @@
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.models import StockQuote
+from backend.services import ai_service
+from backend.services.circuit_breaker import CircuitBreaker
+from backend.services.rate_limiter import AdaptiveRateLimiter
+
+class FakeModels:
+    def __init__(self, fail=False, delay=0.0):
+        self.calls = 0
+        self.fail = fail
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts = []
+
+    async def generate_content(self, model, contents, config):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("quota exceeded")
+            symbols = re.search(r"Symbols: (.*)", contents).group(1).split(", ")
+            self.prompts.append(symbols)
+            return SimpleNamespace(text=json.dumps({
+                symbol: {"sentiment": "Bullish", "justification": f"call {self.calls}"} for symbol in symbols
+            }))
+        finally:
+            self.in_flight -= 1
+
+class StreamingModels(FakeModels):
+    """
+    Streams the single-symbol answer a few characters at a time.
+    """
+
+    def __init__(self, text=None, chunk_size=7, **kwargs):
+        super().__init__(**kwargs)
+        self.text = text or json.dumps({"sentiment": "Bearish", "justification": "Cae \"rápido\" hoy.\nVender."})
+        self.chunk_size = chunk_size
+
+    async def generate_content_stream(self, model, contents, config):
+        self.calls += 1
+        self.prompts.append(contents)
+
+        async def chunks():
+            for start in range(0, len(self.text), self.chunk_size):
+                await asyncio.sleep(self.delay)
+                if self.fail:
+                    raise RuntimeError("stream broken")
+                yield SimpleNamespace(text=self.text[start:start + self.chunk_size])
+
+        return chunks()
+
+def _install(monkeypatch, models):
+    monkeypatch.setattr(ai_service, "client", SimpleNamespace(aio=SimpleNamespace(models=models)))
+    return models
+
+@pytest.fixture
+def models(monkeypatch):
+    return _install(monkeypatch, FakeModels())
+
+def _quote(price, change, symbol="AAPL"):
+    return StockQuote(symbol, price, change, 1, "2024-05-01T14:30:00+00:00")
+
+def test_small_moves_reuse_the_cached_analysis(models):
+    first = asyncio.run(ai_service.analyze_sentiment("AAPL", _quote(100.0, 0.10)))
+    second = asyncio.run(ai_service.analyze_sentiment("AAPL", _quote(100.2, 0.30)))
+
+    assert first == second
+    assert models.calls == 1
+    assert ai_service.cache_stats()["hits"] == 1
+
+def test_bucket_change_or_large_price_move_regenerates(models):
+    asyncio.run(ai_service.analyze_sentiment("AAPL", _quote(100.0, 0.10)))
+    # Different change-percent bucket
+    asyncio.run(ai_service.analyze_sentiment("AAPL", _quote(100.0, 0.70)))
+    # Same bucket, but the price moved past SENTIMENT_INVALIDATE_PCT
+    asyncio.run(ai_service.analyze_sentiment("AAPL", _quote(102.0, 0.15)))
+
+    assert models.calls == 3
+
+def test_local_scores_are_not_cached(monkeypatch):
+    models = _install(monkeypatch, FakeModels(fail=True))
+
+    for _ in range(2):
+        result = asyncio.run(ai_service.analyze_sentiment("AAPL", _quote(100.0, 0.1)))
+        assert result == ai_service.local_sentiment("AAPL", _quote(100.0, 0.1))
+
+    assert models.calls == 2
+
+def test_breaker_opens_after_repeated_failures(monkeypatch):
+    models = _install(monkeypatch, FakeModels(fail=True))
+    monkeypatch.setattr(ai_service, "_breaker", CircuitBreaker("gemini", failure_threshold=2, reset_timeout=60))
+
+    for change in (0.1, 1.1, 2.1, 3.1):
+        result = asyncio.run(ai_service.analyze_sentiment("AAPL", _quote(100.0, change)))
+        assert result["source"] == "local"
+
+    # The last two calls failed fast without reaching Gemini
+    assert models.calls == 2
+    stats = ai_service.stats()
+    assert stats["breaker"]["state"] == "open"
+    assert stats["breaker"]["rejected"] == 2
+
+def test_slow_calls_hit_the_deadline_and_concurrency_is_capped(monkeypatch):
+    models = _install(monkeypatch, FakeModels(delay=0.05))
+    monkeypatch.setattr(ai_service.settings, "GEMINI_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(ai_service.settings, "GEMINI_TIMEOUT_SECONDS", 0.12)
+    # One symbol per call so the requests compete for concurrency slots
+    monkeypatch.setattr(ai_service.settings, "SENTIMENT_BATCH_MAX_SIZE", 1)
+
+    async def run():
+        symbols = ["AAPL", "MSFT", "TSLA", "AMZN", "NVDA", "META", "GOOG", "SPY"]
+        return await asyncio.gather(*[ai_service.analyze_sentiment(s, _quote(1.0, 0.0, s)) for s in symbols])
+
+    results = asyncio.run(run())
+    assert models.max_in_flight == 2
+    # Two slots, 50ms calls, 120ms deadline: the last requests time out waiting for a slot
+    assert sum(1 for r in results if r.get("source") == "local") > 0
+    assert ai_service.stats()["timeouts"] > 0
+
+def test_half_open_breaker_closes_after_a_successful_probe():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 11
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_concurrent_requests_are_micro_batched_into_one_call(models):
+    symbols = ["AAPL", "MSFT", "TSLA"]
+
+    async def run():
+        single = [ai_service.analyze_sentiment(s, _quote(1.0, 0.0, s)) for s in symbols[:2]]
+        batch = ai_service.analyze_sentiment_batch({"TSLA": _quote(1.0, 0.0, "TSLA"), "AAPL": _quote(1.0, 0.0)})
+        return await asyncio.gather(*single, batch)
+
+    aapl, msft, batch = asyncio.run(run())
+
+    assert models.calls == 1
+    assert sorted(models.prompts[0]) == symbols
+    assert aapl["sentiment"] == msft["sentiment"] == "Bullish"
+    assert set(batch) == {"TSLA", "AAPL"}
+    assert ai_service.stats()["avg_batch_size"] == 3
+
+def test_symbols_missing_from_the_batch_response_fall_back(monkeypatch):
+    class PartialModels(FakeModels):
+        async def generate_content(self, model, contents, config):
+            self.calls += 1
+            return SimpleNamespace(text=json.dumps({"AAPL": {"sentiment": "Bearish", "justification": "ok"}}))
+
+    _install(monkeypatch, PartialModels())
+
+    results = asyncio.run(ai_service.analyze_sentiment_batch({s: _quote(1.0, 0.0, s) for s in ("AAPL", "MSFT")}))
+    assert results["AAPL"]["sentiment"] == "Bearish"
+    assert results["MSFT"]["sentiment"] == "Neutral"
+    # Only the valid entry was cached
+    assert ai_service.cache_stats()["size"] == 1
+
+def test_calls_shed_by_the_rate_limiter_fall_back_without_tripping_the_breaker(models, monkeypatch):
+    limiter = AdaptiveRateLimiter("gemini", rate=0.1, burst=1, max_wait=0.1)
+    monkeypatch.setattr(ai_service, "_limiter", limiter)
+
+    asyncio.run(ai_service.analyze_sentiment("AAPL", _quote(100.0, 0.1)))
+    shed = asyncio.run(ai_service.analyze_sentiment("MSFT", _quote(50.0, 0.1, "MSFT")))
+
+    assert shed["sentiment"] == "Neutral"
+    assert models.calls == 1
+    assert ai_service.stats()["shed"] == 1
+    assert ai_service.stats()["breaker"]["consecutive_failures"] == 0
+
+def _collect(symbol, quote):
+    async def run():
+        return [event async for event in ai_service.stream_sentiment(symbol, quote)]
+    return asyncio.run(run())
+
+def test_stream_sends_the_label_first_then_the_text_then_the_validated_result(monkeypatch):
+    models = _install(monkeypatch, StreamingModels())
+
+    events = _collect("AAPL", _quote(100.0, -1.2))
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "sentiment" and events[0][1] == {"sentiment": "Bearish"}
+    assert kinds[-1] == "done"
+    assert set(kinds[1:-1]) == {"justification"} and len(kinds) > 4
+    text = "".join(data["text"] for kind, data in events if kind == "justification")
+    assert text == 'Cae "rápido" hoy.\nVender.'
+    assert events[-1][1] == {"sentiment": "Bearish", "justification": text}
+    assert ai_service.stats()["streams"] == 1
+
+    # Cached for both the streaming and the plain endpoint
+    assert _collect("AAPL", _quote(100.0, -1.2))[-1] == events[-1]
+    assert asyncio.run(ai_service.analyze_sentiment("AAPL", _quote(100.0, -1.2))) == events[-1][1]
+    assert models.calls == 1
+
+def test_stream_ends_with_the_local_score_when_the_output_is_invalid(monkeypatch):
+    _install(monkeypatch, StreamingModels(text='{"sentiment": "Very bullish", "justification": "x"}'))
+    events = _collect("AAPL", _quote(100.0, 0.1))
+    assert events[-1] == ("done", ai_service.local_sentiment("AAPL", _quote(100.0, 0.1)))
+    assert ai_service.cache_stats()["size"] == 0
+
+def test_stream_failures_count_against_the_breaker(monkeypatch):
+    _install(monkeypatch, StreamingModels(fail=True))
+    events = _collect("AAPL", _quote(100.0, 0.1))
+    assert events == [("done", ai_service.local_sentiment("AAPL", _quote(100.0, 0.1)))]
+    assert ai_service.stats()["failures"] == 1
+    assert ai_service.stats()["breaker"]["consecutive_failures"] == 1
+
+def test_slow_streams_hit_the_deadline(monkeypatch):
+    _install(monkeypatch, StreamingModels(delay=0.01, chunk_size=4))
+    monkeypatch.setattr(ai_service.settings, "GEMINI_TIMEOUT_SECONDS", 0.15)
+    events = _collect("AAPL", _quote(100.0, 0.1))
+    # The label made it out before the deadline; the final event replaces the partial text
+    assert events[0] == ("sentiment", {"sentiment": "Bearish"})
+    assert events[-1] == ("done", ai_service.local_sentiment("AAPL", _quote(100.0, 0.1)))
+    assert ai_service.stats()["timeouts"] == 1
+
+def test_stream_parser_handles_escapes_split_across_chunks():
+    text = json.dumps({"justification": "Precio \"alto\" \u2014 ánimo 📈", "sentiment": "Neutral"})
+    for size in (1, 2, 5):
+        parser = ai_service._SentimentStreamParser()
+        events = [event for start in range(0, len(text), size) for event in parser.feed(text[start:start + size])]
+        assert "".join(data["text"] for kind, data in events if kind == "justification") == "Precio \"alto\" \u2014 ánimo 📈"
+        assert events[-1] == ("sentiment", {"sentiment": "Neutral"})
+
+def test_local_score_follows_price_change_and_momentum(monkeypatch):
+    monkeypatch.setattr(ai_service.indicators, "latest", lambda symbol, quote=None: None)
+    assert ai_service.local_sentiment("AAPL", _quote(100.0, 2.5))["sentiment"] == "Bullish"
+    assert ai_service.local_sentiment("AAPL", _quote(100.0, -2.5))["sentiment"] == "Bearish"
+    flat = ai_service.local_sentiment("AAPL", _quote(100.0, 0.1))
+    assert flat == {"sentiment": "Neutral", "source": "local", "score": flat["score"],
+                    "justification": "Estimación local por impulso, sin IA: el precio sube un 0.10% en la sesión."}
+
+    # A flat session in a strong uptrend
+    technicals = {"sma_20": 92.0, "sma_50": 85.0, "macd_histogram": 0.8, "rsi_14": 68.0, "vwap": 96.0}
+    monkeypatch.setattr(ai_service.indicators, "latest", lambda symbol, quote=None: technicals)
+    trending = ai_service.local_sentiment("AAPL", _quote(100.0, 0.1))
+    assert trending["sentiment"] == "Bullish"
+    assert "media de 20 sesiones" in trending["justification"]
+    assert trending == ai_service.local_sentiment("AAPL", _quote(100.0, 0.1))
+
+def test_slow_gemini_answers_with_the_local_score_and_caches_its_result_later(monkeypatch):
+    models = _install(monkeypatch, FakeModels(delay=0.2))
+    monkeypatch.setattr(ai_service.settings, "SENTIMENT_LATENCY_BUDGET_SECONDS", 0.05)
+
+    async def run():
+        started = time.perf_counter()
+        first = await ai_service.analyze_sentiment("AAPL", _quote(100.0, 0.1))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.3)
+        return first, elapsed, await ai_service.analyze_sentiment("AAPL", _quote(100.0, 0.1))
+
+    first, elapsed, second = asyncio.run(run())
+    assert first["source"] == "local" and elapsed < 0.15
+    assert second == {"sentiment": "Bullish", "justification": "call 1"}
+    assert models.calls == 1
+    assert ai_service.stats()["hedged"] == 1
+
+def test_client_leaving_mid_stream_frees_the_half_open_probe(monkeypatch):
+    _install(monkeypatch, StreamingModels(delay=0.02, chunk_size=4))
+    now = [0.0]
+    breaker = CircuitBreaker("gemini", failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 11
+    monkeypatch.setattr(ai_service, "_breaker", breaker)
+
+    async def run():
+        stream = ai_service.stream_sentiment("AAPL", _quote(100.0, 0.1))
+        assert (await stream.__anext__())[0] == "sentiment"  # this call is the probe
+        assert not breaker.allow()
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+        return ai_service._get_semaphore()._value
+
+    free_slots = asyncio.run(run())
+    assert free_slots == ai_service.settings.GEMINI_MAX_CONCURRENCY
+    # Not counted as a failure, and the next call may probe again
+    assert breaker.state == "half_open" and breaker.allow()
+    assert ai_service.stats()["failures"] == 0
+
+def test_slow_consumers_do_not_hold_a_concurrency_slot(monkeypatch):
+    _install(monkeypatch, StreamingModels())
+
+    async def run():
+        stream = ai_service.stream_sentiment("AAPL", _quote(100.0, -1.2))
+        first = await stream.__anext__()
+        await asyncio.sleep(0.02)  # Gemini finishes while the client still reads the first event
+        free_slots = ai_service._get_semaphore()._value
+        rest = [event async for event in stream]
+        return first, free_slots, rest
+
+    first, free_slots, rest = asyncio.run(run())
+    assert first[0] == "sentiment" and rest[-1][0] == "done"
+    assert free_slots == ai_service.settings.GEMINI_MAX_CONCURRENCY
+    assert ai_service.stats()["successes"] == 1
+
+def test_local_score_for_a_cold_symbol_weighs_relative_volume():
+    assert ai_service.indicators.latest("COLD") is None
+
+    def quote(volume):
+        return StockQuote("COLD", 100.0, 0.8, volume, "2024-05-01T14:30:00+00:00", average_volume=1_000_000)
+
+    heavy = ai_service.local_sentiment("COLD", quote(3_000_000))
+    light = ai_service.local_sentiment("COLD", quote(300_000))
+    usual = ai_service.local_sentiment("COLD", quote(1_000_000))
+    assert heavy["sentiment"] == "Bullish" and "3.0 veces su media" in heavy["justification"]
+    assert light["sentiment"] == "Neutral"
+    assert light["score"] < usual["score"] < heavy["score"]
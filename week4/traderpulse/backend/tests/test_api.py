@@ -1,9 +1,16 @@
+import asyncio
+import json
 import pytest
 from fastapi.testclient import TestClient
 from backend.main import app
+from backend.models import StockQuote
+from backend.services import ai_service, market_service
 
 client = TestClient(app)
 
+def _quote(symbol):
+    return StockQuote(symbol, 100.0, 1.0, 10, "2024-05-01T14:30:00+00:00")
+
 def test_read_root():
     response = client.get("/")
     assert response.status_code == 200
@@ -29,3 +36,177 @@ def test_stocks_endpoint_structure():
 
 def test_sentiment_endpoint_structure():
     assert app.url_path_for("get_sentiment", symbol="AAPL") == "/api/v1/sentiment/AAPL"
+
+def test_stocks_batch_endpoint(monkeypatch):
+    async def fake_batch(symbols):
+        return {
+            "quotes": {"AAPL": _quote("AAPL")},
+            "errors": {symbol: "Symbol not found" for symbol in symbols if symbol != "AAPL"}
+        }
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data_batch", fake_batch)
+
+    response = client.get("/api/v1/stocks", params={"symbols": "aapl, XXXX,AAPL"})
+    assert response.status_code == 200
+    data = response.json()
+    assert list(data["quotes"]) == ["AAPL"]
+    assert data["errors"] == {"XXXX": "Symbol not found"}
+
+def test_stocks_batch_rejects_empty_list():
+    response = client.get("/api/v1/stocks", params={"symbols": " , "})
+    assert response.status_code == 400
+
+def test_cache_stats_endpoint():
+    response = client.get("/api/v1/system/cache")
+    assert response.status_code == 200
+    data = response.json()
+    assert {"hits", "misses", "evictions", "entries"} <= set(data["quotes"])
+    assert "history" in data
+
+def test_stocks_endpoint_validates_history_range():
+    response = client.get("/api/v1/stocks/AAPL", params={"period": "5y", "interval": "1m"})
+    assert response.status_code == 400
+    assert "1m" in response.json()["detail"]
+
+def test_stocks_endpoint_passes_history_options(monkeypatch):
+    captured = {}
+
+    async def fake_quote(symbol):
+        return _quote(symbol)
+
+    async def fake_history(symbol, period, interval, max_points):
+        captured.update(period=period, interval=interval, max_points=max_points)
+        return None
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data", fake_quote)
+    monkeypatch.setattr(market_service, "get_historical_series", fake_history)
+
+    response = client.get("/api/v1/stocks/AAPL", params={"period": "5d", "interval": "15m", "max_points": 200})
+    assert response.status_code == 200
+    assert captured == {"period": "5d", "interval": "15m", "max_points": 200}
+
+def test_stocks_endpoint_skips_the_history_for_unknown_symbols(monkeypatch):
+    history_calls = []
+
+    async def fake_quote(symbol):
+        return None
+
+    async def fake_history(symbol, period, interval, max_points):
+        history_calls.append(symbol)
+        return None
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data", fake_quote)
+    monkeypatch.setattr(market_service, "get_historical_series", fake_history)
+
+    assert client.get("/api/v1/stocks/XXXX").status_code == 404
+    assert history_calls == []
+
+def test_sentiment_batch_endpoint(monkeypatch):
+    async def fake_batch(symbols):
+        return {"quotes": {"AAPL": _quote("AAPL")}, "errors": {"XXXX": "Symbol not found"}}
+
+    async def fake_sentiments(snapshots):
+        return {symbol: {"sentiment": "Neutral", "justification": "-"} for symbol in snapshots}
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data_batch", fake_batch)
+    monkeypatch.setattr(ai_service, "analyze_sentiment_batch", fake_sentiments)
+
+    response = client.get("/api/v1/sentiment", params={"symbols": "AAPL,XXXX"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "sentiments": {"AAPL": {"sentiment": "Neutral", "justification": "-"}},
+        "errors": {"XXXX": "Symbol not found"}
+    }
+
+def _fake_dashboard_services(monkeypatch, quote, sentiment_delay=0.0):
+    calls = {"quote": 0, "history": 0}
+
+    async def fake_quote(symbol):
+        calls["quote"] += 1
+        await asyncio.sleep(0.01)  # a real lookup: anything started alongside gets to run
+        return quote
+
+    async def fake_history(symbol, period="1mo", interval="1d", max_points=None):
+        calls["history"] += 1
+        return [{"date": "2024-01-02", "close": 100.0}]
+
+    async def fake_sentiment(symbol, market_data):
+        await asyncio.sleep(sentiment_delay)
+        assert market_data is quote
+        return {"sentiment": "Bullish", "justification": "-"}
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data", fake_quote)
+    monkeypatch.setattr(market_service, "get_historical_data", fake_history)
+    monkeypatch.setattr(ai_service, "analyze_sentiment", fake_sentiment)
+    return calls
+
+def test_dashboard_streams_parts_as_they_complete(monkeypatch):
+    quote = _quote("AAPL")
+    calls = _fake_dashboard_services(monkeypatch, quote, sentiment_delay=0.05)
+
+    response = client.get("/api/v1/dashboard/aapl")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    messages = [json.loads(line) for line in response.text.splitlines()]
+    assert [m["type"] for m in messages] == ["quote", "history", "sentiment"]
+    assert messages[0]["data"] == quote.to_dict()
+    assert messages[2]["data"]["sentiment"] == "Bullish"
+    # The sentiment reused the dashboard's quote instead of fetching its own
+    assert calls["quote"] == 1
+
+def test_dashboard_reports_failed_part_without_dropping_others(monkeypatch):
+    _fake_dashboard_services(monkeypatch, _quote("AAPL"))
+
+    async def failing_history(symbol, period="1mo", interval="1d", max_points=None):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(market_service, "get_historical_data", failing_history)
+
+    messages = [json.loads(line) for line in client.get("/api/v1/dashboard/AAPL").text.splitlines()]
+    assert {"type": "error", "part": "history", "detail": "upstream down"} in messages
+    assert any(m["type"] == "sentiment" for m in messages)
+
+def test_dashboard_unknown_symbol_is_404(monkeypatch):
+    calls = _fake_dashboard_services(monkeypatch, None)
+    assert client.get("/api/v1/dashboard/XXXX").status_code == 404
+    assert calls["history"] == 0
+
+def test_sentiment_stream_is_server_sent_events(monkeypatch):
+    async def fake_quote(symbol):
+        return _quote(symbol)
+
+    async def fake_stream(symbol, market_data):
+        yield "sentiment", {"sentiment": "Bullish"}
+        yield "justification", {"text": "Sube"}
+        yield "done", {"sentiment": "Bullish", "justification": "Sube"}
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data", fake_quote)
+    monkeypatch.setattr(ai_service, "stream_sentiment", fake_stream)
+
+    response = client.get("/api/v1/sentiment/aapl/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-store"
+    blocks = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [lines[0] for lines in blocks] == ["event: sentiment", "event: justification", "event: done"]
+    assert json.loads(blocks[-1][1][len("data: "):]) == {"sentiment": "Bullish", "justification": "Sube"}
+
+def test_dashboard_can_leave_out_the_sentiment(monkeypatch):
+    _fake_dashboard_services(monkeypatch, _quote("AAPL"))
+    response = client.get("/api/v1/dashboard/AAPL", params={"sentiment": "false"})
+    assert [json.loads(line)["type"] for line in response.text.splitlines()] == ["quote", "history"]
+
+def test_local_sentiment_scores_are_not_cacheable(monkeypatch):
+    async def fake_quote(symbol):
+        return _quote(symbol)
+
+    async def local(symbol, market_data):
+        return {"sentiment": "Neutral", "justification": "-", "source": "local", "score": 0.0}
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data", fake_quote)
+    monkeypatch.setattr(ai_service, "analyze_sentiment", local)
+
+    response = client.get("/api/v1/sentiment/AAPL")
+    assert response.json()["source"] == "local"
+    assert response.headers["cache-control"] == "no-store"
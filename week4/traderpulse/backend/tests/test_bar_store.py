@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from backend.services.bar_store import BarStore
+
+def _bars(start, closes):
+    index = pd.date_range(start, periods=len(closes), freq="D")
+    return pd.DataFrame({
+        "Open": closes, "High": closes, "Low": closes, "Close": closes,
+        "Volume": [100.0] * len(closes)
+    }, index=index)
+
+def test_later_writes_win_on_overlapping_bars(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write("AAPL", "1d", _bars("2024-01-01", [1.0, 2.0, 3.0]), covered_from=pd.Timestamp("2024-01-01"))
+    # Today's partial bar gets revised and a new bar arrives
+    store.write("AAPL", "1d", _bars("2024-01-03", [3.5, 4.0]))
+
+    bars = store.read("AAPL", "1d")
+    assert bars["Close"].tolist() == [1.0, 2.0, 3.5, 4.0]
+    assert store.read("AAPL", "1d", start=pd.Timestamp("2024-01-03"))["Close"].tolist() == [3.5, 4.0]
+
+    meta = store.meta("aapl", "1d")
+    assert (meta["first"], meta["last"], meta["covered_from"]) == ("2024-01-01", "2024-01-04", "2024-01-01")
+
+def test_compaction_keeps_data_and_verify_detects_corruption(tmp_path):
+    store = BarStore(str(tmp_path), max_segments=2)
+    for day in range(4):
+        store.write("MSFT", "1d", _bars(f"2024-01-0{day + 1}", [float(day)]))
+
+    # The third segment triggered compaction into the base files
+    assert store.meta("MSFT", "1d")["base_rows"] == 3
+    assert store.read("MSFT", "1d")["Close"].tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert store.verify("MSFT", "1d") == []
+
+    store.compact("MSFT", "1d")
+    assert store.verify_all() == {"1d/MSFT": []}
+
+    close_path = tmp_path / "1d" / "MSFT" / "base" / "close.npy"
+    values = np.load(close_path)
+    values[0] = 42.0
+    np.save(close_path, values)
+    assert store.verify("MSFT", "1d") == ["base checksum mismatch"]
+
+def test_empty_writes_do_not_create_unknown_symbols(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write("XXXX", "1d", _bars("2024-01-01", []))
+    assert store.meta("XXXX", "1d") is None
+    assert store.read("XXXX", "1d").empty
+
+def test_reads_copy_out_of_the_memory_map(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write("AAPL", "1d", _bars("2024-01-01", [1.0, 2.0, 3.0]))
+    store.compact("AAPL", "1d")
+
+    columns = store._load(store._dir("AAPL", "1d"), pd.Timestamp("2024-01-02").value)
+    assert all(type(values) is np.ndarray and values.flags.owndata for values in columns.values())
+    assert columns["close"].tolist() == [2.0, 3.0]
+
+def test_replace_drops_the_old_history(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write("AAPL", "1d", _bars("2024-01-01", [10.0, 10.0]), covered_from=pd.Timestamp("2024-01-01"))
+    store.write("AAPL", "1d", _bars("2024-01-03", [10.0]))
+
+    store.replace("AAPL", "1d", _bars("2024-01-02", [5.0, 5.0]), covered_from=pd.Timestamp("2024-01-02"),
+                  last_action="2024-01-03")
+    assert store.read("AAPL", "1d")["Close"].tolist() == [5.0, 5.0]
+    meta = store.meta("AAPL", "1d")
+    assert (meta["covered_from"], meta["last_action"]) == ("2024-01-02", "2024-01-03")
@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.bench import run
+from backend.bench.stubs import SyntheticProvider
+from backend.services import ai_service, gamification, providers
+
+def test_parse_mix():
+    assert run.parse_mix("default") == run.MIXES["default"]
+    assert run.parse_mix("ticker=3, chart") == {"ticker": 3.0, "chart": 1.0}
+    with pytest.raises(ValueError):
+        run.parse_mix("nope=1")
+
+def test_synthetic_provider_is_deterministic():
+    a, b = SyntheticProvider(), SyntheticProvider()
+    assert a.fetch_quote("AAPL") == b.fetch_quote("AAPL")
+    assert a.fetch_quote("XXXX") is None
+    assert set(a.fetch_quotes(["AAPL", "XXXX"])) == {"AAPL"}
+    assert len(a.fetch_bars("MSFT", period="1mo")) > 15
+    assert not a.fetch_bars("MSFT", interval="5m", period="1d").empty
+
+def test_short_run_reports_every_scenario(monkeypatch, gamification_store):
+    client = ai_service.client
+    monkeypatch.setattr(providers, "_provider", None)
+
+    result = asyncio.run(run.run_benchmark(
+        run.parse_mix("ticker=2,chart,intraday,dashboard,sentiment,sentiment_stream,search"),
+        duration=0.5, concurrency=4, warmup=0,
+        market_latency_ms=1, market_jitter_ms=0, llm_latency_ms=5, llm_jitter_ms=0
+    ))
+
+    assert set(result["scenarios"]) == set(run.SCENARIOS)
+    assert result["total"]["errors"] == 0
+    assert result["total"]["requests"] > 0
+    assert result["total"]["p50_ms"] <= result["total"]["p99_ms"]
+    assert result["upstream_calls"]["market"] > 0
+    json.dumps(result)
+    # The process's own backends are put back afterwards
+    assert providers._provider is None
+    assert ai_service.client is client
+    # Bench analyses earn points in a throwaway database, not the process's own
+    assert gamification.get_store() is gamification_store
+    assert gamification_store.stats()["pending_analyses"] == 0
+    assert gamification_store.get_profile(gamification.ANONYMOUS)["analyses"] == 0
+
+def test_report_compares_with_baseline():
+    result = {
+        "scenarios": {"ticker": {"requests": 10, "errors": 0, "throughput_rps": 20.0, "p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 4.0}},
+        "total": {"requests": 10, "errors": 0, "throughput_rps": 20.0, "p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 4.0},
+        "upstream_calls": {"market": 1, "llm": 0},
+    }
+    baseline = json.loads(json.dumps(result))
+    baseline["scenarios"]["ticker"]["p50_ms"] = 2.0
+
+    report = run.format_report(result, baseline)
+    assert "-50.0%" in report
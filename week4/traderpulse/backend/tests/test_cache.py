@@ -0,0 +1,38 @@
+from backend.services.cache import FRESH, MISS, STALE, TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_go_fresh_then_stale_then_missing():
+    clock = FakeClock()
+    cache = TTLCache("test", ttl=10, stale_ttl=5, max_entries=4, clock=clock)
+    cache.set("AAPL", 1)
+
+    assert cache.lookup("AAPL") == (FRESH, 1)
+    clock.now = 12
+    assert cache.lookup("AAPL") == (STALE, 1)
+    clock.now = 16
+    assert cache.lookup("AAPL") == (MISS, None)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (1, 1, 1)
+
+def test_least_recently_used_entry_is_evicted():
+    clock = FakeClock()
+    cache = TTLCache("test", ttl=10, max_entries=2, clock=clock)
+    cache.set("AAPL", 1)
+    cache.set("MSFT", 2)
+    cache.get("AAPL")
+    clock.now = 3
+    cache.set("TSLA", 3)
+
+    assert cache.get("MSFT") is None
+    assert cache.get("AAPL") == 1
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert [entry["key"] for entry in stats["entries"]] == ["TSLA", "AAPL"]
+    assert stats["entries"][1]["age_seconds"] == 3
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import time
+
+from backend.services import concurrency, market_service
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "AAPL"
+
+    async def run():
+        flight = concurrency.SingleFlight()
+        results = await asyncio.gather(*[flight.do("AAPL", fetch) for _ in range(200)])
+        return results, flight.in_flight()
+
+    results, remaining = asyncio.run(run())
+    assert results == ["AAPL"] * 200
+    assert len(calls) == 1
+    assert remaining == 0
+
+def test_quote_fetch_runs_off_the_event_loop(monkeypatch):
+    loop_thread = threading.get_ident()
+    seen = []
+
+    def slow_fetch(symbol):
+        seen.append(threading.get_ident())
+        time.sleep(0.05)
+        return {"symbol": symbol}
+
+    monkeypatch.setattr(market_service, "_fetch_quote_sync", slow_fetch)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.create_task(ticker())
+        quotes = await asyncio.gather(*[market_service.get_realtime_stock_data("aapl") for _ in range(50)])
+        ticking.cancel()
+        return quotes, ticks
+
+    quotes, ticks = asyncio.run(run())
+    assert all(quote == {"symbol": "AAPL"} for quote in quotes)
+    assert len(seen) == 1
+    assert seen[0] != loop_thread
+    # The loop kept running while the upstream call was blocked in the executor
+    assert ticks > 3
@@ -0,0 +1,203 @@
+import asyncio
+import sqlite3
+import threading
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.models import StockQuote
+from backend.services import ai_service, gamification, market_service
+from backend.services.gamification import GamificationStore, summarize
+
+client = TestClient(app)
+
+def _profile(points=0, analyses=0, bullish=0, bearish=0, symbols=()):
+    return {"points": points, "analyses": analyses, "bullish": bullish, "bearish": bearish, "symbols": set(symbols)}
+
+def test_new_user_starts_at_the_first_level(gamification_store):
+    assert gamification_store.get_status("alice") == {
+        "investor_level": "Principiante",
+        "analysis_points": 0,
+        "badges": [],
+        "next_level_progress": 0
+    }
+
+def test_levels_and_badges_follow_the_thresholds():
+    status = summarize(_profile(points=1500, analyses=150, bullish=10, bearish=9, symbols="ABCDE"))
+    assert status["investor_level"] == "Intermedio"
+    assert status["next_level_progress"] == 50
+    assert status["badges"] == ["Primer Análisis", "Analista Constante", "Toro de Oro", "Visualizador"]
+
+    assert summarize(_profile(points=20000))["next_level_progress"] == 100
+
+def test_recorded_analyses_are_visible_before_any_flush(gamification_store):
+    gamification_store.get_status("alice")  # cached before the increments
+    gamification_store.record_analysis("alice", "aapl", "Bullish")
+    gamification_store.record_analysis("bob", "MSFT", "Bearish")
+
+    profile = gamification_store.get_profile("alice")
+    assert (profile["points"], profile["analyses"], profile["bullish"], profile["symbols"]) == (10, 1, 1, {"AAPL"})
+    # Not cached yet: read from the (empty) database plus the pending delta
+    assert gamification_store.get_profile("bob")["bearish"] == 1
+    assert gamification_store.stats()["flushes"] == 0
+
+def test_flush_persists_in_one_batch(tmp_path):
+    path = str(tmp_path / "points.sqlite")
+    store = GamificationStore(path)
+    for symbol in ("AAPL", "MSFT", "AAPL"):
+        store.record_analysis("alice", symbol, "Neutral")
+    store.record_analysis("bob", "TSLA", "Bullish")
+
+    asyncio.run(store.flush())
+    assert store.stats()["flushes"] == 1
+    assert store.stats()["pending_users"] == 0
+
+    # Another worker sharing the file sees the totals
+    other = GamificationStore(path)
+    assert other.get_profile("alice") == _profile(points=30, analyses=3, symbols={"AAPL", "MSFT"})
+    assert other.get_profile("bob")["bullish"] == 1
+
+def test_flushes_accumulate(gamification_store):
+    gamification_store.record_analysis("alice", "AAPL")
+    asyncio.run(gamification_store.flush())
+    gamification_store.record_analysis("alice", "AAPL")
+    asyncio.run(gamification_store.flush())
+
+    fresh = GamificationStore(gamification_store.path)
+    assert fresh.get_profile("alice")["analyses"] == 2
+
+def test_read_during_a_flush_counts_each_analysis_once(gamification_store, monkeypatch):
+    gamification_store.record_analysis("alice", "AAPL")
+    seen = {}
+    write = gamification_store._write
+
+    def slow_write(seq, batch):
+        # A cache miss while the batch is being written, before and after it commits
+        seen["before"] = gamification_store.get_profile("alice")["analyses"]
+        gamification_store._profiles.clear()
+        write(seq, batch)
+        seen["after"] = gamification_store.get_profile("alice")["analyses"]
+        gamification_store._profiles.clear()
+
+    monkeypatch.setattr(gamification_store, "_write", slow_write)
+    asyncio.run(gamification_store.flush())
+    assert seen == {"before": 1, "after": 1}
+    assert gamification_store.get_profile("alice")["analyses"] == 1
+
+def test_async_reads_stay_off_the_event_loop(gamification_store, monkeypatch):
+    gamification_store.record_analysis("alice", "AAPL")
+    threads = []
+    read = gamification_store._read
+
+    def tracking_read(user_id):
+        threads.append(threading.current_thread())
+        return read(user_id)
+
+    monkeypatch.setattr(gamification_store, "_read", tracking_read)
+    assert asyncio.run(gamification_store.aget_status("alice"))["analysis_points"] == 10
+    assert threads and threading.main_thread() not in threads
+
+def test_async_read_overtaken_by_a_flush_reads_again(gamification_store, monkeypatch):
+    gamification_store.record_analysis("alice", "AAPL")
+    read = gamification_store._read
+    reads = []
+    resume = threading.Event()
+
+    def stalled_read(user_id):
+        result = read(user_id)
+        reads.append(result)
+        if len(reads) == 1:
+            resume.wait(5)  # the flush commits while this read is on its way back
+        return result
+
+    async def run():
+        monkeypatch.setattr(gamification_store, "_read", stalled_read)
+        pending = asyncio.ensure_future(gamification_store.aget_profile("alice"))
+        while not reads:
+            await asyncio.sleep(0.01)
+        await gamification_store.flush()
+        resume.set()
+        return await pending
+
+    assert asyncio.run(run())["analyses"] == 1
+    assert len(reads) == 2
+
+def test_failed_async_read_serves_the_increments_in_memory(gamification_store, monkeypatch):
+    gamification_store.record_analysis("alice", "AAPL")
+    asyncio.run(gamification_store.flush())
+    gamification_store.record_analysis("alice", "MSFT")
+    attempts = []
+
+    def failing_connection():
+        attempts.append(1)
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(gamification_store, "_connection", failing_connection)
+    profile = asyncio.run(asyncio.wait_for(gamification_store.aget_profile("alice"), 2))
+    assert profile == _profile(points=10, analyses=1, symbols={"MSFT"})
+    assert len(attempts) == 1
+    # Not cached: the next request reads the database again
+    monkeypatch.undo()
+    assert asyncio.run(gamification_store.aget_profile("alice"))["analyses"] == 2
+
+def test_async_read_gives_up_on_a_row_that_stays_behind(gamification_store, monkeypatch):
+    gamification_store.record_analysis("alice", "AAPL")
+    gamification_store._written_seq = 99  # a flush the row never catches up with
+    read = gamification_store._read
+    reads = []
+
+    def counting_read(user_id):
+        reads.append(user_id)
+        return read(user_id)
+
+    monkeypatch.setattr(gamification_store, "_read", counting_read)
+    assert asyncio.run(gamification_store.aget_profile("alice"))["analyses"] == 1
+    assert len(reads) == gamification.MAX_READ_ATTEMPTS
+
+def test_failed_flush_keeps_the_increments(gamification_store, monkeypatch):
+    gamification_store.record_analysis("alice", "AAPL")
+
+    def failing_write(seq, batch):
+        gamification_store.record_analysis("alice", "MSFT")  # arrives while the flush runs
+        raise OSError("disk full")
+
+    monkeypatch.setattr(gamification_store, "_write", failing_write)
+    asyncio.run(gamification_store.flush())
+    assert gamification_store.stats()["flush_failures"] == 1
+
+    monkeypatch.undo()
+    asyncio.run(gamification_store.flush())
+    fresh = GamificationStore(gamification_store.path)
+    assert fresh.get_profile("alice") == _profile(points=20, analyses=2, symbols={"AAPL", "MSFT"})
+
+def test_stop_flushes_pending_increments(gamification_store):
+    async def run():
+        gamification_store.start()
+        gamification_store.record_analysis("alice", "AAPL")
+        await gamification_store.stop()
+
+    asyncio.run(run())
+    assert GamificationStore(gamification_store.path).get_profile("alice")["analyses"] == 1
+
+def test_sentiment_requests_earn_points_per_user(monkeypatch):
+    async def fake_quote(symbol):
+        return StockQuote(symbol.upper(), 100.0, 1.0, 10, "2024-05-01T14:30:00+00:00")
+
+    async def fake_sentiment(symbol, market_data):
+        return {"sentiment": "Bullish", "justification": "-"}
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data", fake_quote)
+    monkeypatch.setattr(ai_service, "analyze_sentiment", fake_sentiment)
+
+    assert client.get("/api/v1/sentiment/AAPL", headers={"X-User-Id": "alice"}).status_code == 200
+    client.get("/api/v1/sentiment/AAPL")
+
+    response = client.get("/api/v1/gamification/status", headers={"X-User-Id": "alice"})
+    assert response.headers["cache-control"] == "no-store"
+    assert response.json()["analysis_points"] == 10
+    assert response.json()["badges"] == ["Primer Análisis"]
+    assert gamification.get_store().get_profile(gamification.ANONYMOUS)["analyses"] == 1
+
+def test_malformed_user_id_is_rejected():
+    response = client.get("/api/v1/gamification/status", headers={"X-User-Id": "not a valid id!"})
+    assert response.status_code == 422
@@ -0,0 +1,207 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.models import StockQuote
+from backend.services import ai_service, indicators, market_service
+from backend.services.indicators import IndicatorState, bollinger, compute, ema, rsi, sma, vwap
+from backend.services.series import series_from_bars
+
+def _bars(n, start="2024-01-01", freq="B", seed=1):
+    rng = np.random.default_rng(seed)
+    closes = 100 + np.cumsum(rng.normal(0, 1, n))
+    index = pd.date_range(start, periods=n, freq=freq)
+    return pd.DataFrame({
+        "Open": closes,
+        "High": closes + rng.uniform(0, 1, n),
+        "Low": closes - rng.uniform(0, 1, n),
+        "Close": closes,
+        "Volume": rng.integers(1_000, 5_000, n).astype(float),
+    }, index=index)
+
+def _series(n, **kwargs):
+    return series_from_bars(_bars(n, **kwargs))
+
+def _reference_ema(values, span, alpha=None):
+    alpha = alpha or 2 / (span + 1)
+    out = [np.nan] * len(values)
+    if len(values) >= span:
+        out[span - 1] = float(np.mean(values[:span]))
+        for i in range(span, len(values)):
+            out[i] = (1 - alpha) * out[i - 1] + alpha * values[i]
+    return np.array(out)
+
+def test_kernels_match_reference_loops():
+    closes = _series(80).closes
+
+    assert np.isnan(sma(closes, 20)[:19]).all()
+    assert sma(closes, 20)[-1] == pytest.approx(closes[-20:].mean())
+    np.testing.assert_allclose(ema(closes, 12), _reference_ema(closes, 12), equal_nan=True)
+
+    changes = np.diff(closes)
+    gains = _reference_ema(np.clip(changes, 0, None), 14, 1 / 14)
+    losses = _reference_ema(np.clip(-changes, 0, None), 14, 1 / 14)
+    assert rsi(closes)[-1] == pytest.approx(100 - 100 / (1 + gains[-1] / losses[-1]))
+    assert np.isnan(rsi(closes)[:14]).all() and not np.isnan(rsi(closes)[14])
+
+    middle, upper, lower = bollinger(closes, 20, 2.0)
+    assert upper[-1] - middle[-1] == pytest.approx(2 * closes[-20:].std())
+    assert middle[-1] - lower[-1] == pytest.approx(2 * closes[-20:].std())
+
+def test_rsi_is_bounded_for_one_way_markets():
+    assert rsi(np.arange(1.0, 40.0))[-1] == 100.0
+    assert rsi(np.full(40, 5.0))[-1] == 50.0
+
+def test_vwap_restarts_each_session():
+    prices = np.array([10.0, 20.0, 30.0, 40.0])
+    volumes = np.array([1.0, 3.0, 2.0, 2.0])
+
+    np.testing.assert_allclose(vwap(prices, volumes), [10.0, 17.5, 21.6666666, 26.25])
+    np.testing.assert_allclose(vwap(prices, volumes, np.array([0, 0, 1, 1])), [10.0, 17.5, 30.0, 35.0])
+    assert np.isnan(vwap(prices, np.zeros(4))).all()
+
+def _assert_matches(state, series, intraday=False):
+    expected = {name: values[-1] for name, values in compute(series, intraday).items()}
+    snapshot = state.snapshot()
+    assert set(snapshot) == set(expected)
+    for name, value in expected.items():
+        if np.isnan(value):
+            assert snapshot[name] is None, name
+        else:
+            assert snapshot[name] == pytest.approx(value, rel=1e-9), name
+
+@pytest.mark.parametrize("seeded", [5, 30, 100])
+def test_incremental_updates_match_full_recompute(seeded):
+    full = _series(120)
+    state = IndicatorState.from_series(full.take(np.arange(seeded)))
+
+    for i in range(seeded, len(full)):
+        # Each bar arrives twice: first as a partial bar, then final
+        state.update(int(full.times[i]), float(full.closes[i]) - 0.5, volume=1.0)
+        state.update(int(full.times[i]), float(full.closes[i]), float(full.highs[i]),
+                     float(full.lows[i]), float(full.volumes[i]))
+
+    _assert_matches(state, full)
+
+def test_intraday_state_restarts_vwap_each_day():
+    full = _series(60, start="2024-01-02 14:00", freq="15min")
+    state = IndicatorState.from_series(full.take(np.arange(40)), intraday=True)
+
+    assert state.sync(full)
+    _assert_matches(state, full, intraday=True)
+
+def test_sync_replays_only_new_bars_and_rejects_other_windows():
+    full = _series(100)
+    state = IndicatorState.from_series(full.take(np.arange(90)))
+
+    assert state.sync(full)
+    _assert_matches(state, full)
+    # A series starting on another day cannot extend this state
+    assert not state.sync(full.take(np.arange(1, 100)))
+
+def test_quotes_update_todays_bar():
+    series = _series(60)
+    state = IndicatorState.from_series(series)
+    last_day = pd.Timestamp(series.times[-1])
+
+    def quote(price, day):
+        return StockQuote("AAPL", price, 0.0, 1000, f"{day.date()}T20:00:00+00:00")
+
+    before = state.snapshot()["sma_20"]
+    assert state.apply_quote(quote(float(series.closes[-1]) + 10, last_day))
+    assert state.snapshot()["sma_20"] == pytest.approx(before + 10 / 20)
+
+    next_day = last_day + pd.Timedelta(days=1)
+    # Same price as the last close on a later day: market closed, nothing to add
+    assert not state.apply_quote(quote(state.last_close, next_day))
+    assert state.apply_quote(quote(state.last_close + 1, next_day))
+    assert state.last_key == state._key(next_day.value)
+
+def test_indicators_endpoint(monkeypatch):
+    series = _series(300)
+    series.as_of = 1714573800.0
+
+    async def fake_series(symbol, period="1mo", interval="1d", max_points=None):
+        assert max_points is None
+        return series if symbol == "AAPL" else None
+
+    monkeypatch.setattr(market_service, "get_historical_series", fake_series)
+    client = TestClient(app)
+
+    response = client.get("/api/v1/indicators/aapl?max_points=100")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["symbol"] == "AAPL" and len(body["dates"]) == 100
+    assert all(len(values) == 100 for values in body["indicators"].values())
+    assert body["indicators"]["sma_20"][0] is None
+    assert body["latest"]["rsi_14"] == pytest.approx(body["indicators"]["rsi_14"][-1])
+
+    assert client.get("/api/v1/indicators/XXXX").status_code == 404
+    assert client.get("/api/v1/indicators/AAPL?period=3d").status_code == 400
+
+def test_sentiment_prompt_includes_indicators_held_in_memory(monkeypatch):
+    series = _series(60)
+
+    async def fake_series(symbol, period="1mo", interval="1d", max_points=None):
+        return series
+
+    monkeypatch.setattr(market_service, "get_historical_series", fake_series)
+    quote = StockQuote("AAPL", float(series.closes[-1]), 0.5, 10, "2024-05-01T14:30:00+00:00")
+
+    assert "indicators" not in ai_service._market_context("AAPL", quote)
+    asyncio.run(indicators.get_indicators("AAPL"))
+    assert ai_service._market_context("AAPL", quote)["indicators"]["rsi_14"] == pytest.approx(
+        indicators.latest("AAPL")["rsi_14"], abs=1e-6
+    )
+
+def test_quotes_join_the_exchange_trading_day():
+    series = _series(60)
+    state = IndicatorState.from_series(series)
+    last_day = pd.Timestamp(series.times[-1])
+
+    # 02:00 UTC the next day is still the evening of the last trading day in New York
+    late = StockQuote("AAPL", float(series.closes[-1]) + 1, 0.0, 1000,
+                      f"{(last_day + pd.Timedelta(days=1)).date()}T02:00:00+00:00")
+    assert state.apply_quote(late)
+    assert state.last_key == state._key(last_day.value)
+
+def test_latest_leaves_the_cached_state_alone(monkeypatch):
+    series = _series(60)
+
+    async def fake_series(symbol, period="1mo", interval="1d", max_points=None):
+        return series
+
+    monkeypatch.setattr(market_service, "get_historical_series", fake_series)
+    asyncio.run(indicators.get_indicators("AAPL"))
+    before = indicators.latest("AAPL")
+
+    last_day = pd.Timestamp(series.times[-1])
+    quote = StockQuote("AAPL", float(series.closes[-1]) + 10, 0.0, 1000, f"{last_day.date()}T20:00:00+00:00")
+    assert indicators.latest("AAPL", quote)["sma_20"] == pytest.approx(before["sma_20"] + 10 / 20)
+    assert indicators.latest("AAPL") == before
+
+def test_new_bars_extend_the_cached_arrays_without_a_full_recompute(monkeypatch):
+    full = _series(300)
+    older = full.take(np.arange(290))
+    older.as_of, full.as_of = 1.0, 2.0
+    current = {"series": older}
+
+    async def fake_series(symbol, period="1mo", interval="1d", max_points=None):
+        return current["series"]
+
+    monkeypatch.setattr(market_service, "get_historical_series", fake_series)
+    asyncio.run(indicators.get_indicators("AAPL"))
+
+    computed = []
+    monkeypatch.setattr(indicators, "compute", lambda *args: computed.append(args) or compute(*args))
+    current["series"] = full
+    result = asyncio.run(indicators.get_indicators("AAPL"))
+
+    assert computed == []
+    for name, column in compute(full).items():
+        np.testing.assert_allclose(np.array(result["indicators"][name], dtype=float), column, rtol=1e-9,
+                                   equal_nan=True, err_msg=name)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+
+from backend.services import market_service
+from backend.services.intraday import IntradayBars
+
+def _minute_bars(days=("2024-05-01", "2024-05-02"), seed=0):
+    """
+    Regular-session 1m bars (9:30-16:00 New York) with Yahoo's tz-aware index.
+    """
+    index = pd.DatetimeIndex([], tz="America/New_York")
+    for day in days:
+        index = index.append(pd.date_range(f"{day} 09:30", f"{day} 15:59", freq="1min", tz="America/New_York"))
+    rng = np.random.default_rng(seed)
+    closes = 100 + np.cumsum(rng.normal(0, 0.1, len(index)))
+    return pd.DataFrame({
+        "Open": closes - 0.05,
+        "High": closes + rng.uniform(0, 0.2, len(index)),
+        "Low": closes - rng.uniform(0, 0.2, len(index)),
+        "Close": closes,
+        "Volume": rng.integers(100, 1000, len(index)).astype("float64"),
+    }, index=index.rename("Date"))
+
+def _stored(bars):
+    """
+    The bars as the bar store returns them: naive UTC.
+    """
+    return bars.tz_convert("UTC").tz_localize(None)
+
+def _expected(bars, rule):
+    # Yahoo-style bars: anchored at the session open
+    grouped = bars.groupby(bars.index.date, group_keys=False)
+    return grouped.apply(lambda session: session.resample(rule, origin="start").agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    ).dropna(subset=["Close"]))
+
+def test_resampled_intervals_match_session_anchored_ohlcv():
+    bars = _minute_bars()
+    intraday = IntradayBars("1m")
+    intraday.merge(_stored(bars), "America/New_York")
+
+    for interval, rule in (("5m", "5min"), ("15m", "15min"), ("1h", "60min")):
+        series = intraday.series(interval, "5d")
+        expected = _expected(bars, rule)
+        assert series.dates == expected.index.strftime("%Y-%m-%d %H:%M").tolist()
+        np.testing.assert_allclose(series.closes, expected["Close"])
+        np.testing.assert_allclose(series.highs, expected["High"])
+        np.testing.assert_allclose(series.lows, expected["Low"])
+        np.testing.assert_allclose(series.volumes, expected["Volume"])
+        np.testing.assert_array_equal(series.times, expected.index.tz_convert("UTC").as_unit("ns").asi8)
+
+    hourly = intraday.series("1h", "5d")
+    assert hourly.dates[:2] == ["2024-05-01 09:30", "2024-05-01 10:30"]
+    assert hourly.dates[6] == "2024-05-01 15:30"
+
+def test_partial_bars_are_updated_incrementally():
+    bars = _minute_bars()
+    intraday = IntradayBars("1m")
+    # Up to 10:07 with the 10:07 bar still forming
+    cutoff = bars.index.get_loc(pd.Timestamp("2024-05-02 10:07", tz="America/New_York"))
+    partial = bars.iloc[:cutoff + 1].copy()
+    partial.iloc[-1, partial.columns.get_loc("Close")] = 1.0
+    intraday.merge(_stored(partial), "America/New_York")
+    assert intraday.series("15m", "1d").closes[-1] == 1.0
+
+    # The next fetch starts at the last held bar: it is corrected and more bars follow
+    intraday.merge(_stored(bars.iloc[cutoff:]), "America/New_York")
+    rebuilt = IntradayBars("1m")
+    rebuilt.merge(_stored(bars), "America/New_York")
+    for interval in ("5m", "15m", "1h"):
+        incremental, full = intraday.series(interval, "5d"), rebuilt.series(interval, "5d")
+        assert incremental.dates == full.dates
+        np.testing.assert_allclose(incremental.closes, full.closes)
+        np.testing.assert_allclose(incremental.volumes, full.volumes)
+
+def test_session_periods_count_trading_days():
+    intraday = IntradayBars("1m")
+    intraday.merge(_stored(_minute_bars()), "America/New_York")
+    one_day = intraday.series("1m", "1d")
+    assert one_day.dates[0] == "2024-05-02 09:30"
+    assert len(one_day) == 390
+    assert len(intraday.series("1m", "5d")) == 780
+
+def test_interval_switching_fetches_the_finest_bars_once(monkeypatch):
+    bars = _minute_bars(days=[str(d.date()) for d in pd.bdate_range(end=pd.Timestamp.today(), periods=2)])
+    downloads = []
+
+    def download(symbol, interval="1d", **kwargs):
+        downloads.append((interval, kwargs))
+        if "period" in kwargs:
+            return bars
+        return bars[bars.index >= kwargs["start"]]
+
+    monkeypatch.setattr(market_service, "_download_bars_sync", download)
+
+    async def run():
+        return [await market_service.get_historical_series("AAPL", "5d", interval)
+                for interval in ("1m", "5m", "15m", "30m", "1h")]
+
+    minute, five, fifteen, thirty, hourly = asyncio.run(run())
+    assert downloads == [("1m", {"period": "5d"})]
+    assert (len(minute), len(five), len(fifteen), len(thirty), len(hourly)) == (780, 156, 52, 26, 14)
+    assert market_service.source_interval("1mo") == "5m"
+    assert market_service.source_interval("1y") == "1h"
+
+def test_stale_intraday_bars_only_fetch_the_tail(monkeypatch, bar_store):
+    bars = _minute_bars(days=[str(pd.bdate_range(end=pd.Timestamp.today(), periods=1)[0].date())])
+    downloads = []
+
+    def download(symbol, interval="1d", **kwargs):
+        downloads.append(kwargs)
+        return bars.iloc[:-30] if "period" in kwargs else bars[bars.index >= kwargs["start"]]
+
+    monkeypatch.setattr(market_service, "_download_bars_sync", download)
+    first = asyncio.run(market_service.get_historical_series("AAPL", "1d", "15m"))
+    assert len(first) == 24
+
+    # Age both the held bars and the store past the intraday TTL
+    meta_path = f"{bar_store.root}/1m/AAPL/meta.json"
+    meta = bar_store.meta("AAPL", "1m")
+    assert meta["timezone"] == "America/New_York"
+    meta["fetched_at"] = 0
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    market_service._intraday_cache.clear()
+    market_service._intraday_bars.last_known(("bars", "AAPL", "1m")).fetched_at = 0
+
+    refreshed = asyncio.run(market_service.get_historical_series("AAPL", "1d", "15m"))
+    assert downloads[1]["start"] == bars.index[-31].tz_convert("UTC")
+    assert len(refreshed) == 26
+    assert refreshed.closes[-1] == bars["Close"].iloc[-1]
@@ -0,0 +1,161 @@
+import asyncio
+import json
+
+import pandas as pd
+
+from backend.services import market_service
+
+def test_quotes_are_served_from_cache(monkeypatch):
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        return {"symbol": symbol}
+
+    monkeypatch.setattr(market_service, "_fetch_quote_sync", fetch)
+
+    async def run():
+        await market_service.get_realtime_stock_data("aapl")
+        return await market_service.get_realtime_stock_data("AAPL")
+
+    assert asyncio.run(run()) == {"symbol": "AAPL"}
+    assert calls == ["AAPL"]
+    assert asyncio.run(market_service.cache_stats())["quotes"]["hits"] == 1
+
+def test_stale_quote_is_served_while_refreshing(monkeypatch):
+    prices = iter(["1.0", "2.0"])
+    monkeypatch.setattr(market_service, "_fetch_quote_sync", lambda symbol: {"price": next(prices)})
+
+    async def run():
+        first = await market_service.get_realtime_stock_data("AAPL")
+        # Age the entry past its TTL but inside the stale window
+        value, stored_at = market_service._quote_cache._entries[("quote", "AAPL")]
+        market_service._quote_cache._entries[("quote", "AAPL")] = (value, stored_at - market_service._quote_cache.ttl - 1)
+
+        stale = await market_service.get_realtime_stock_data("AAPL")
+        await asyncio.gather(*market_service._background_tasks)
+        refreshed = await market_service.get_realtime_stock_data("AAPL")
+        return first, stale, refreshed
+
+    first, stale, refreshed = asyncio.run(run())
+    assert first["price"] == "1.0"
+    assert stale["price"] == "1.0"
+    assert refreshed["price"] == "2.0"
+
+def test_batch_only_fetches_uncached_symbols(monkeypatch):
+    requested = []
+
+    def fetch_batch(symbols):
+        requested.append(list(symbols))
+        return {symbol: {"symbol": symbol} for symbol in symbols if symbol != "XXXX"}
+
+    monkeypatch.setattr(market_service, "_fetch_quotes_batch_sync", fetch_batch)
+
+    async def run():
+        await market_service.get_realtime_stock_data_batch(["AAPL"])
+        return await market_service.get_realtime_stock_data_batch(["AAPL", "MSFT", "XXXX"])
+
+    result = asyncio.run(run())
+    assert requested == [["AAPL"], ["MSFT", "XXXX"]]
+    assert list(result["quotes"]) == ["AAPL", "MSFT"]
+    assert result["errors"] == {"XXXX": "Symbol not found"}
+
+def test_history_only_downloads_missing_ranges(monkeypatch, bar_store):
+    today = pd.Timestamp.today().normalize()
+    downloads = []
+
+    def download(symbol, interval="1d", **kwargs):
+        downloads.append(kwargs)
+        start = kwargs.get("start")
+        end = kwargs["end"]
+        index = pd.date_range(start, end - pd.Timedelta(days=1), freq="D")
+        return pd.DataFrame({"Close": [1.0] * len(index), "Volume": [1.0] * len(index)}, index=index)
+
+    monkeypatch.setattr(market_service, "_download_bars_sync", download)
+
+    first = asyncio.run(market_service.get_historical_data("AAPL", "1mo"))
+    assert downloads[0]["start"] == today - pd.DateOffset(months=1)
+    assert first[-1].date == today.strftime("%Y-%m-%d")
+
+    # Longer period: only the older gap is requested
+    market_service.clear_caches()
+    asyncio.run(market_service.get_historical_data("AAPL", "1y"))
+    assert downloads[1] == {"start": today - pd.DateOffset(years=1), "end": today - pd.DateOffset(months=1)}
+    assert len(downloads) == 2
+
+    # Once the stored data is older than the history TTL, only bars since the last one are requested
+    meta_path = f"{bar_store.root}/1d/AAPL/meta.json"
+    meta = bar_store.meta("AAPL")
+    meta["fetched_at"] = 0
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+
+    market_service.clear_caches()
+    history = asyncio.run(market_service.get_historical_data("AAPL", "1y"))
+    assert downloads[2]["start"] == today
+    assert len(history) == len(pd.date_range(today - pd.DateOffset(years=1), today))
+
+def _adjusted_bars(start, end, split_on=None):
+    """
+    Daily bars as the provider serves them: prices adjusted for every split
+    up to `split_on` (a 2:1 split that halves earlier closes).
+    """
+    index = pd.date_range(start, end - pd.Timedelta(days=1), freq="D")
+    closes = [50.0 if split_on is not None else 100.0] * len(index)
+    splits = [2.0 if split_on is not None and day == split_on else 0.0 for day in index]
+    return pd.DataFrame({"Close": closes, "Volume": [1.0] * len(index), "Stock Splits": splits}, index=index)
+
+def _expire_history(bar_store, symbol):
+    meta_path = f"{bar_store.root}/1d/{symbol}/meta.json"
+    meta = bar_store.meta(symbol)
+    meta["fetched_at"] = 0
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    market_service.clear_caches()
+
+def test_a_split_rebuilds_the_stored_history(monkeypatch, bar_store):
+    today = pd.Timestamp.today().normalize()
+    split = {"on": None}
+    downloads = []
+
+    def download(symbol, interval="1d", **kwargs):
+        downloads.append(kwargs)
+        return _adjusted_bars(kwargs["start"], kwargs["end"], split["on"])
+
+    monkeypatch.setattr(market_service, "_download_bars_sync", download)
+    asyncio.run(market_service.get_historical_data("AAPL", "1mo"))
+
+    # The split shows up in the next incremental update: everything is fetched again, adjusted
+    split["on"] = today
+    _expire_history(bar_store, "AAPL")
+    history = asyncio.run(market_service.get_historical_data("AAPL", "1mo"))
+    assert downloads[1]["start"] == today
+    assert downloads[2]["start"] == today - pd.DateOffset(months=1)
+    assert {point.close for point in history} == {50.0}
+    assert bar_store.meta("AAPL")["last_action"] == today.strftime("%Y-%m-%d")
+
+    # Once rebuilt, the same split does not trigger another rebuild
+    _expire_history(bar_store, "AAPL")
+    asyncio.run(market_service.get_historical_data("AAPL", "1mo"))
+    assert len(downloads) == 4 and downloads[3]["start"] == today
+
+def test_bars_stored_before_adjustment_are_replaced(monkeypatch, bar_store):
+    today = pd.Timestamp.today().normalize()
+    raw = _adjusted_bars(today - pd.DateOffset(months=1), today + pd.Timedelta(days=1))
+    bar_store.write("AAPL", "1d", raw, covered_from=today - pd.DateOffset(months=1))
+    meta = bar_store.meta("AAPL")
+    del meta["last_action"]
+    with open(f"{bar_store.root}/1d/AAPL/meta.json", "w") as f:
+        json.dump(meta, f)
+
+    downloads = []
+
+    def download(symbol, interval="1d", **kwargs):
+        downloads.append(kwargs)
+        return _adjusted_bars(kwargs["start"], kwargs["end"], split_on=today - pd.Timedelta(days=3))
+
+    monkeypatch.setattr(market_service, "_download_bars_sync", download)
+    history = asyncio.run(market_service.get_historical_data("AAPL", "1mo"))
+    assert len(downloads) == 1
+    assert {point.close for point in history} == {50.0}
+    assert "last_action" in bar_store.meta("AAPL")
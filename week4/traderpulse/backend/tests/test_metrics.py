@@ -0,0 +1,93 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import metrics
+from backend.main import app
+from backend.models import StockQuote
+from backend.services import ai_service, market_service
+
+def test_registry_renders_prometheus_text():
+    registry = metrics.Registry()
+    requests = registry.counter("jobs", "Jobs run.", ("kind",))
+    latency = registry.histogram("job_seconds", "Job latency.", buckets=(0.1, 1.0))
+    requests.inc(kind="nightly")
+    requests.inc(2, kind='say "hi"')
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{kind="nightly"} 1.0' in text
+    assert 'jobs_total{kind="say \\"hi\\""} 2.0' in text
+    assert "# TYPE job_seconds histogram" in text
+    assert 'job_seconds_bucket{le="0.1"} 1.0' in text
+    assert 'job_seconds_bucket{le="1.0"} 2.0' in text
+    assert 'job_seconds_bucket{le="+Inf"} 2.0' in text
+    assert "job_seconds_count 2.0" in text
+
+def test_labels_must_match_declaration():
+    counter = metrics.Counter("c", "c", ("a",))
+    with pytest.raises(ValueError):
+        counter.inc(b="x")
+
+def test_track_upstream_counts_outcomes():
+    labels = {"upstream": "test", "operation": "op"}
+    with metrics.track_upstream(**labels):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.track_upstream(**labels):
+            raise RuntimeError("boom")
+
+    assert metrics.upstream_requests.value(outcome="success", **labels) == 1
+    assert metrics.upstream_requests.value(outcome="error", **labels) == 1
+    assert metrics.upstream_duration.count(**labels) == 2
+
+def test_metrics_endpoint_reports_routes_and_caches(monkeypatch):
+    client = TestClient(app)
+    before = metrics.http_request_duration.count(method="GET", route="/api/v1/system/ai", status="200")
+    assert client.get("/api/v1/system/ai").status_code == 200
+
+    market_service._quote_cache.lookup(("quote", "AAPL"))
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert metrics.http_request_duration.count(method="GET", route="/api/v1/system/ai", status="200") == before + 1
+    assert 'route="/api/v1/system/ai"' in response.text
+    assert 'cache_requests_total{cache="quotes",result="miss"} 1.0' in response.text
+    assert 'cache_entries{cache="sentiment"} 0.0' in response.text
+    assert "http_requests_in_flight" in response.text
+
+def test_unmatched_routes_share_one_label():
+    TestClient(app).get("/no/such/path")
+    assert metrics.http_request_duration.count(method="GET", route="unmatched", status="404") >= 1
+
+def test_gemini_calls_are_counted(monkeypatch):
+    async def failing(**kwargs):
+        raise RuntimeError("quota exceeded")
+
+    models = SimpleNamespace(generate_content=failing)
+    monkeypatch.setattr(ai_service, "client", SimpleNamespace(aio=SimpleNamespace(models=models)))
+    before = metrics.upstream_requests.value(upstream="gemini", operation="sentiment", outcome="error")
+
+    asyncio.run(ai_service.analyze_sentiment("AAPL", StockQuote("AAPL", 1.0, 0.0, 0, "2024-05-01T14:30:00+00:00")))
+    assert metrics.upstream_requests.value(upstream="gemini", operation="sentiment", outcome="error") == before + 1
+
+def test_loop_lag_probe_records_blocking():
+    probe = metrics.LoopLagProbe(interval=0.01)
+    before = metrics.event_loop_lag.sum()
+
+    async def run():
+        probe.start()
+        await asyncio.sleep(0.005)
+        # Block the loop so the probe wakes up late
+        time.sleep(0.05)
+        await asyncio.sleep(0.03)
+        await probe.stop()
+
+    asyncio.run(run())
+    # The 50ms block shows up as at least ~40ms of lag
+    assert metrics.event_loop_lag.sum() - before >= 0.03
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.services import market_service, providers
+from backend.services.providers.base import MarketDataProvider
+from backend.services.providers.recording import RecordingProvider, ReplayProvider
+from backend.services.providers.yfinance_provider import split_batch_download
+
+class FakeUpstream(MarketDataProvider):
+    def fetch_quote(self, symbol):
+        return {"price": 110.0, "previous_close": 100.0, "volume": 2000.0} if symbol == "AAPL" else None
+
+    def fetch_quotes(self, symbols):
+        return {s: self.fetch_quote(s) for s in symbols if self.fetch_quote(s)}
+
+    def fetch_bars(self, symbol, interval="1d", start=None, end=None, period=None):
+        index = pd.date_range("2024-01-01", periods=10, freq="D")
+        closes = np.arange(10, dtype=float)
+        return pd.DataFrame({"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": closes},
+                            index=index)
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    recorder = RecordingProvider(FakeUpstream(), str(tmp_path))
+    recorder.fetch_quotes(["AAPL", "XXXX"])
+    recorder.fetch_bars("AAPL", period="1mo")
+
+    provider = ReplayProvider(str(tmp_path))
+    monkeypatch.setattr(providers, "_provider", provider)
+    return provider
+
+def test_split_batch_download_builds_raw_quotes_per_symbol():
+    index = pd.to_datetime(["2024-01-02", "2024-01-03"])
+    columns = pd.MultiIndex.from_product([["AAPL", "XXXX"], ["Close", "Volume"]])
+    df = pd.DataFrame([[100.0, 1000, np.nan, np.nan], [110.0, 2000, np.nan, np.nan]], index=index, columns=columns)
+
+    quotes = split_batch_download(df, ["AAPL", "XXXX", "MSFT"])
+
+    assert quotes == {"AAPL": {"price": 110.0, "previous_close": 100.0, "volume": 2000.0, "average_volume": 1000.0}}
+
+def test_replay_serves_recorded_quotes_through_market_service(replay):
+    result = asyncio.run(market_service.get_realtime_stock_data_batch(["aapl", "xxxx"]))
+
+    assert result["quotes"]["AAPL"].change_percent == 10.0
+    assert result["quotes"]["AAPL"].volume == 2000
+    assert result["errors"] == {"XXXX": "Symbol not found"}
+
+def test_replay_slices_recorded_bars(replay):
+    bars = replay.fetch_bars("AAPL", start=pd.Timestamp("2024-01-05"), end=pd.Timestamp("2024-01-08"))
+    assert bars["Close"].tolist() == [4.0, 5.0, 6.0]
+    assert len(replay.fetch_bars("AAPL", period="5d")) == 6
+    assert replay.fetch_bars("MSFT").empty
+
+def test_replay_injects_latency(tmp_path):
+    provider = ReplayProvider(str(tmp_path), latency_ms=20, jitter_ms=5, seed=1)
+    started = time.perf_counter()
+    assert provider.fetch_quote("AAPL") is None
+    assert time.perf_counter() - started >= 0.02
+
+def test_unknown_provider_name_is_rejected():
+    with pytest.raises(ValueError):
+        providers.create_provider("bloomberg")
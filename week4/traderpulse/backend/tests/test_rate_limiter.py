@@ -0,0 +1,159 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.models import StockQuote
+from backend.services import market_service, providers
+from backend.services.rate_limiter import (BACKGROUND, INTERACTIVE, AdaptiveRateLimiter, RateLimited, is_throttle,
+                                          worker_share)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_queued_calls_are_served_by_priority():
+    limiter = AdaptiveRateLimiter("test", rate=50, burst=1, max_wait=1.0)
+    order = []
+
+    async def call(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+
+    async def run():
+        await limiter.acquire()  # empties the bucket
+        background = asyncio.ensure_future(call("background", BACKGROUND))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(call("interactive", INTERACTIVE))
+        await asyncio.gather(background, interactive)
+
+    asyncio.run(run())
+    assert order == ["interactive", "background"]
+    assert limiter.stats()["queued"] == 2
+
+def test_calls_that_would_wait_too_long_are_shed():
+    limiter = AdaptiveRateLimiter("test", rate=1, burst=1, max_wait=0.5)
+
+    async def run():
+        await limiter.acquire()
+        with pytest.raises(RateLimited) as shed:
+            await limiter.acquire()
+        return shed.value
+
+    assert asyncio.run(run()).retry_after == pytest.approx(1.0, abs=0.05)
+    assert limiter.shed == 1
+
+def test_throttling_halves_the_rate_and_pauses_with_jitter():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter("test", rate=10, burst=5, clock=clock, jitter=lambda: 1.0)
+
+    limiter.record_failure(RuntimeError("429 Too Many Requests"))
+    stats = limiter.stats()
+    assert (stats["rate_per_second"], stats["paused_for_seconds"], stats["tokens"]) == (5.0, 0.5, 0.0)
+
+    # Nothing accrues during the pause, then tokens refill at the reduced rate
+    clock.now = 1.0
+    assert limiter.stats()["tokens"] == pytest.approx(2.5)
+
+    limiter.record_success()
+    assert limiter.rate == pytest.approx(5.5)
+
+def test_ordinary_errors_back_off_only_when_they_repeat():
+    limiter = AdaptiveRateLimiter("test", rate=10, burst=5, clock=FakeClock(), jitter=lambda: 0.0)
+
+    limiter.record_failure(KeyError("XXXX"))
+    limiter.record_failure(KeyError("XXXX"))
+    assert limiter.rate == 10 and limiter.stats()["paused_for_seconds"] == 0
+
+    limiter.record_failure(KeyError("XXXX"))
+    assert limiter.rate == 8 and limiter.stats()["paused_for_seconds"] == 1.0
+
+def test_throttle_detection():
+    assert is_throttle(SimpleNamespace(code=429))
+    assert is_throttle(RuntimeError("YFRateLimitError: Too Many Requests. Rate limited."))
+    assert not is_throttle(KeyError("currentTradingPeriod"))
+
+def _quote(symbol):
+    return StockQuote(symbol, 100.0, 1.0, 10, "2024-05-01T14:30:00+00:00")
+
+@pytest.fixture
+def exhausted(monkeypatch):
+    """
+    A market data limiter with its only token already spent and a 10 s refill.
+    """
+    limiter = AdaptiveRateLimiter("market_data", rate=0.1, burst=1, max_wait=0.5)
+    limiter._tokens = 0.0
+    monkeypatch.setattr(market_service, "_limiter", limiter)
+    return limiter
+
+def test_shed_requests_get_the_last_known_quote_or_a_503(exhausted, monkeypatch):
+    monkeypatch.setattr(market_service, "_fetch_quotes_batch_sync",
+                        lambda symbols: pytest.fail("the limiter should have shed this call"))
+    # Long past the stale window, but still the best we have
+    market_service._quote_cache.set(("quote", "AAPL"), _quote("AAPL"), age=3600)
+    client = TestClient(app)
+
+    response = client.get("/api/v1/stocks?symbols=AAPL,MSFT")
+    assert response.status_code == 200
+    assert response.json()["quotes"]["AAPL"]["price"] == 100.0
+    assert response.json()["errors"] == {"MSFT": "Rate limited, retry later"}
+
+    response = client.get("/api/v1/stocks?symbols=MSFT")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "10"
+
+def test_provider_throttling_backs_off_and_returns_503(monkeypatch):
+    limiter = AdaptiveRateLimiter("market_data", rate=10, burst=5, max_wait=0.5)
+    monkeypatch.setattr(market_service, "_limiter", limiter)
+
+    def fetch_quotes(symbols):
+        raise RuntimeError("429 Client Error: Too Many Requests")
+
+    monkeypatch.setattr(providers, "_provider", SimpleNamespace(name="stub", fetch_quotes=fetch_quotes))
+    response = TestClient(app).get("/api/v1/stocks?symbols=AAPL")
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert limiter.throttled == 1 and limiter.rate == 5
+
+def test_daily_history_throttling_surfaces_as_rate_limited(monkeypatch):
+    limiter = AdaptiveRateLimiter("market_data", rate=10, burst=5, max_wait=0.5)
+    monkeypatch.setattr(market_service, "_limiter", limiter)
+
+    def fetch_bars(symbol, interval="1d", **kwargs):
+        raise RuntimeError("YFRateLimitError: Too Many Requests. Rate limited.")
+
+    monkeypatch.setattr(providers, "_provider", SimpleNamespace(name="stub", fetch_bars=fetch_bars))
+    with pytest.raises(RateLimited):
+        asyncio.run(market_service.get_historical_series("AAPL", "1mo"))
+    assert limiter.throttled == 1
+
+def test_each_history_download_takes_a_token(monkeypatch, bar_store):
+    import pandas as pd
+
+    def download(symbol, interval="1d", **kwargs):
+        end = kwargs["end"]
+        index = pd.date_range(kwargs["start"], end - pd.Timedelta(days=1), freq="D")
+        return pd.DataFrame({"Close": [1.0] * len(index), "Volume": [1.0] * len(index)}, index=index)
+
+    monkeypatch.setattr(market_service, "_download_bars_sync", download)
+    asyncio.run(market_service.get_historical_data("AAPL", "1mo"))
+
+    # A longer period with stale bars: the older gap and the newest bars are two upstream calls
+    monkeypatch.setattr(market_service.settings, "HISTORY_CACHE_TTL", 0)
+    limiter = AdaptiveRateLimiter("market_data", rate=10, burst=5)
+    monkeypatch.setattr(market_service, "_limiter", limiter)
+    market_service.clear_caches()
+    asyncio.run(market_service.get_historical_data("AAPL", "1y"))
+    assert limiter.granted == 2
+
+def test_host_budgets_are_split_between_workers():
+    assert worker_share(5.0, 20, 1) == (5.0, 20)
+    assert worker_share(5.0, 20, 4) == (1.25, 5)
+    assert worker_share(2.0, 3, 8) == (0.25, 1)
+    assert worker_share(0.0, 20, 4)[0] == 0.0  # still disabled
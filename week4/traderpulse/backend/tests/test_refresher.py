@@ -0,0 +1,114 @@
+import asyncio
+
+import pandas as pd
+
+from backend.models import StockQuote
+from backend.services import market_service, refresher as refresher_module
+from backend.services.refresher import MAX_HISTORY_KEYS, MarketRefresher
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def _refresher(clock, refreshed, histories=None):
+    async def refresh_quotes(symbols):
+        refreshed.append(sorted(symbols))
+
+    async def refresh_history(symbol, period, interval):
+        (histories if histories is not None else []).append((symbol, period, interval))
+
+    return MarketRefresher(
+        refresh_quotes, refresh_history,
+        min_interval=5, max_interval=100, idle_ttl=300, half_life=60, history_interval=50, clock=clock
+    )
+
+def test_hot_symbols_refresh_more_often_than_cold_ones():
+    clock = FakeClock()
+    refreshed = []
+    refresher = _refresher(clock, refreshed)
+
+    for _ in range(40):
+        refresher.record_demand("AAPL")
+    refresher.record_demand("TSLA")
+
+    stats = refresher.stats()["symbols"]
+    assert stats["AAPL"]["interval_seconds"] == 5
+    assert stats["TSLA"]["interval_seconds"] == 100
+
+    for _ in range(20):
+        clock.now += 5
+        asyncio.run(refresher.run_once())
+
+    counts = refresher.stats()["symbols"]
+    assert counts["AAPL"]["refreshes"] > counts["TSLA"]["refreshes"] >= 1
+
+def test_due_symbols_are_refreshed_in_one_batch():
+    clock = FakeClock()
+    refreshed = []
+    refresher = _refresher(clock, refreshed)
+    refresher.record_demand("AAPL")
+    refresher.record_demand("TSLA")
+
+    clock.now += 100
+    assert sorted(asyncio.run(refresher.run_once())) == ["AAPL", "TSLA"]
+    assert refreshed == [["AAPL", "TSLA"]]
+
+def test_idle_symbols_are_dropped():
+    clock = FakeClock()
+    refreshed = []
+    refresher = _refresher(clock, refreshed)
+    refresher.record_demand("AAPL")
+
+    clock.now += 400
+    assert asyncio.run(refresher.run_once()) == []
+    stats = refresher.stats()
+    assert stats["tracked_symbols"] == 0
+    assert stats["dropped_symbols"] == 1
+
+def test_requested_histories_are_refreshed_on_their_own_cadence():
+    clock = FakeClock()
+    histories = []
+    refresher = _refresher(clock, [], histories)
+    refresher.record_demand("AAPL", "1y", "1d")
+
+    clock.now += 100
+    asyncio.run(refresher.run_once())
+    assert histories == [("AAPL", "1y", "1d")]
+    assert refresher.stats()["last_lag_seconds"] == 0
+
+def test_history_keys_are_capped_to_the_latest_requests():
+    refresher = _refresher(FakeClock(), [])
+    for days in range(1, 20):
+        refresher.record_demand("AAPL", f"{days}d", "1d")
+    refresher.record_demand("AAPL", "12d", "1d")
+
+    keys = list(refresher._symbols["AAPL"].history_keys)
+    assert len(keys) == MAX_HISTORY_KEYS
+    assert keys[-1] == ("12d", "1d") and ("19d", "1d") in keys and ("1d", "1d") not in keys
+
+def test_demand_is_only_tracked_by_a_running_refresher_for_symbols_that_exist(monkeypatch):
+    def fetch(symbol):
+        return StockQuote(symbol, 1.0, 0.0, 1, "2024-05-01T14:30:00+00:00") if symbol == "AAPL" else None
+
+    monkeypatch.setattr(market_service, "_fetch_quote_sync", fetch)
+    monkeypatch.setattr(market_service, "_download_bars_sync", lambda symbol, interval="1d", **kwargs: pd.DataFrame())
+
+    async def run():
+        # Not running (REFRESHER_ENABLED=false): nothing is tracked
+        await market_service.get_realtime_stock_data("AAPL")
+        assert refresher_module._refresher is None
+
+        live = refresher_module.get_refresher()
+        live.start()
+        try:
+            await market_service.get_realtime_stock_data("AAPL")
+            await market_service.get_realtime_stock_data("XXXX")
+            await market_service.get_historical_series("NOPE", "1y")
+            return live.stats()["symbols"]
+        finally:
+            await live.stop()
+
+    assert list(asyncio.run(run())) == ["AAPL"]
@@ -0,0 +1,136 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend import compression
+from backend.compression import CompressionMiddleware, negotiate_encoding
+from backend.main import app as main_app
+from backend.models import StockQuote
+from backend.routers.responses import cached_json, public_policy
+from backend.services import market_service
+
+AS_OF = "2024-05-01T14:30:00+00:00"
+
+def _app(content):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/data")
+    async def data(request: Request):
+        return cached_json(request, content, public_policy(15, 120), AS_OF)
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            yield b'{"part": 1}\n' * 50
+            yield b'{"part": 2}\n' * 50
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+def test_validators_and_conditional_get():
+    client = _app({"closes": [1.0, 2.0]})
+
+    response = client.get("/data")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=15, stale-while-revalidate=120"
+    assert response.headers["last-modified"] == "Wed, 01 May 2024 14:30:00 GMT"
+    etag = response.headers["etag"]
+
+    not_modified = client.get("/data", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    assert client.get("/data", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert client.get("/data", headers={"If-Modified-Since": "Wed, 01 May 2024 14:30:00 GMT"}).status_code == 304
+    assert client.get("/data", headers={"If-Modified-Since": "Wed, 01 May 2024 14:29:59 GMT"}).status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    assert client.get("/data", headers={"If-None-Match": '"other"', "If-Modified-Since": "Wed, 01 May 2024 14:30:00 GMT"}).status_code == 200
+
+def test_etag_changes_with_content():
+    first = _app({"price": 1.0}).get("/data").headers["etag"]
+    second = _app({"price": 2.0}).get("/data").headers["etag"]
+    assert first != second
+
+def test_large_bodies_are_gzipped_with_weak_etag(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    client = _app({"closes": list(range(500))})
+
+    response = client.get("/data", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+    assert response.headers["etag"].startswith('W/"')
+    assert response.json()["closes"][-1] == 499
+
+    # The weak ETag from a compressed response still validates
+    revalidated = client.get("/data", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+    identity = client.get("/data", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+def test_small_and_streamed_bodies_are_not_compressed():
+    client = _app({"price": 1.0})
+    assert "content-encoding" not in client.get("/data", headers={"Accept-Encoding": "gzip"}).headers
+
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in streamed.headers
+    assert streamed.text.count("\n") == 100
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0, deflate", None),
+    ("identity", None),
+    ("*", "gzip"),
+    ("", None),
+])
+def test_negotiate_encoding_without_brotli(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate_encoding(header) == expected
+
+def test_negotiate_prefers_brotli_when_available(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+
+def test_stock_endpoint_supports_conditional_get(monkeypatch):
+    async def fake_quote(symbol):
+        return StockQuote("AAPL", 100.0, 0.5, 10, AS_OF)
+
+    async def fake_series(symbol, period="1mo", interval="1d", max_points=None):
+        return None
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data", fake_quote)
+    monkeypatch.setattr(market_service, "get_historical_series", fake_series)
+
+    client = TestClient(main_app)
+    response = client.get("/api/v1/stocks/AAPL")
+    assert response.status_code == 200
+    assert response.headers["last-modified"] == "Wed, 01 May 2024 14:30:00 GMT"
+    assert response.headers["cache-control"].startswith("public, max-age=")
+
+    assert client.get("/api/v1/stocks/AAPL", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+def test_system_endpoints_are_not_cacheable():
+    response = TestClient(main_app).get("/api/v1/system/cache")
+    assert response.headers["cache-control"] == "no-store"
+
+def test_stock_endpoint_negotiates_msgpack(monkeypatch):
+    msgpack = pytest.importorskip("msgpack")
+
+    async def fake_quote(symbol):
+        return StockQuote("AAPL", 100.0, 0.5, 10, AS_OF)
+
+    async def fake_series(symbol, period="1mo", interval="1d", max_points=None):
+        return None
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data", fake_quote)
+    monkeypatch.setattr(market_service, "get_historical_series", fake_series)
+
+    client = TestClient(main_app)
+    packed = client.get("/api/v1/stocks/AAPL", headers={"Accept": "application/msgpack"})
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert "Accept" in packed.headers["vary"]
+    assert msgpack.unpackb(packed.content) == client.get("/api/v1/stocks/AAPL").json()
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from backend.models import PricePoint
+from backend.services.series import downsample, lttb_indices, series_from_bars
+
+def test_series_from_bars_formats_daily_and_intraday_dates():
+    index = pd.to_datetime(["2024-01-02 09:30", "2024-01-02 09:31"])
+    df = pd.DataFrame({"Close": [1.5, 2.5]}, index=index)
+
+    assert series_from_bars(df).to_points() == [
+        PricePoint("2024-01-02", 1.5),
+        PricePoint("2024-01-02", 2.5),
+    ]
+    assert series_from_bars(df, intraday=True).dates == ["2024-01-02 09:30", "2024-01-02 09:31"]
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[500] = 10.0
+    y[700] = -10.0
+
+    indices = lttb_indices(x, y, 20)
+
+    assert len(indices) == 20
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 500 in indices and 700 in indices
+    assert np.all(np.diff(indices) > 0)
+
+def test_downsample_is_a_no_op_for_short_series():
+    df = pd.DataFrame({"Close": [1.0, 2.0, 3.0]}, index=pd.date_range("2024-01-01", periods=3))
+    series = series_from_bars(df)
+    assert downsample(series, 10) is series
+
+    longer = pd.DataFrame({"Close": np.arange(30.0)}, index=pd.date_range("2024-01-01", periods=30))
+    assert len(downsample(series_from_bars(longer), 10)) == 10
@@ -0,0 +1,229 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from backend.services import market_service
+from backend.services.shared_cache import SharedCache
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "shared.sqlite")
+
+@pytest.fixture
+def worker(path, monkeypatch):
+    """
+    This process's shared cache. Other "workers" are further SharedCache
+    instances on the same file (each has its own lease owner id).
+    """
+    shared = SharedCache(path, lease_seconds=5.0)
+    monkeypatch.setattr(market_service, "_shared_cache", shared)
+    return shared
+
+def test_entries_are_visible_to_other_workers(path):
+    first, second = SharedCache(path), SharedCache(path)
+    first.set_many({"quote:AAPL": {"price": 1.0}, "quote:MSFT": {"price": 2.0}})
+
+    found = second.get_many(["quote:AAPL", "quote:MSFT", "quote:XXXX"])
+    assert {key: value for key, (value, _) in found.items()} == {
+        "quote:AAPL": {"price": 1.0}, "quote:MSFT": {"price": 2.0}
+    }
+    assert found["quote:AAPL"][1] < 1.0
+    assert second.misses == 1
+
+def test_only_one_worker_holds_a_lease(path):
+    first, second = SharedCache(path, lease_seconds=5.0), SharedCache(path, lease_seconds=5.0)
+
+    assert first.acquire("quote:AAPL")
+    assert first.acquire("quote:AAPL")  # re-entrant for its holder
+    assert not second.acquire("quote:AAPL")
+    assert second.acquire_many(["quote:AAPL", "quote:MSFT"]) == ["quote:MSFT"]
+
+    first.release("quote:AAPL")
+    assert second.acquire("quote:AAPL")
+
+def test_abandoned_leases_expire(path):
+    first, second = SharedCache(path, lease_seconds=0.05), SharedCache(path)
+    assert first.acquire("quote:AAPL")
+    time.sleep(0.1)
+    assert second.acquire("quote:AAPL")
+
+def test_old_entries_are_ignored_and_pruned(path):
+    shared = SharedCache(path, max_age=0.05)
+    shared.set("quote:AAPL", 1)
+    time.sleep(0.1)
+    assert shared.get("quote:AAPL") is None
+    shared.prune()
+    assert shared.stats()["entries"] == 0
+
+def test_workers_reuse_each_others_quotes(worker, path, monkeypatch):
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        return {"symbol": symbol}
+
+    monkeypatch.setattr(market_service, "_fetch_quote_sync", fetch)
+    asyncio.run(market_service.get_realtime_stock_data("AAPL"))
+
+    # A second worker starts with an empty in-process cache
+    market_service.clear_caches()
+    monkeypatch.setattr(market_service, "_shared_cache", SharedCache(path))
+    assert asyncio.run(market_service.get_realtime_stock_data("AAPL")) == {"symbol": "AAPL"}
+    assert calls == ["AAPL"]
+
+def test_waits_for_the_worker_holding_the_lease(worker, path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(market_service, "_fetch_quote_sync", lambda symbol: calls.append(symbol) or {"price": 0.0})
+    other = SharedCache(path)
+    assert other.acquire("quote:AAPL")
+
+    async def run():
+        waiting = asyncio.ensure_future(market_service.get_realtime_stock_data("AAPL"))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        other.set("quote:AAPL", {"price": 1.0})
+        other.release("quote:AAPL")
+        return await waiting
+
+    assert asyncio.run(run()) == {"price": 1.0}
+    assert calls == []
+
+def test_batch_fetches_only_what_no_worker_has(worker, path, monkeypatch):
+    requested = []
+
+    def fetch_batch(symbols):
+        requested.append(list(symbols))
+        return {symbol: {"symbol": symbol} for symbol in symbols}
+
+    monkeypatch.setattr(market_service, "_fetch_quotes_batch_sync", fetch_batch)
+    SharedCache(path).set("quote:AAPL", {"symbol": "AAPL", "from": "other"})
+
+    result = asyncio.run(market_service.get_realtime_stock_data_batch(["AAPL", "MSFT"]))
+    assert requested == [["MSFT"]]
+    assert result["quotes"]["AAPL"]["from"] == "other"
+    assert worker.get("quote:MSFT")[0] == {"symbol": "MSFT"}
+
+def test_batch_waits_for_symbols_another_worker_is_fetching(worker, path, monkeypatch):
+    requested = []
+
+    def fetch_batch(symbols):
+        requested.append(list(symbols))
+        return {symbol: {"symbol": symbol} for symbol in symbols}
+
+    monkeypatch.setattr(market_service, "_fetch_quotes_batch_sync", fetch_batch)
+    other = SharedCache(path)
+    assert other.acquire("quote:MSFT")
+
+    async def run():
+        waiting = asyncio.ensure_future(market_service.get_realtime_stock_data_batch(["AAPL", "MSFT"]))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        other.set("quote:MSFT", {"symbol": "MSFT", "from": "other"})
+        other.release("quote:MSFT")
+        return await waiting
+
+    result = asyncio.run(run())
+    assert requested == [["AAPL"]]
+    assert result["quotes"]["MSFT"]["from"] == "other"
+
+def test_batch_fetches_what_the_lease_holder_left_unresolved(worker, path, monkeypatch):
+    requested = []
+    monkeypatch.setattr(market_service, "_fetch_quotes_batch_sync", lambda symbols: requested.append(list(symbols)) or {})
+    other = SharedCache(path, lease_seconds=0.1)
+    assert other.acquire("quote:XXXX")  # and never stores a quote
+
+    result = asyncio.run(market_service.get_realtime_stock_data_batch(["XXXX"]))
+    assert requested == [["XXXX"]]
+    assert result["errors"] == {"XXXX": "Symbol not found"}
+
+def test_background_refresh_skips_symbols_other_workers_handle(worker, path, monkeypatch):
+    requested = []
+
+    def fetch_batch(symbols):
+        requested.append(list(symbols))
+        return {symbol: {"symbol": symbol} for symbol in symbols}
+
+    monkeypatch.setattr(market_service, "_fetch_quotes_batch_sync", fetch_batch)
+    other = SharedCache(path)
+    other.set("quote:AAPL", {"symbol": "AAPL"})  # refreshed just now
+    other.acquire("quote:TSLA")                   # being refreshed right now
+
+    quotes = asyncio.run(market_service.refresh_quotes(["AAPL", "MSFT", "TSLA"]))
+    assert requested == [["MSFT"]]
+    assert set(quotes) == {"AAPL", "MSFT"}
+
+def test_leases_are_taken_in_one_transaction(path, monkeypatch):
+    shared, other = SharedCache(path, lease_seconds=5.0), SharedCache(path)
+    assert other.acquire("quote:MSFT")
+    commits = []
+    connection = shared._connection()
+
+    class Counting:
+        def __getattr__(self, name):
+            return getattr(connection, name)
+
+        def __enter__(self):
+            return connection.__enter__()
+
+        def __exit__(self, *exc):
+            commits.append(exc[0])
+            return connection.__exit__(*exc)
+
+    monkeypatch.setattr(shared, "_connection", lambda: Counting())
+    assert shared.acquire_many(["quote:AAPL", "quote:MSFT", "quote:TSLA"]) == ["quote:AAPL", "quote:TSLA"]
+    assert commits == [None]
+    assert (shared.leases_won, shared.leases_lost) == (2, 1)
+
+def test_event_loop_never_waits_on_sqlite(worker, monkeypatch):
+    loop_thread = threading.current_thread()
+    threads = set()
+    for name in ("get_many", "set_many", "acquire_many", "release"):
+        method = getattr(worker, name)
+
+        def spy(*args, method=method, name=name):
+            threads.add((name, threading.current_thread() is loop_thread))
+            return method(*args)
+
+        monkeypatch.setattr(worker, name, spy)
+    monkeypatch.setattr(market_service, "_fetch_quotes_batch_sync", lambda symbols: {s: {"symbol": s} for s in symbols})
+
+    asyncio.run(market_service.get_realtime_stock_data_batch(["AAPL", "MSFT"]))
+    assert threads == {("get_many", False), ("set_many", False), ("acquire_many", False), ("release", False)}
+
+def test_creating_the_tier_touches_no_database(path):
+    shared = SharedCache(path)
+    assert not os.path.exists(path)
+    shared.set("quote:AAPL", 1)
+    assert shared.get("quote:AAPL")[0] == 1
+
+def test_cache_stats_read_the_tier_off_the_loop(worker, monkeypatch):
+    loop_thread = threading.current_thread()
+    threads = []
+    stats = worker.stats
+
+    def spy():
+        threads.append(threading.current_thread() is loop_thread)
+        return stats()
+
+    monkeypatch.setattr(worker, "stats", spy)
+    assert asyncio.run(market_service.cache_stats())["shared"]["entries"] == 0
+    assert threads == [False]
+
+def test_stats_survive_an_unreadable_database(tmp_path):
+    # A directory where the database file should be: every connection fails
+    shared = SharedCache(str(tmp_path))
+    stats = shared.stats()
+    assert stats["entries"] is None and stats["active_leases"] is None
+
+def test_tier_is_on_by_default_only_with_several_workers(monkeypatch):
+    settings = market_service.settings
+    monkeypatch.setattr(settings, "SHARED_CACHE_ENABLED", None)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 1)
+    assert not market_service.shared_cache_enabled()
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    assert market_service.shared_cache_enabled()
+    monkeypatch.setattr(settings, "SHARED_CACHE_ENABLED", False)
+    assert not market_service.shared_cache_enabled()
@@ -0,0 +1,34 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend import main
+from backend.bench import startup
+from backend.services import ai_service
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    assert startup.measure_import(runs=1)["eager_modules"] == []
+
+def test_lifespan_creates_and_closes_the_gemini_client(monkeypatch):
+    closed = []
+
+    async def aclose():
+        closed.append("aio")
+
+    stub = SimpleNamespace(aio=SimpleNamespace(aclose=aclose), close=lambda: closed.append("sync"))
+
+    def build():
+        monkeypatch.setattr(ai_service, "client", stub)
+        return stub
+
+    monkeypatch.setattr(ai_service, "client", None)
+    monkeypatch.setattr(ai_service, "_ensure_client", build)
+    monkeypatch.setattr(main, "_warm_up", lambda: None)
+    monkeypatch.setattr(main.settings, "REFRESHER_ENABLED", False)
+
+    async def run():
+        async with main.lifespan(main.app):
+            assert await ai_service.get_client() is stub
+
+    asyncio.run(run())
+    assert closed == ["aio", "sync"]
+    assert ai_service.client is None
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.models import StockQuote
+from backend.services import market_service, stream_hub
+
+def _quote(symbol, price=1.0, as_of="2024-05-01T14:30:00+00:00"):
+    return StockQuote(symbol, price, 0.0, 0, as_of)
+
+@pytest.fixture
+def hub(monkeypatch):
+    hub = stream_hub.QuoteHub(poll_interval=0.01)
+    monkeypatch.setattr(stream_hub, "_hub", hub)
+    return hub
+
+def test_one_poll_serves_every_subscriber(monkeypatch, hub):
+    polled = []
+
+    async def fake_batch(symbols):
+        polled.append(list(symbols))
+        return {"quotes": {s: _quote(s, len(polled)) for s in symbols if s != "XXXX"},
+                "errors": {"XXXX": "Symbol not found"} if "XXXX" in symbols else {}}
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data_batch", fake_batch)
+
+    async def run():
+        subscriptions = [hub.subscribe(["AAPL", "MSFT"]) for _ in range(100)]
+        late = hub.subscribe(["XXXX"])
+        updates = [await s.next_update() for s in subscriptions]
+        error = await late.next_update()
+        await hub.stop()
+        return updates, error
+
+    updates, error = asyncio.run(run())
+    assert all(set(u["quotes"]) == {"AAPL", "MSFT"} for u in updates)
+    assert error["errors"] == {"XXXX": "Symbol not found"}
+    # Upstream calls scale with ticks, not with the 101 subscribers
+    assert len(polled) <= 3
+
+def test_slow_subscriber_gets_conflated_updates():
+    subscription = stream_hub.Subscription(["AAPL"])
+    for price in (1.0, 2.0, 3.0):
+        subscription.offer("AAPL", _quote("AAPL", price))
+
+    update = asyncio.run(subscription.next_update())
+    assert update["quotes"] == {"AAPL": _quote("AAPL", 3.0)}
+    assert subscription.conflated == 2
+
+def test_refetch_with_only_a_new_as_of_is_not_republished(monkeypatch, hub):
+    async def no_quotes(symbols):
+        return {"quotes": {}, "errors": {}}
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data_batch", no_quotes)
+
+    async def run():
+        subscription = hub.subscribe(["AAPL"])
+        hub._publish({"quotes": {"AAPL": _quote("AAPL")}, "errors": {}})
+        await subscription.next_update()
+        hub._publish({"quotes": {"AAPL": _quote("AAPL", as_of="2024-05-01T14:30:15+00:00")}, "errors": {}})
+        hub.unsubscribe(subscription)
+        await hub.stop()
+        return subscription
+
+    assert asyncio.run(run()).delivered == 1
+
+def test_websocket_stream_pushes_quotes(monkeypatch, hub):
+    async def fake_batch(symbols):
+        return {"quotes": {s: _quote(s) for s in symbols}, "errors": {}}
+
+    monkeypatch.setattr(market_service, "get_realtime_stock_data_batch", fake_batch)
+
+    with TestClient(app).websocket_connect("/api/v1/stream?symbols=aapl") as websocket:
+        assert websocket.receive_json()["quotes"] == {"AAPL": _quote("AAPL").to_dict()}
+        websocket.send_json({"action": "subscribe", "symbols": ["msft"]})
+        assert "MSFT" in websocket.receive_json()["quotes"]
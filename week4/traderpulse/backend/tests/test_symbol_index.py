@@ -0,0 +1,64 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.models import Symbol
+from backend.services import market_service, symbol_index
+from backend.services.symbol_index import SymbolIndex
+
+@pytest.fixture(scope="module")
+def index():
+    return symbol_index.get_index()
+
+def _symbols(results):
+    return [entry.symbol for entry in results]
+
+def test_exact_and_prefix_matches_rank_first(index):
+    assert _symbols(index.search("aapl"))[0] == "AAPL"
+    assert _symbols(index.search("GOO", 2)) == ["GOOGL", "GOOG"]
+    # Punctuation in tickers is optional
+    assert _symbols(index.search("brkb", 1)) == ["BRK-B"]
+    assert _symbols(index.search("btc", 1)) == ["BTC-USD"]
+
+def test_company_names_match_by_prefix_of_any_significant_word(index):
+    assert _symbols(index.search("apple", 1)) == ["AAPL"]
+    assert _symbols(index.search("bank of am", 1)) == ["BAC"]
+    assert _symbols(index.search("berkshire", 1)) == ["BRK-B"]
+    assert "KO" in _symbols(index.search("coca cola"))
+
+def test_typos_are_matched_by_edit_distance(index):
+    assert _symbols(index.search("AAPLE", 1)) == ["AAPL"]
+    assert _symbols(index.search("MSFTT", 1)) == ["MSFT"]
+    assert _symbols(index.search("microsfot", 1)) == ["MSFT"]
+    assert index.search("XXXX") == []
+
+def test_ranking_prefers_exact_tickers_then_file_order():
+    index = SymbolIndex([
+        Symbol("TEST", "Zeta Corp", "NYSE", "equity"),
+        Symbol("TESTA", "Alpha Inc.", "NYSE", "equity"),
+        Symbol("BETA", "Test Industries", "NYSE", "equity"),
+        Symbol("TSET", "Other", "NYSE", "equity"),
+    ])
+    assert _symbols(index.search("test")) == ["TEST", "TESTA", "BETA", "TSET"]
+    assert index.get("testa").name == "Alpha Inc."
+
+def test_searches_take_well_under_a_millisecond(index):
+    queries = ["A", "goo", "AAPLE", "microsft", "bank of am", "XXXX", "s&p"]
+    started = time.perf_counter()
+    for _ in range(20):
+        for query in queries:
+            index.search(query)
+    assert (time.perf_counter() - started) / (20 * len(queries)) < 0.001
+
+def test_search_endpoint_never_calls_the_provider(monkeypatch):
+    monkeypatch.setattr(market_service, "_fetch_quote_sync", lambda symbol: pytest.fail("upstream called"))
+    client = TestClient(app)
+
+    response = client.get("/api/v1/symbols/search?q=nvidia&limit=3")
+    assert response.status_code == 200
+    assert response.json()["results"][0] == {"symbol": "NVDA", "name": "NVIDIA Corporation",
+                                             "exchange": "NASDAQ", "type": "equity"}
+    assert "max-age=3600" in response.headers["Cache-Control"]
+    assert client.get("/api/v1/symbols/search?q=").status_code == 422
@@ -4,16 +4,19 @@ import sys
 import os
 
 from backend.services.market_service import get_realtime_stock_data, get_historical_data
+from backend.services.providers import get_provider
 
+# Runs against live Yahoo Finance by default. Set MARKET_DATA_PROVIDER=record to
+# capture the responses, then MARKET_DATA_PROVIDER=replay to run offline.
 async def verify():
     symbol = "AAPL"
-    print(f"Verifying data for {symbol}...")
+    print(f"Verifying data for {symbol} using the '{get_provider().name}' provider...")
     
     print("\n--- Realtime Data ---")
     realtime = await get_realtime_stock_data(symbol)
     print(realtime)
     
-    if realtime and "price" in realtime and "change_percent" in realtime:
+    if realtime and realtime.price is not None and realtime.change_percent is not None:
         print("✅ Realtime data structure looks correct.")
     else:
         print("❌ Realtime data structure is incorrect or empty.")
@@ -25,7 +28,7 @@ async def verify():
         print(f"First point: {historical[0]}")
         print(f"Last point: {historical[-1]}")
         
-        if "date" in historical[0] and "close" in historical[0]:
+        if historical[0].date and historical[0].close is not None:
              print("✅ Historical data structure looks correct.")
         else:
              print("❌ Historical data structure is incorrect.")
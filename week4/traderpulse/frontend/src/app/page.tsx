@@ -9,33 +9,44 @@ import { Input } from "@/components/ui/input";
 import { Button } from "@/components/ui/button";
 import { Search } from "lucide-react";
 import { toast } from 'sonner';
+import { useDashboard } from '@/lib/dashboard';
+import { useSentimentStream } from '@/lib/sentiment';
+import { searchSymbols, SymbolMatch, useSymbolSearch } from '@/lib/symbols';
 
 export default function Home() {
     const [symbol, setSymbol] = useState("AAPL");
     const [searchInput, setSearchInput] = useState("");
+    const [showSuggestions, setShowSuggestions] = useState(false);
+    const dashboard = useDashboard(symbol);
+    const sentiment = useSentimentStream(symbol);
+    const suggestions = useSymbolSearch(searchInput);
+
+    const selectSymbol = (match: SymbolMatch) => {
+        setSymbol(match.symbol);
+        setSearchInput("");
+        setShowSuggestions(false);
+        toast.success(`Encontrado: ${match.symbol}`, { description: match.name });
+    };
 
     const handleSearch = async (e: React.FormEvent) => {
         e.preventDefault();
-        if (searchInput.trim()) {
-            const query = searchInput.trim().toUpperCase();
-
-            // Check if symbol exists
-            try {
-                const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1'}/stocks/${query}`);
+        const query = searchInput.trim();
+        if (!query) return;
 
-                if (res.ok) {
-                    setSymbol(query);
-                    toast.success(`Encontrado: ${query}`);
-                } else {
-                    toast.error("Stock no encontrado", {
-                        description: `El símbolo '${query}' no existe o no se pudo cargar.`
-                    });
-                }
-            } catch (err) {
-                toast.error("Error de conexión", {
-                    description: "No se pudo conectar con el servidor."
+        // Only symbols from the index reach the market data endpoints
+        try {
+            const results = await searchSymbols(query);
+            if (results.length > 0) {
+                selectSymbol(results[0]);
+            } else {
+                toast.error("Stock no encontrado", {
+                    description: `No hay ningún símbolo que coincida con '${query}'.`
                 });
             }
+        } catch (err) {
+            toast.error("Error de conexión", {
+                description: "No se pudo conectar con el servidor."
+            });
         }
     };
 
@@ -68,26 +79,51 @@ export default function Home() {
                     <div className="lg:col-span-3 space-y-6">
 
                         {/* Search Bar */}
-                        <form onSubmit={handleSearch} className="flex gap-2 max-w-md">
+                        <form onSubmit={handleSearch} className="relative flex gap-2 max-w-md">
                             <Input
-                                placeholder="Buscar símbolo (ej. AAPL, BTC, TSLA)..."
+                                placeholder="Buscar símbolo o empresa (ej. AAPL, Bitcoin, Tesla)..."
                                 className="bg-slate-900 border-slate-800 text-slate-100 focus-visible:ring-cyan-500"
                                 value={searchInput}
-                                onChange={(e) => setSearchInput(e.target.value)}
+                                onChange={(e) => {
+                                    setSearchInput(e.target.value);
+                                    setShowSuggestions(true);
+                                }}
+                                onBlur={() => setShowSuggestions(false)}
                             />
                             <Button type="submit" className="bg-cyan-600 hover:bg-cyan-700 text-white">
                                 <Search size={18} />
                             </Button>
+                            {showSuggestions && suggestions.length > 0 && (
+                                <ul className="absolute top-full left-0 right-12 mt-1 z-40 rounded-md border border-slate-800 bg-slate-900 shadow-lg overflow-hidden">
+                                    {suggestions.map(match => (
+                                        <li key={match.symbol}>
+                                            <button
+                                                type="button"
+                                                className="w-full flex items-center justify-between px-3 py-2 text-left text-sm hover:bg-slate-800"
+                                                onMouseDown={(e) => e.preventDefault()}
+                                                onClick={() => selectSymbol(match)}
+                                            >
+                                                <span className="font-semibold text-cyan-400">{match.symbol}</span>
+                                                <span className="ml-3 truncate text-slate-400">{match.name}</span>
+                                            </button>
+                                        </li>
+                                    ))}
+                                </ul>
+                            )}
                         </form>
 
                         <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
                             {/* Chart takes up 2 columns */}
                             <div className="lg:col-span-2 h-[450px]">
-                                <MarketChart symbol={symbol} />
+                                <MarketChart symbol={symbol} data={dashboard} />
                             </div>
                             {/* Sentiment takes up 1 column next to chart */}
                             <div className="lg:col-span-1 h-full">
-                                <SentimentWidget symbol={symbol} />
+                                <SentimentWidget
+                                    symbol={symbol}
+                                    data={sentiment}
+                                    error={sentiment.error}
+                                />
                             </div>
                         </div>
 
@@ -99,7 +135,7 @@ export default function Home() {
 
                     {/* Right Sidebar - Gamification */}
                     <div className="lg:col-span-1">
-                        <GamificationSidebar />
+                        <GamificationSidebar refreshKey={sentiment.result} />
                     </div>
 
                 </div>
@@ -1,17 +1,24 @@
 'use client';
 
+import { useEffect } from 'react';
 import useSWR from 'swr';
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Trophy, Star, TrendingUp } from "lucide-react";
 import { Skeleton } from "@/components/ui/skeleton";
+import { userHeaders } from "@/lib/user";
 
-const fetcher = (url: string) => fetch(url).then(r => r.json());
+const fetcher = (url: string) => fetch(url, { headers: userHeaders() }).then(r => r.json());
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1";
 
-export default function GamificationSidebar() {
-    const { data, error, isLoading } = useSWR(`${API_URL}/gamification/status`, fetcher);
+// `refreshKey` changes whenever a new analysis has earned points, e.g. the dashboard's sentiment
+export default function GamificationSidebar({ refreshKey }: { refreshKey?: unknown }) {
+    const { data, error, isLoading, mutate } = useSWR(`${API_URL}/gamification/status`, fetcher);
+
+    useEffect(() => {
+        if (refreshKey) mutate();
+    }, [refreshKey, mutate]);
 
     if (error) return (
         <Card className="bg-slate-900 border-slate-800 text-slate-100">
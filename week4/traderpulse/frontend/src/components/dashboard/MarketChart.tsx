@@ -1,29 +1,26 @@
 'use client';
 
-import useSWR from 'swr';
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Skeleton } from "@/components/ui/skeleton";
 import { LineChart, Line, XAxis, YAxis, Tooltip, ResponsiveContainer, Area, AreaChart } from 'recharts';
 
-const fetcher = (url: string) => fetch(url).then(r => r.json());
-const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1";
+import { DashboardState } from '@/lib/dashboard';
 
 interface Props {
     symbol: string;
+    data: DashboardState;
 }
 
-export default function MarketChart({ symbol }: Props) {
-    const { data, error, isLoading } = useSWR(`${API_URL}/stocks/${symbol}`, fetcher);
-
-    if (error) return <div className="text-red-500 text-sm">Error cargando gráfico</div>;
-    if (isLoading) return <Skeleton className="h-[300px] w-full bg-slate-800 rounded-xl" />;
+export default function MarketChart({ symbol, data }: Props) {
+    if (data.errors.quote || data.errors.history) return <div className="text-red-500 text-sm">Error cargando gráfico</div>;
+    if (!data.historical && !data.done) return <Skeleton className="h-[300px] w-full bg-slate-800 rounded-xl" />;
 
     if (!data?.historical || data.historical.length === 0) {
         return <div className="text-slate-400 text-sm p-4">Datos históricos no disponibles</div>;
     }
 
     const chartData = [...data.historical].sort((a: any, b: any) => new Date(a.date).getTime() - new Date(b.date).getTime());
-    const latestPrice = data.realtime?.price ? parseFloat(data.realtime.price) : 0;
+    const latestPrice: number = data.realtime?.price ?? 0;
     const changeColor = "#22c55e"; // Green default for now
 
     return (
@@ -1,22 +1,21 @@
 'use client';
 
-import useSWR from 'swr';
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Skeleton } from "@/components/ui/skeleton";
 import { BrainCircuit, ThumbsUp, ThumbsDown, Minus } from "lucide-react";
 
-const fetcher = (url: string) => fetch(url).then(r => r.json());
-const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1";
+import { SentimentStreamState } from '@/lib/sentiment';
 
 interface Props {
     symbol: string;
+    data: SentimentStreamState;
+    error?: string;
 }
 
-export default function SentimentWidget({ symbol }: Props) {
-    const { data, error, isLoading } = useSWR(`${API_URL}/sentiment/${symbol}`, fetcher, {
-        revalidateOnFocus: false,
-        shouldRetryOnError: false
-    });
+// Shows the label as soon as it is streamed and the justification as it is written
+export default function SentimentWidget({ symbol, data, error }: Props) {
+    const isLoading = !data.sentiment;
+    const isWriting = !data.result;
 
     if (!symbol) return null;
 
@@ -53,10 +52,15 @@ export default function SentimentWidget({ symbol }: Props) {
                                 {data.sentiment === "Neutral" && <Minus size={14} />}
                                 {data.sentiment}
                             </div>
+                            {data.result?.source === 'local' && (
+                                <span className="text-xs text-slate-500" title="Gemini no respondió a tiempo; calculado a partir del precio y sus indicadores">
+                                    Estimación local
+                                </span>
+                            )}
                         </div>
                         <div className="p-4 bg-slate-800/30 rounded-lg border border-slate-700/50">
                             <p className="text-slate-300 text-sm leading-relaxed italic">
-                                "{data.justification}"
+                                "{data.justification}{isWriting && <span className="animate-pulse">▍</span>}"
                             </p>
                         </div>
                     </div>
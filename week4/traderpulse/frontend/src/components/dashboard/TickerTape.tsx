@@ -51,11 +51,8 @@ function TickerItem({ symbol, onClick }: { symbol: string, onClick?: () => void
     if (!data) return <div className="flex items-center space-x-2"><span className="font-bold text-slate-500">{symbol}...</span></div>;
 
     const stock = data.realtime;
-    // Assuming API returns string "XX.XX%" or similar, we parse it or use directly.
-    // API returns: { price: "273.81", change_percent: "0.6137%", ... }
-
-    const changePercentStr = stock.change_percent.replace('%', '');
-    const changePercent = parseFloat(changePercentStr);
+    // API returns numbers: { price: 273.81, change_percent: 0.6137, ... }
+    const changePercent: number = stock.change_percent;
     const isPositive = changePercent >= 0;
 
     return (
@@ -64,7 +61,7 @@ function TickerItem({ symbol, onClick }: { symbol: string, onClick?: () => void
             onClick={onClick}
         >
             <span className="font-bold text-slate-200">{stock.symbol}</span>
-            <span className="text-slate-400">${parseFloat(stock.price).toFixed(2)}</span>
+            <span className="text-slate-400">${stock.price.toFixed(2)}</span>
             <span className={`flex items-center text-xs font-medium ${isPositive ? "text-green-500" : "text-red-500"}`}>
                 {isPositive ? <ArrowUp size={12} /> : <ArrowDown size={12} />}
                 {Math.abs(changePercent).toFixed(2)}%
@@ -0,0 +1,75 @@
+'use client';
+
+import { useEffect, useState } from 'react';
+import { userHeaders } from './user';
+
+const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1";
+
+export interface Sentiment {
+    sentiment: string;
+    justification: string;
+    // Set when the backend answered with its local momentum score instead of Gemini
+    source?: 'local';
+}
+
+export interface DashboardState {
+    realtime?: any;
+    historical?: { date: string; close: number }[];
+    sentiment?: Sentiment;
+    errors: Record<string, string>;
+    done: boolean;
+}
+
+const initialState: DashboardState = { errors: {}, done: false };
+
+// Reads `/dashboard/{symbol}` line by line so the chart can render as soon as possible; the AI
+// analysis is streamed separately (see `useSentimentStream`)
+export function useDashboard(symbol: string): DashboardState {
+    const [state, setState] = useState<DashboardState>(initialState);
+
+    useEffect(() => {
+        const controller = new AbortController();
+        setState(initialState);
+
+        const apply = (message: any) => setState(prev => {
+            switch (message.type) {
+                case 'quote': return { ...prev, realtime: message.data };
+                case 'history': return { ...prev, historical: message.data };
+                case 'sentiment': return { ...prev, sentiment: message.data };
+                case 'error': return { ...prev, errors: { ...prev.errors, [message.part]: message.detail } };
+                default: return prev;
+            }
+        });
+
+        (async () => {
+            try {
+                const res = await fetch(`${API_URL}/dashboard/${symbol}?sentiment=false`, { signal: controller.signal, headers: userHeaders() });
+                if (!res.ok || !res.body) {
+                    setState({ ...initialState, errors: { quote: `HTTP ${res.status}` }, done: true });
+                    return;
+                }
+
+                const reader = res.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = "";
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    const lines = buffer.split("\n");
+                    buffer = lines.pop() ?? "";
+                    lines.filter(line => line.trim()).forEach(line => apply(JSON.parse(line)));
+                }
+                setState(prev => ({ ...prev, done: true }));
+            } catch (err) {
+                if (!controller.signal.aborted) {
+                    setState(prev => ({ ...prev, errors: { ...prev.errors, quote: String(err) }, done: true }));
+                }
+            }
+        })();
+
+        return () => controller.abort();
+    }, [symbol]);
+
+    return state;
+}
@@ -0,0 +1,74 @@
+'use client';
+
+import { useEffect, useState } from 'react';
+import { Sentiment } from './dashboard';
+import { userHeaders } from './user';
+
+const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1";
+
+export interface SentimentStreamState {
+    sentiment?: string;
+    justification: string;
+    // The validated analysis, once the stream has ended
+    result?: Sentiment;
+    error?: string;
+}
+
+const initialState: SentimentStreamState = { justification: "" };
+
+// Reads `/sentiment/{symbol}/stream` (Server-Sent Events over fetch, so the user header is sent)
+export function useSentimentStream(symbol: string): SentimentStreamState {
+    const [state, setState] = useState<SentimentStreamState>(initialState);
+
+    useEffect(() => {
+        const controller = new AbortController();
+        setState(initialState);
+
+        const apply = (event: string, data: any) => setState(prev => {
+            switch (event) {
+                case 'sentiment': return { ...prev, sentiment: data.sentiment };
+                case 'justification': return { ...prev, justification: prev.justification + data.text };
+                case 'done': return { sentiment: data.sentiment, justification: data.justification, result: data };
+                default: return prev;
+            }
+        });
+
+        (async () => {
+            try {
+                const res = await fetch(`${API_URL}/sentiment/${symbol}/stream`, { signal: controller.signal, headers: userHeaders() });
+                if (!res.ok || !res.body) {
+                    setState({ ...initialState, error: `HTTP ${res.status}` });
+                    return;
+                }
+
+                const reader = res.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = "";
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    const blocks = buffer.split("\n\n");
+                    buffer = blocks.pop() ?? "";
+                    for (const block of blocks) {
+                        let event = "message";
+                        let data = "";
+                        for (const line of block.split("\n")) {
+                            if (line.startsWith("event: ")) event = line.slice(7);
+                            else if (line.startsWith("data: ")) data += line.slice(6);
+                        }
+                        if (data) apply(event, JSON.parse(data));
+                    }
+                }
+            } catch (err) {
+                if (!controller.signal.aborted) {
+                    setState(prev => ({ ...prev, error: String(err) }));
+                }
+            }
+        })();
+
+        return () => controller.abort();
+    }, [symbol]);
+
+    return state;
+}
@@ -0,0 +1,46 @@
+'use client';
+
+import { useEffect, useState } from 'react';
+
+const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1";
+
+export interface SymbolMatch {
+    symbol: string;
+    name: string;
+    exchange: string;
+    type: string;
+}
+
+export async function searchSymbols(query: string, signal?: AbortSignal): Promise<SymbolMatch[]> {
+    const res = await fetch(`${API_URL}/symbols/search?q=${encodeURIComponent(query)}&limit=8`, { signal });
+    if (!res.ok) return [];
+    const body = await res.json();
+    return body.results;
+}
+
+// Ranked matches from the backend's local symbol index, refreshed as the user types
+export function useSymbolSearch(query: string, delayMs = 120): SymbolMatch[] {
+    const [results, setResults] = useState<SymbolMatch[]>([]);
+
+    useEffect(() => {
+        const trimmed = query.trim();
+        if (!trimmed) {
+            setResults([]);
+            return;
+        }
+
+        const controller = new AbortController();
+        const timer = setTimeout(() => {
+            searchSymbols(trimmed, controller.signal)
+                .then(setResults)
+                .catch(() => { /* superseded or offline: keep the previous suggestions */ });
+        }, delayMs);
+
+        return () => {
+            clearTimeout(timer);
+            controller.abort();
+        };
+    }, [query, delayMs]);
+
+    return results;
+}
@@ -0,0 +1,19 @@
+'use client';
+
+const STORAGE_KEY = 'traderpulse.userId';
+
+// Anonymous per-browser id sent as `X-User-Id`; the backend keeps points and badges per id
+export function getUserId(): string | undefined {
+    if (typeof window === 'undefined') return undefined;
+    let id = window.localStorage.getItem(STORAGE_KEY);
+    if (!id) {
+        id = crypto.randomUUID();
+        window.localStorage.setItem(STORAGE_KEY, id);
+    }
+    return id;
+}
+
+export function userHeaders(): Record<string, string> {
+    const id = getUserId();
+    return id ? { 'X-User-Id': id } : {};
+}